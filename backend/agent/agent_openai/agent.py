@@ -1,8 +1,10 @@
-import json
+import copy
+import time
 import asyncio
 from typing import AsyncGenerator
 import logging
-from partialjson.json_parser import JSONParser
+
+from pydantic import ValidationError
 
 from ..schema import (
     UIContext,
@@ -12,23 +14,55 @@ from ..schema import (
     ToolCallOutput,
     ToolResponseOutput,
     FormRequest,
+    FormRow,
     FormResult,
     ChoiceRequest,
     ChoiceResult,
+    FormRowDelta,
+    ChoiceOptionDelta,
     LLMFinalResponse,
-    MessageDelta,
-    StreamingDisplayOutput,
 )
-from ..tools.tools import get_tool_schema_list, call_tool, tool_call_progress_message
+from ..tools.tools import (
+    get_tool_schema_list,
+    call_tool,
+    get_tool_state,
+    is_side_effect_free,
+    is_expensive,
+    tool_call_progress_message,
+    ToolProgress,
+)
 from .base_agent import ResponsiveAgent
+from .response_cache import ResponseCache, TurnRecorder, make_cache_key
+from .report_preview import ReportPreviewTracker
+from .json_stream import FinalResponseParser
+from .delta_events import DeltaEvent, MessageDeltaEvent, StreamingDisplayEvent
+from .turn_memory import TurnMemory, TurnMemoryStats, compact_input_item
+from .tool_output import ToolOutputAssembler, preview_tool_output, TOOL_PREVIEW_CHARS
+from .router import TurnRouter, RouteDecision
+from ..rate_limit import RateLimiter, RateLimitExceeded
+from ..attachments import AttachmentManager, redact_data_urls
+from .. import json_codec
 
 logger = logging.getLogger(__name__)
 
+# assistant messages of the turns that end without an answer of the model, batch runs retry these turns
+FALLBACK_MESSAGES = {
+    "rate_limited": "Too many requests right now. Please try again in a minute.",
+    "no_response": "Please try again.",
+    "too_large": "This conversation got too large to continue. Please start a new one.",
+    "tool_call_limit": "tool call limit exceeded. Please try again.",
+}
+
 
 class OpenaiStreamFilter:
     def __init__(self):
         self.final_response = None
-        self.json_partial_parser = JSONParser()
+        self.final_response_parser = FinalResponseParser()
+        # the form or choice request validated while streamed, the completed response is not parsed again
+        self.finalized: FormRequest | ChoiceRequest | None = None
+        self.report_preview = ReportPreviewTracker()
+        # bytes of the deltas received, the output the response will hold once completed
+        self.received_bytes = 0
 
     async def filter(self, response_generator: AsyncGenerator):
         """
@@ -42,44 +76,46 @@ class OpenaiStreamFilter:
         # 第三层过滤，区分前端的type
         async for chunk_type, chunk_content in upstream_generator:
             if chunk_type == "response.output_text.delta":
-                yield MessageDelta(content=chunk_content)
+                yield MessageDeltaEvent(chunk_content)
             elif chunk_type in ["response.reasoning_summary_text.delta", "response.function_call_arguments.delta"]:
-                yield StreamingDisplayOutput(content=chunk_content)
+                yield StreamingDisplayEvent(chunk_content)
+            elif chunk_type in ("report_preview", "final_response_part"):
+                yield chunk_content
 
     async def second_filter(self, upstream_generator: AsyncGenerator):
-        total_json_content = ""
-        text_content_old = ""
-
+        # LLMFinalResponse, the message text is parsed out chunk by chunk without keeping the json so far
         async for chunk_type, chunk_content in upstream_generator:
             if chunk_type != "response.output_text.delta":
                 yield (chunk_type, chunk_content)
                 continue
 
-            total_json_content += chunk_content
-            try:
-                parsed = self.json_partial_parser.parse(total_json_content)
-            except Exception as e:
-                logger.error(f"error in parsing json text: {e}")
-                continue
-
-            # LLMFinalResponse
-            if not isinstance(parsed, dict):
-                continue
-            identified_message_type = parsed.get("type")
-            extracted_message_content = parsed.get("content", {})
-            if not isinstance(extracted_message_content, dict):
-                continue
-            text_content = extracted_message_content.get("content", "")
-            if not isinstance(text_content, str):
-                continue
-
-            if identified_message_type == "message":
-                length_old = len(text_content_old)
-                length_new = len(text_content)
-                if length_old < length_new:
-                    content_diff = text_content[length_old:length_new]
-                    text_content_old = text_content
-                    yield ("response.output_text.delta", content_diff)
+            text = []
+            for event in self.final_response_parser.feed(chunk_content):
+                if event[0] == "text":
+                    text.append(event[1])
+                    continue
+                part = self.final_response_part(event)
+                if part is not None:
+                    yield ("final_response_part", part)
+            if text:
+                yield ("response.output_text.delta", "".join(text))
+
+    def final_response_part(self, event: tuple):
+        # the rows and options of a form or choice request as they complete, then the request itself
+        try:
+            if event[0] == "form_row":
+                return FormRowDelta(index=event[1], row=FormRow.model_validate(event[2]))
+            if event[0] == "choice_option":
+                return ChoiceOptionDelta(index=event[1], option=event[2])
+            parsed = LLMFinalResponse.model_validate({"type": self.final_response_parser.type, "content": event[1]})
+        except ValidationError as e:
+            # left to the completed response
+            logger.warning(f"Invalid streamed {event[0]}: {e}")
+            return None
+        if parsed.type == "message":
+            return None
+        self.finalized = parsed.content
+        return parsed.content
 
     async def first_filter(self, response_generator: AsyncGenerator):
         allowed_stream_types = [
@@ -91,9 +127,51 @@ class OpenaiStreamFilter:
             chunk_type = getattr(chunk, "type", "")
             if chunk_type == "response.completed":
                 self.final_response = getattr(chunk, "response", None)
+            elif chunk_type == "response.output_item.added":
+                # tells which function the following argument deltas belong to
+                self.report_preview.add_item(getattr(chunk, "output_index", None), getattr(chunk, "item", None))
             elif chunk_type in allowed_stream_types:
                 delta_content = getattr(chunk, "delta", "")
+                self.received_bytes += len(delta_content.encode("utf-8"))
                 yield (chunk_type, delta_content)
+                if chunk_type == "response.function_call_arguments.delta":
+                    output_index = getattr(chunk, "output_index", None)
+                    for preview in self.report_preview.feed(output_index, delta_content):
+                        yield ("report_preview", preview)
+
+class TurnState:
+    # per-turn bookkeeping, kept off the agent so that one agent can run several turns concurrently
+    def __init__(self, max_turn_bytes: int | None = None):
+        # turns which used non-deterministic tools (e.g. web search) or failed must not be cached
+        self.cacheable = True
+        # routing decision of the turn and the function calls of the previous round, if a router is set
+        self.route: RouteDecision | None = None
+        self.previous_tool_names: list[str] = []
+        # bytes held by the turn, capped at max_turn_bytes
+        self.memory = TurnMemory(max_turn_bytes)
+
+
+class ToolCallRun:
+    # the tool calls of a round, started together, see Agent.start_tool_calls
+    def __init__(self, calls: int):
+        self.tasks: list[asyncio.Task] = []
+        # progress of streaming tools, None when a call finished
+        self.progress_queue: asyncio.Queue = asyncio.Queue()
+        self.results: list[dict | None] = [None] * calls
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+# the structured output format of every round, built once
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "name": "LLMFinalResponse",
+    "schema": LLMFinalResponse.llm_json_schema(),
+    "strict": True,
+}
+
 
 class Agent(ResponsiveAgent):
     def __init__(
@@ -106,11 +184,21 @@ class Agent(ResponsiveAgent):
         reasonging_effort: str = "low",
         verbosity: str = "medium",
         max_round_tool_call: int = 10,
+        response_cache: ResponseCache | None = None,
+        cache_replay_realtime: bool = False,
+        router: TurnRouter | None = None,
+        rate_limiter: RateLimiter | None = None,
+        attachments: AttachmentManager | None = None,
+        max_turn_bytes: int | None = None,
+        memory_stats: TurnMemoryStats | None = None,
+        pipeline_rounds: bool = True,
+        max_expensive_tool_calls: int = 2,
     ):
         self.model = model
         self.client = oai_client
         self.system_prompt = system_prompt
 
+        self.tool_names = list(tools)
         self.tools = get_tool_schema_list(tools)
 
         # add search tool
@@ -126,6 +214,29 @@ class Agent(ResponsiveAgent):
         self.verbosity = verbosity
         self.max_round_tool_call = max_round_tool_call
 
+        # opt-in exact-match response cache, shared between agents
+        self.response_cache = response_cache
+        self.cache_replay_realtime = cache_replay_realtime
+
+        # optional per-turn routing of model, reasoning effort and verbosity
+        self.router = router
+
+        # optional per-user and global budgets of the upstream requests and tokens, shared between agents
+        self.rate_limiter = rate_limiter
+
+        # optional upload of tool output images, the input then only references them by file id
+        self.attachments = attachments
+
+        # optional cap of the bytes held by a turn, and the peak bytes of the turns for sizing workers
+        self.max_turn_bytes = max_turn_bytes
+        self.memory_stats = memory_stats
+
+        # overlap the tool calls and the next request with sending the progress, see _run_turn
+        self.pipeline_rounds = pipeline_rounds
+
+        # tool calls of cost class "expensive" (e.g. sub-agent drafts) running at a time, over all turns
+        self.expensive_tool_slots = asyncio.Semaphore(max_expensive_tool_calls)
+
         logger.info(f"init agent with model: {self.model}, tools: {self.tools}, web_search: {web_search}, reasoning_effort: {self.reasoning_effort}, max_round_tool_call: {self.max_round_tool_call}")
 
     async def trigger(self, context: UIContext) -> AsyncGenerator[Output, None]:
@@ -134,80 +245,267 @@ class Agent(ResponsiveAgent):
         take input from ui, yield response to ui
 
         input: UIContext
-        output: Output
+        output: Output, as sse frames with monotonically increasing `id:` fields
         """
 
-        logger.info(f"trigger input: {context}")
+        # a reconnecting client sends the last id it got as Last-Event-ID
+        event_id = 0
+        async for frame in self._trigger(context):
+            event_id += 1
+            yield f"id: {event_id}\n{frame}"
+
+    async def _trigger(self, context: UIContext) -> AsyncGenerator[str, None]:
+        logger.info(f"trigger input: user {context.user_id}, {len(context.context)} context items")
+        logger.debug(f"trigger input: {context}")
 
         # the initial context pass to llm
         input_list = self.construct_prompt(context)
 
+        if self.response_cache is None:
+            turn_state = TurnState(self.max_turn_bytes)
+            try:
+                async for frame in self._run_turn(context, input_list, turn_state):
+                    yield frame
+            finally:
+                self._record_memory(turn_state)
+            return
+
+        cache_key = self.cache_key(context, input_list)
+        cached_turn = self.response_cache.get(cache_key)
+        if cached_turn is not None:
+            logger.info(f"response cache hit: {cache_key}")
+            async for frame in self.response_cache.replay(cached_turn, realtime=self.cache_replay_realtime):
+                yield frame
+            return
+
+        turn_state = TurnState(self.max_turn_bytes)
+        recorder = TurnRecorder()
+        try:
+            async for frame in self._run_turn(context, input_list, turn_state):
+                recorder.record(frame)
+                yield frame
+        finally:
+            self._record_memory(turn_state)
+
+        if turn_state.cacheable:
+            logger.info(f"response cache store: {cache_key}")
+            self.response_cache.put(cache_key, recorder.frames)
+
+    def _record_memory(self, turn_state: TurnState):
+        memory = turn_state.memory
+        logger.info(f"turn memory: peak {memory.peak_bytes} bytes, {memory.rounds} rounds")
+        if self.memory_stats is not None:
+            self.memory_stats.record(memory)
+
+    def cache_key(self, context: UIContext, input_list: list[dict]) -> str:
+        # the prompt, the model config and the state of the tools the turn may read. The tool state is a
+        # per-user version, so the key is scoped to the user, a cached turn may hold the user's report
+        return make_cache_key(
+            {
+                "input": input_list,
+                "config": self._config_key_parts(),
+                "user_id": context.user_id,
+                "tool_state": get_tool_state(self.tool_names, context.user_id),
+            }
+        )
+
+    def turn_key(self, context: UIContext) -> str:
+        # identifies identical in-flight turns of the same user, used for request coalescing
+        return make_cache_key(
+            {
+                "input": self.construct_prompt(context),
+                "config": self._config_key_parts(),
+                "user_id": context.user_id,
+            }
+        )
+
+    def _config_key_parts(self) -> dict:
+        return {
+            "model": self.model,
+            "tools": self.tools,
+            "reasoning_effort": self.reasoning_effort,
+            "verbosity": self.verbosity,
+            "max_round_tool_call": self.max_round_tool_call,
+            "router": self.router.config_key() if self.router else None,
+        }
+
+    def _round_settings(self, turn_state: TurnState) -> dict:
+        settings = {"model": self.model, "reasoning_effort": self.reasoning_effort, "verbosity": self.verbosity}
+        if turn_state.route is None:
+            return settings
+        return self.router.route_round(turn_state.route, settings, turn_state.previous_tool_names)
+
+    async def _run_turn(self, context: UIContext, input_list: list, turn_state: TurnState) -> AsyncGenerator[str, None]:
+        # the multi-round loop of a single turn
         get_message = False
-        for i in range(self.max_round_tool_call):
-            # get response
-            logger.info(f"Round {i}, inputs sent to openai: {input_list}")
-
-            response_generator = await self.client.responses.create(
-                model=self.model,
-                tools=self.tools,  # list of schemas
-                input=input_list,
-                reasoning={"effort": self.reasoning_effort, "summary": "auto"},
-                text={
-                    "format": {
-                        "type": "json_schema",
-                        "name": "LLMFinalResponse",
-                        "schema": LLMFinalResponse.llm_json_schema(),
-                        "strict": True,
-                    },
-                    "verbosity": self.verbosity,
-                },
-                stream=True,
-            )
-
-            openai_stream_filter = OpenaiStreamFilter()
-            async for parsed_chunk in openai_stream_filter.filter(response_generator):
-                yield self._output_to_sse(parsed_chunk)
-
-            response = openai_stream_filter.final_response
-
-            if not response:
-                yield self._output_to_sse(Message(role="assistant", content="Please try again."))
-                yield "data: done\n\n"
-                return
-
-            logger.info(f"Round {i}, got openai response: {response.model_dump(warnings=False)}")
+        if self.router is not None:
+            turn_state.route = await self.router.route_turn(context)
+        memory = turn_state.memory
+        memory.add_input(input_list)
+
+        # rounds are pipelined: the tools start before the round progress is sent, and the next request is
+        # sent before the tool results are
+        tool_run: ToolCallRun | None = None
+        next_round: asyncio.Task | None = None
+        try:
+            for i in range(self.max_round_tool_call):
+                if memory.exceeded:
+                    break
+
+                try:
+                    if next_round is not None:
+                        opened, next_round = next_round, None
+                        response_generator, settings, round_start = await opened
+                    else:
+                        response_generator, settings, round_start = await self._open_round(i, context, input_list, turn_state)
+                except RateLimitExceeded as e:
+                    logger.warning(f"Round {i}, {e}")
+                    turn_state.cacheable = False
+                    yield self._output_to_sse(Message(role="assistant", content=FALLBACK_MESSAGES["rate_limited"]))
+                    yield "data: done\n\n"
+                    return
+
+                openai_stream_filter = OpenaiStreamFilter()
+                filtered_stream = openai_stream_filter.filter(response_generator)
+                async for parsed_chunk in filtered_stream:
+                    yield self._output_to_sse(parsed_chunk)
+                    memory.set_stream(openai_stream_filter.received_bytes)
+                    if memory.exceeded:
+                        break
+                await filtered_stream.aclose()
+                if memory.exceeded:
+                    break
+
+                response = openai_stream_filter.final_response
+
+                if not response:
+                    turn_state.cacheable = False
+                    yield self._output_to_sse(Message(role="assistant", content=FALLBACK_MESSAGES["no_response"]))
+                    yield "data: done\n\n"
+                    return
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Round {i}, got openai response: {response.model_dump(warnings=False)}")
+
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.record_usage(context.user_id, getattr(response, "usage", None))
+
+                # the arguments of each call are parsed once, for the progress message and for the call
+                tool_calls = [item for item in response.output if item.type == "function_call"]
+                tool_arguments = self.parse_tool_arguments(tool_calls)
+                turn_state.previous_tool_names = [tool_call.name for tool_call in tool_calls]
+                if tool_calls and self.pipeline_rounds:
+                    tool_run = self.start_tool_calls(tool_calls, tool_arguments, context.user_id)
+
+                # send intermediate responses back to ui, while the tools run
+                for progress in self.send_openai_response_progress(response, tool_arguments, openai_stream_filter.finalized):
+                    yield progress
 
-            # send intermediate responses back to ui
-            for progress in self.send_openai_response_progress(response):
-                yield progress
+                # update context, with compact items instead of the response objects
+                output_items = [compact_input_item(item) for item in response.output]
+                input_list += output_items
+                memory.add_input(output_items)
+                memory.end_round()
+
+                if any(item.type == "web_search_call" for item in response.output):
+                    turn_state.cacheable = False
+
+                if turn_state.route is not None:
+                    await self.router.record_round(
+                        turn_state.route,
+                        i,
+                        settings,
+                        time.monotonic() - round_start,
+                        usage=getattr(response, "usage", None),
+                        tool_names=turn_state.previous_tool_names,
+                    )
+
+                if not tool_calls:
+                    # no tool call needed
+                    get_message = True
+                    break
+
+                if not all(is_side_effect_free(tool_call.name) for tool_call in tool_calls):
+                    turn_state.cacheable = False
+
+                logger.info(f"Round {i}, calling tools in parallel: {turn_state.previous_tool_names}")
+                if tool_run is None:
+                    tool_run = self.start_tool_calls(tool_calls, tool_arguments, context.user_id)
+
+                # previews of streaming tools are forwarded while the tools run
+                tool_call_results = []
+                async for progress in self.wait_tool_calls(tool_run, tool_call_results):
+                    yield progress
+                tool_run = None
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Round {i}, got tool call results: {redact_data_urls(tool_call_results)}")
 
-            # update context
-            input_list += response.output
+                input_list += tool_call_results
+                memory.add_input(tool_call_results)
 
-            # deal with tool calls
-            tool_calls = [item for item in response.output if item.type == "function_call"]
-            if len(tool_calls) > 0:
-                logger.info(f"Round {i}, calling tools in parallel: {tool_calls}")
-                tool_call_results = await self.trigger_tool_calls(tool_calls, context.user_id)
-                logger.info(f"Round {i}, got tool call results: {tool_call_results}")
+                # the next request goes out as soon as the last result is in, the results are sent meanwhile
+                if self.pipeline_rounds and i + 1 < self.max_round_tool_call and not memory.exceeded:
+                    next_round = asyncio.create_task(self._open_round(i + 1, context, input_list, turn_state))
 
                 for progress in self.send_tool_result_progress(tool_call_results):
                     yield progress
+        finally:
+            await self._cancel_round_work(tool_run, next_round)
 
-                input_list += tool_call_results
-
-            else:
-                # no tool call needed
-                get_message = True
-                break
+        if memory.exceeded:
+            logger.warning(f"turn memory cap exceeded: {memory.current_bytes} > {memory.max_bytes} bytes")
+            turn_state.cacheable = False
+            yield self._output_to_sse(Message(role="assistant", content=FALLBACK_MESSAGES["too_large"]))
+            yield "data: done\n\n"
+            return
 
         # deal with it if unfinished
         if not get_message:
+            turn_state.cacheable = False
             # yield fallback message
-            yield self._output_to_sse(Message(role="assistant", content="tool call limit exceeded. Please try again."))
+            yield self._output_to_sse(Message(role="assistant", content=FALLBACK_MESSAGES["tool_call_limit"]))
 
         yield "data: done\n\n"
 
+    async def _open_round(self, i: int, context: UIContext, input_list: list, turn_state: TurnState):
+        """Send the request of round i, returns its stream, its settings and when it was sent."""
+        # the whole input is only logged at debug level
+        logger.info(f"Round {i}, {len(input_list)} input items, {turn_state.memory.input_bytes} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Round {i}, inputs sent to openai: {redact_data_urls(input_list)}")
+
+        settings = self._round_settings(turn_state)
+        if self.rate_limiter is not None:
+            # raises RateLimitExceeded
+            await self.rate_limiter.acquire(context.user_id)
+
+        round_start = time.monotonic()
+        response_generator = await self.client.responses.create(
+            model=settings["model"],
+            tools=self.tools,  # list of schemas
+            input=input_list,
+            reasoning={"effort": settings["reasoning_effort"], "summary": "auto"},
+            text={"format": RESPONSE_FORMAT, "verbosity": settings["verbosity"]},
+            stream=True,
+        )
+        return response_generator, settings, round_start
+
+    async def _cancel_round_work(self, tool_run: ToolCallRun | None, next_round: asyncio.Task | None):
+        # the turn ended early, e.g. the client is gone or the memory cap was hit
+        if tool_run is not None:
+            tool_run.cancel()
+        if next_round is None:
+            return
+        if not next_round.done():
+            next_round.cancel()
+            return
+        if not next_round.cancelled() and next_round.exception() is None:
+            response_generator = next_round.result()[0]
+            # the stream of the request sent ahead, it is not read
+            close = getattr(response_generator, "close", None) or getattr(response_generator, "aclose", None)
+            if close is not None:
+                await close()
+
     def parse_final_response(self, final_response: str):
         try:
             parsed_response = LLMFinalResponse.model_validate_json(final_response)
@@ -221,7 +519,19 @@ class Agent(ResponsiveAgent):
         else:
             return parsed_response.content
 
-    def send_openai_response_progress(self, response):
+    def parse_tool_arguments(self, tool_calls: list) -> dict[str, dict]:
+        # call id -> arguments, calls with invalid json are left out and fail when called
+        tool_arguments = {}
+        for tool_call in tool_calls:
+            try:
+                tool_arguments[tool_call.call_id] = json_codec.loads(tool_call.arguments)
+            except ValueError as e:
+                logger.error(f"invalid arguments of {tool_call.name}: {e}")
+        return tool_arguments
+
+    def send_openai_response_progress(
+        self, response, tool_arguments: dict[str, dict], finalized: FormRequest | ChoiceRequest | None = None
+    ):
         for output in response.output:
             if output.type == "reasoning":
                 if output.summary:
@@ -245,60 +555,95 @@ class Agent(ResponsiveAgent):
             elif output.type == "message":
                 for content in output.content:
                     if content.type == "output_text":
+                        if finalized is not None:
+                            # already sent while streamed
+                            finalized = None
+                            continue
                         # check the type
                         final_response_parsed = self.parse_final_response(content.text)
                         yield self._output_to_sse(final_response_parsed)
             elif output.type == "function_call":
                 func_name = output.name
-                arguments = json.loads(output.arguments)
+                arguments = tool_arguments.get(output.call_id, {})
                 tool_call_message = tool_call_progress_message(func_name=func_name, kwargs=arguments)
                 yield self._output_to_sse(ToolCallOutput(content=tool_call_message))
 
     def send_tool_result_progress(self, tool_call_results):
-        # yield tool outputs
+        # yield tool outputs, truncated at the source
         for res in tool_call_results:
-            output_val = res["output"]
-            # simple formatting for display
-            content_str = ""
-            if isinstance(output_val, list):
-                # try to extract text from multimodal content
-                display_parts = []
-                for item in output_val:
-                    if isinstance(item, dict):
-                        if item.get("type") == "input_text":
-                            display_parts.append(item["text"])
-                        elif item.get("type") == "input_image":
-                            display_parts.append("[image]")
-                content_str = "\n".join(display_parts)
-            else:
-                content_str = str(output_val)
-
-            # truncate if too long
-            if len(content_str) > 300:
-                content_str = content_str[:300] + "..."
+            yield self._output_to_sse(ToolResponseOutput(content=f"tool output: {preview_tool_output(res['output'])}"))
 
-            yield self._output_to_sse(ToolResponseOutput(content=f"tool output: {content_str}"))
+    def start_tool_calls(self, tool_calls: list, tool_arguments: dict[str, dict], user_id: str | None) -> ToolCallRun:
+        """Start the tool calls in parallel, they run while the rest of the round is handled."""
+        tool_run = ToolCallRun(len(tool_calls))
 
-    async def trigger_tool_calls(self, tool_calls: list, user_id: str | None = None) -> list[dict]:
-        # trigger tool calls in parallel
-        tasks = []
-        for tool_call in tool_calls:
-            tool_call_name = tool_call.name
-            tool_call_kwargs = json.loads(tool_call.arguments)
-            tasks.append(asyncio.create_task(call_tool(tool_call_name, tool_call_kwargs, user_id)))
-
-        task_results = await asyncio.gather(*tasks, return_exceptions=True)  # will perserve order
-
-        tool_call_results = []
-        for tool_call, task_result in zip(tool_calls, task_results):
-            if isinstance(task_result, Exception):
-                msg = f"error in calling tool. {task_result}"
-            else:
-                msg = task_result
-
-            tool_call_results.append({"type": "function_call_output", "call_id": tool_call.call_id, "output": msg})
-
-        return tool_call_results
+        async def run(index: int, tool_call):
+            try:
+                arguments = tool_arguments.get(tool_call.call_id)
+                if arguments is None:
+                    # raises the parse error of the invalid arguments
+                    arguments = json_codec.loads(tool_call.arguments)
+                if is_expensive(tool_call.name):
+                    async with self.expensive_tool_slots:
+                        output = await self.run_tool(tool_call.name, arguments, user_id, tool_run.progress_queue)
+                else:
+                    output = await self.run_tool(tool_call.name, arguments, user_id, tool_run.progress_queue)
+                if self.attachments is not None:
+                    output = await self.attachments.intern_output(output)
+            except Exception as e:
+                output = f"error in calling tool. {e}"
+            finally:
+                tool_run.progress_queue.put_nowait(None)
+            tool_run.results[index] = {"type": "function_call_output", "call_id": tool_call.call_id, "output": output}
+
+        tool_run.tasks = [asyncio.create_task(run(index, tool_call)) for index, tool_call in enumerate(tool_calls)]
+        return tool_run
+
+    async def run_tool(self, name: str, arguments: dict, user_id: str | None, progress_queue: asyncio.Queue):
+        # tools drafting with sub-agents use the client, model and budgets of the agent. The tool gets its own
+        # copy, the progress messages of the round read the arguments while it runs
+        output = await call_tool(
+            name,
+            copy.deepcopy(arguments),
+            user_id,
+            oai_client=self.client,
+            model=self.model,
+            rate_limiter=self.rate_limiter,
+        )
+        if hasattr(output, "__aiter__"):
+            output = await self.collect_tool_stream(output, progress_queue)
+        return output
+
+    async def wait_tool_calls(self, tool_run: ToolCallRun, tool_call_results: list) -> AsyncGenerator[str, None]:
+        """
+        Wait for the started tool calls, yielding the progress of streaming tools as it arrives.
+        The results are appended to `tool_call_results`, in the order of the calls.
+        """
+        try:
+            running = len(tool_run.tasks)
+            while running:
+                progress = await tool_run.progress_queue.get()
+                if progress is None:
+                    running -= 1
+                    continue
+                yield self._output_to_sse(progress)
+            await asyncio.gather(*tool_run.tasks)
+        finally:
+            tool_run.cancel()
+
+        tool_call_results.extend(tool_run.results)
+
+    async def collect_tool_stream(self, chunks, progress_queue: asyncio.Queue):
+        # the output is assembled once at the end, only bounded previews are forwarded
+        assembler = ToolOutputAssembler()
+        async for chunk in chunks:
+            if isinstance(chunk, ToolProgress):
+                progress_queue.put_nowait(ToolResponseOutput(content=f"tool progress: {chunk.content[:TOOL_PREVIEW_CHARS]}"))
+                continue
+            preview = assembler.add(chunk)
+            if preview:
+                progress_queue.put_nowait(StreamingDisplayEvent(preview))
+        return assembler.output()
 
     def construct_prompt(self, ui_context: UIContext) -> list[dict]:
         # convert context from ui to openai input format
@@ -313,7 +658,7 @@ class Agent(ResponsiveAgent):
                 elif msg.role == "assistant":
                     openai_context.append({"role": "assistant", "content": msg.content})
                 else:
-                    print(f"unsupported role: {msg.role}")
+                    logger.debug(f"unsupported role: {msg.role}")
                     continue
             elif isinstance(msg, FormRequest):
                 # construct form
@@ -352,7 +697,11 @@ class Agent(ResponsiveAgent):
 
         return openai_context
 
-    def _output_to_sse(self, output: Output) -> str:
-        to_yield = f"data: {json.dumps(output.model_dump(), ensure_ascii=False)}\n\n"
-        logger.info(f"to yield: {to_yield}")
+    def _output_to_sse(self, output: Output | DeltaEvent) -> str:
+        if isinstance(output, DeltaEvent):
+            # the per-token events, see delta_events
+            to_yield = output.to_sse()
+        else:
+            to_yield = f"data: {json_codec.dumps(output.model_dump())}\n\n"
+        logger.debug("to yield: %s", to_yield)
         return to_yield
@@ -0,0 +1,47 @@
+"""
+Compact events of the token stream
+
+Every streamed token becomes a `message_delta` or `streaming_display` event. Building, validating and
+dumping a pydantic model per token costs several allocations, so the stream path uses these slotted
+events instead: the json up to the content is encoded once per event type, only the content is encoded
+per token. The frames are identical to the ones of the pydantic models in `schema.py`, which stay the
+schema of these events and the model of every other output.
+
+"""
+
+from typing import ClassVar
+
+from .. import json_codec
+from ..schema import MessageDelta, StreamingDisplayOutput
+
+
+class DeltaEvent:
+    __slots__ = ("content",)
+
+    type: ClassVar[str]
+    # 'data: {"type":"<type>","content":', the frame up to the content
+    frame_prefix: ClassVar[str]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        prefix = json_codec.dumps({"type": cls.type, "content": ""})
+        cls.frame_prefix = "data: " + prefix[: -len('""}')]
+
+    def __init__(self, content: str):
+        self.content = content
+
+    def to_sse(self) -> str:
+        return f"{self.frame_prefix}{json_codec.dumps(self.content)}}}\n\n"
+
+    def model_dump(self) -> dict:
+        return {"type": self.type, "content": self.content}
+
+
+class MessageDeltaEvent(DeltaEvent):
+    __slots__ = ()
+    type = MessageDelta.model_fields["type"].default
+
+
+class StreamingDisplayEvent(DeltaEvent):
+    __slots__ = ()
+    type = StreamingDisplayOutput.model_fields["type"].default
@@ -1,9 +1,22 @@
 # the agent factory
 
 from .agent import Agent
+from .response_cache import ResponseCache
+from .router import TurnRouter
+from .turn_memory import TurnMemoryStats
+from ..rate_limit import RateLimiter
+from ..attachments import AttachmentManager
 from . import oai_client
 
-def create_report_agent():
+def create_report_agent(
+    response_cache: ResponseCache | None = None,
+    cache_replay_realtime: bool = False,
+    router: TurnRouter | None = None,
+    rate_limiter: RateLimiter | None = None,
+    attachments: AttachmentManager | None = None,
+    max_turn_bytes: int | None = None,
+    memory_stats: TurnMemoryStats | None = None,
+):
 
     system_prompt = (
         "You are an expert report writer who is great at generating clean, beautiful HTML reports. "
@@ -21,10 +34,19 @@ def create_report_agent():
         tools=[
             "read_current_report",
             "write_html_report",
+            "read_report_diff",
+            "draft_report_sections",
         ],
         web_search=True,
         reasonging_effort="low",
-        max_round_tool_call=10
+        max_round_tool_call=10,
+        response_cache=response_cache,
+        cache_replay_realtime=cache_replay_realtime,
+        router=router,
+        rate_limiter=rate_limiter,
+        attachments=attachments,
+        max_turn_bytes=max_turn_bytes,
+        memory_stats=memory_stats,
     )
 
     return report_agent
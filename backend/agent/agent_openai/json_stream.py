@@ -0,0 +1,266 @@
+"""
+Incremental json parsing of streamed model output
+
+The model streams json (function call arguments, the structured final response) in arbitrary chunks.
+`StreamingJsonParser` is a small streaming tokenizer: it parses each chunk as it arrives, without
+keeping or re-parsing the text received so far. It only keeps the container stack and the current
+key, subclasses pick the values they need out of it through the `on_*` hooks.
+
+"""
+
+import re
+import json
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+STRING_RUN = re.compile(r'[^"\\]+')
+SCALAR_CHARS = set("0123456789+-.eEtrufalsn")
+
+
+class StreamingJsonParser:
+    def __init__(self):
+        # container stack, [kind, key] for objects and [kind, index] for arrays
+        self._stack: list[list] = []
+        self._state = "value"
+        self._buffer = ""
+        self._escape: str | None = None
+        self._pending_surrogate: str | None = None
+
+    def feed(self, text: str) -> list:
+        """Parse the next chunk, returns what the hooks appended to `out` for it."""
+        out: list = []
+        i = 0
+        length = len(text)
+        while i < length:
+            state = self._state
+            char = text[i]
+
+            if state == "string" or state == "key":
+                if self._escape is not None:
+                    i = self._feed_escape(text, i, out)
+                    continue
+                if char == "\\":
+                    self._escape = ""
+                    i += 1
+                    continue
+                if char == '"':
+                    i += 1
+                    if state == "key":
+                        self._stack[-1][1] = self._buffer
+                        self._buffer = ""
+                        self._state = "colon"
+                    else:
+                        self.on_string_end(out)
+                        self._end_value()
+                    continue
+                run = STRING_RUN.match(text, i)
+                self._on_fragment(run.group(), out)
+                i = run.end()
+                continue
+
+            if state == "scalar":
+                if char in SCALAR_CHARS:
+                    self._buffer += char
+                    i += 1
+                    continue
+                self.on_scalar(self._buffer)
+                self._buffer = ""
+                self._end_value()
+                # the char ending the scalar is handled by the next state
+                continue
+
+            i += 1
+            if char in " \t\r\n":
+                continue
+
+            if state == "value" or state == "value_or_end":
+                if state == "value_or_end" and char == "]":
+                    self._close(out)
+                elif char == "{":
+                    self._open("object", None)
+                    self._state = "key_or_end"
+                elif char == "[":
+                    self._open("array", 0)
+                    self._state = "value_or_end"
+                elif char == '"':
+                    self._state = "string"
+                else:
+                    self._buffer = char
+                    self._state = "scalar"
+            elif state == "key_or_end":
+                if char == '"':
+                    self._state = "key"
+                elif char == "}":
+                    self._close(out)
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value"
+            elif state == "after_value":
+                if char == ",":
+                    top = self._stack[-1]
+                    if top[0] == "array":
+                        top[1] += 1
+                        self._state = "value"
+                    else:
+                        self._state = "key_or_end"
+                elif char in "}]":
+                    self._close(out)
+            # "done": trailing characters are ignored
+
+        return out
+
+    # hooks, called with the stack positioned at the value
+
+    def on_open(self):
+        """A container was opened, it is on top of the stack."""
+
+    def on_string(self, fragment: str, out: list):
+        """The next decoded fragment of a string value."""
+
+    def on_string_end(self, out: list):
+        """The string value is complete."""
+
+    def on_scalar(self, raw: str):
+        """A number, boolean or null, as its raw json text."""
+
+    def on_close(self, out: list):
+        """The container on top of the stack is complete, it is popped after the hook."""
+
+    def _feed_escape(self, text: str, i: int, out: list) -> int:
+        # escapes may be split across chunks, \uXXXX is collected char by char
+        self._escape += text[i]
+        escape = self._escape
+        if escape[0] == "u":
+            if len(escape) < 5:
+                return i + 1
+            decoded = chr(int(escape[1:], 16))
+        else:
+            decoded = ESCAPES.get(escape, escape)
+        self._escape = None
+
+        if self._pending_surrogate is not None:
+            decoded = (self._pending_surrogate + decoded).encode("utf-16", "surrogatepass").decode("utf-16")
+            self._pending_surrogate = None
+        elif "\ud800" <= decoded <= "\udbff":
+            # high surrogate, wait for its low half
+            self._pending_surrogate = decoded
+            return i + 1
+
+        self._on_fragment(decoded, out)
+        return i + 1
+
+    def _on_fragment(self, fragment: str, out: list):
+        if self._state == "key":
+            self._buffer += fragment
+        else:
+            self.on_string(fragment, out)
+
+    def _open(self, kind: str, key_or_index):
+        self._stack.append([kind, key_or_index])
+        self.on_open()
+
+    def _close(self, out: list):
+        self.on_close(out)
+        self._stack.pop()
+        self._end_value()
+
+    def _end_value(self):
+        self._state = "after_value" if self._stack else "done"
+
+
+class FinalResponseParser(StreamingJsonParser):
+    """
+    Incremental parser of the LLMFinalResponse json, `{"type": .., "content": {"content": ..}}`.
+
+    `feed` returns the events of the chunk:
+    - ("text", fragment): the next fragment of the message text, for responses of type "message"
+    - ("form_row", index, row): a completed row of a form request, as a dict
+    - ("choice_option", index, option): a completed option of a choice request
+    - ("final", content): the completed content of a form or choice request, as a dict
+
+    Form and choice contents are small, they are built while streamed so that they need not be parsed
+    again once the response completes. The message text is never kept.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.type = ""
+        self._type_complete = False
+        # message text streamed before the type, only if the model wrote the keys out of order
+        self._pending: list[str] = []
+        # the containers of the form or choice content being built, from the content object down
+        self._values: list = []
+        self._string: list[str] = []
+
+    @property
+    def _building(self) -> bool:
+        return bool(self._values)
+
+    def on_open(self):
+        stack = self._stack
+        if self._building:
+            container = {} if stack[-1][0] == "object" else []
+            self._set_value(container)
+            self._values.append(container)
+        elif (
+            len(stack) == 2
+            and stack[0][1] == "content"
+            and stack[1][0] == "object"
+            and self._type_complete
+            and self.type != "message"
+        ):
+            # the content of a form or choice request, only if the type came first
+            self._values.append({})
+
+    def on_string(self, fragment: str, out: list):
+        stack = self._stack
+        if self._building:
+            self._string.append(fragment)
+        elif len(stack) == 1 and stack[0][1] == "type":
+            self.type += fragment
+        elif len(stack) == 2 and stack[0][1] == "content" and stack[1][0] == "object" and stack[1][1] == "content":
+            if self._type_complete:
+                if self.type == "message":
+                    out.append(("text", fragment))
+            else:
+                self._pending.append(fragment)
+
+    def on_string_end(self, out: list):
+        stack = self._stack
+        if self._building:
+            value = "".join(self._string)
+            self._string = []
+            self._set_value(value)
+            if len(stack) == 3 and stack[1][1] == "options" and stack[2][0] == "array":
+                out.append(("choice_option", stack[2][1], value))
+        elif len(stack) == 1 and stack[0][1] == "type":
+            self._type_complete = True
+            if self.type == "message":
+                out.extend(("text", fragment) for fragment in self._pending)
+            self._pending = []
+
+    def on_scalar(self, raw: str):
+        if self._building:
+            try:
+                self._set_value(json.loads(raw))
+            except ValueError:
+                # not valid json, the content is left to the validation of the completed response
+                self._values = []
+
+    def on_close(self, out: list):
+        if not self._building:
+            return
+        stack = self._stack
+        container = self._values.pop()
+        if len(stack) == 2:
+            out.append(("final", container))
+        elif len(stack) == 4 and stack[1][1] == "rows" and stack[2][0] == "array" and stack[3][0] == "object":
+            out.append(("form_row", stack[2][1], container))
+
+    def _set_value(self, value):
+        # into the innermost container being built, at its current key or index
+        parent = self._values[-1]
+        kind, key = self._stack[len(self._values)]
+        if kind == "object":
+            parent[key] = value
+        else:
+            parent.append(value)
@@ -0,0 +1,119 @@
+"""
+Live preview of report writes
+
+While the model streams the arguments of a `write_html_report` call, the `changes` array is parsed
+incrementally, chunk by chunk, without re-parsing the arguments received so far. Every time the
+`change_to` string of a change grows, the new text is emitted as a provisional patch, so the frontend
+can render the report before the call completes.
+
+"""
+
+import json
+
+from ..schema import ReportPreviewDelta
+from .json_stream import StreamingJsonParser
+
+PREVIEW_TOOL_NAME = "write_html_report"
+
+
+class ChangesArgumentParser(StreamingJsonParser):
+    """
+    Incremental parser of `{"changes": [{"start_line": .., "end_line": .., "change_to": ".."}, ...]}`.
+
+    Keeps the line ranges of the changes collected so far, `feed` returns the (change index, appended text)
+    pairs of the chunk. The text of a change is only kept until its consumer clears it. The indexes of the
+    changes whose line range became complete are collected in `placed` until the consumer clears them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.changes: list[dict] = []
+        self.placed: list[int] = []
+
+    def on_open(self):
+        index = self._change_index()
+        if self._stack[-1][0] == "object" and index is not None and len(self._stack) == 3:
+            while len(self.changes) <= index:
+                self.changes.append({"start_line": None, "end_line": None, "change_to": ""})
+
+    def _change_index(self) -> int | None:
+        # index of the change being parsed, if inside {"changes": [{...}]}
+        stack = self._stack
+        if len(stack) >= 2 and stack[0][1] == "changes" and stack[1][0] == "array":
+            return stack[1][1]
+        return None
+
+    def _change_field(self) -> tuple[int, str] | None:
+        if len(self._stack) != 3 or self._stack[2][0] != "object":
+            return None
+        index = self._change_index()
+        if index is None or index >= len(self.changes):
+            return None
+        return index, self._stack[2][1]
+
+    def on_string(self, fragment: str, out: list[tuple[int, str]]):
+        field = self._change_field()
+        if field is None or field[1] != "change_to":
+            return
+        index = field[0]
+        self.changes[index]["change_to"] += fragment
+        if out and out[-1][0] == index:
+            out[-1] = (index, out[-1][1] + fragment)
+        else:
+            out.append((index, fragment))
+
+    def on_scalar(self, raw: str):
+        field = self._change_field()
+        if field is None or field[1] not in ("start_line", "end_line"):
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        if isinstance(value, int):
+            change = self.changes[field[0]]
+            change[field[1]] = value
+            if change["start_line"] is not None and change["end_line"] is not None:
+                self.placed.append(field[0])
+
+
+class ReportPreviewTracker:
+    # follows the function calls of one response, keyed by their output index
+    def __init__(self):
+        self._calls: dict = {}
+
+    def add_item(self, output_index, item):
+        if getattr(item, "type", None) == "function_call" and getattr(item, "name", None) == PREVIEW_TOOL_NAME:
+            self._calls[output_index] = (getattr(item, "call_id", ""), ChangesArgumentParser())
+
+    def feed(self, output_index, arguments_delta: str) -> list[ReportPreviewDelta]:
+        call = self._calls.get(output_index)
+        if call is None:
+            return []
+
+        call_id, parser = call
+        updated = [index for index, _ in parser.feed(arguments_delta)]
+        # the keys may come in any order, text streamed before the line range is emitted once it is complete
+        updated += [index for index in parser.placed if index not in updated]
+        parser.placed.clear()
+
+        previews = []
+        for index in updated:
+            change = parser.changes[index]
+            # a change without its line range cannot be placed yet, its text is kept until then
+            if change["start_line"] is None or change["end_line"] is None or not change["change_to"]:
+                continue
+            # the text not emitted yet, emitted text is not kept, a report write is previewed without
+            # holding the whole report
+            content = change["change_to"]
+            change["change_to"] = ""
+            previews.append(
+                ReportPreviewDelta(
+                    call_id=call_id,
+                    index=index,
+                    start_line=change["start_line"],
+                    end_line=change["end_line"],
+                    content=content,
+                )
+            )
+        return previews
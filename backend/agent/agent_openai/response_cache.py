@@ -0,0 +1,109 @@
+"""
+Exact-match response cache
+
+A turn is keyed on a canonical hash of the constructed prompt, the model config and the state of the
+tools it may read (e.g. the report content version). The recorded sse frames are stored with their
+time offsets, so a hit can be replayed instantly or at the original stream speed.
+
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import AsyncGenerator
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(key_parts: dict) -> str:
+    """Canonical hash of the key parts, dict ordering and whitespace do not matter."""
+    canonical = json.dumps(key_parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TurnRecorder:
+    # records the sse frames of a running turn together with their offsets from the turn start
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.frames: list[tuple[float, str]] = []
+
+    def record(self, frame: str):
+        self.frames.append((time.monotonic() - self.started_at, frame))
+
+
+class CachedTurn:
+    def __init__(self, frames: list[tuple[float, str]], created_at: float):
+        self.frames = frames
+        self.created_at = created_at
+        self.size = sum(len(frame) for _, frame in frames)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: OrderedDict[str, CachedTurn] = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CachedTurn | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if time.monotonic() - entry.created_at > self.ttl_seconds:
+            # expired
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        # mark as most recently used
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, frames: list[tuple[float, str]]):
+        entry = CachedTurn(frames=frames, created_at=time.monotonic())
+        if entry.size > self.max_bytes:
+            logger.info(f"response cache: turn too large to cache ({entry.size} bytes)")
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+
+        # evict the least recently used entries
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    async def replay(self, entry: CachedTurn, realtime: bool = False) -> AsyncGenerator[str, None]:
+        """Yield the recorded frames, either instantly or with the recorded pacing."""
+        started_at = time.monotonic()
+        for offset, frame in entry.frames:
+            if realtime:
+                delay = offset - (time.monotonic() - started_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield frame
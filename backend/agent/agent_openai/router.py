@@ -0,0 +1,170 @@
+"""
+Per-turn model routing
+
+Classifies a turn from the shape of its UIContext and the report state, with cheap heuristics only, and
+picks the model, reasoning effort and verbosity for its rounds. E.g. answering a choice or a form does not
+need the same reasoning effort as writing a report from a fresh request. Switching the model of a turn is
+opt-in, see FAST_ANSWER_ROUTES.
+
+The model is chosen once per turn, reasoning items of one model are not accepted by another. Reasoning
+effort and verbosity may change from round to round, e.g. the round after a report write only has to
+notify the user.
+
+Every round is recorded with its routing decision, latency and token usage, `stats` aggregates them per
+turn class and model for tuning the routes. The report head and the log file are read and written off the
+event loop.
+
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import statistics
+from collections import deque
+from pathlib import Path
+
+from ..schema import UIContext, Message, FormResult, ChoiceResult
+from ..report_store import get_report_store
+
+logger = logging.getLogger(__name__)
+
+FAST_MODEL = "gpt-5-mini"
+
+# turn class -> settings overriding the agent's own model, reasoning effort and verbosity
+DEFAULT_ROUTES = {
+    # first request, the agent is expected to ask clarifying questions
+    "clarify": {"verbosity": "low"},
+    # the answer may complete the requirements, the whole turn up to the report write follows
+    "choice_answer": {},
+    "form_answer": {},
+    # the requirements are clarified and the report is still empty, the report gets written with the
+    # baseline reasoning effort
+    "new_report": {"reasoning_effort": "low"},
+    "edit": {},
+}
+
+# opt-in: answers run on the fast model, for deployments where answering mostly leads to another
+# clarifying question rather than the report write
+FAST_ANSWER_ROUTES = {
+    **DEFAULT_ROUTES,
+    "choice_answer": {"model": FAST_MODEL},
+    "form_answer": {"model": FAST_MODEL},
+}
+
+# settings for the rounds after a round which only wrote the report, the agent only notifies the user
+AFTER_WRITE_ROUND = {"reasoning_effort": "low", "verbosity": "low"}
+WRITE_TOOLS = ["write_html_report", "draft_report_sections"]
+
+
+class RouteDecision:
+    def __init__(self, turn_class: str, settings: dict):
+        self.turn_id = uuid.uuid4().hex
+        self.turn_class = turn_class
+        self.settings = settings
+
+    def to_dict(self) -> dict:
+        return {"turn_id": self.turn_id, "turn_class": self.turn_class, "settings": self.settings}
+
+
+class TurnRouter:
+    def __init__(
+        self,
+        routes: dict[str, dict] | None = None,
+        after_write_round: dict | None = None,
+        log_path: Path | None = None,
+        max_records: int = 10000,
+    ):
+        self.routes = routes if routes is not None else DEFAULT_ROUTES
+        self.after_write_round = after_write_round if after_write_round is not None else AFTER_WRITE_ROUND
+        # recent round records in memory, all of them appended to the log file if given
+        self.records: deque[dict] = deque(maxlen=max_records)
+        self.log_path = Path(log_path) if log_path else None
+        # records of concurrent turns are appended from worker threads
+        self._log_lock = threading.Lock()
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def config_key(self) -> dict:
+        # part of the response cache key, a different routing table gives different responses
+        return {"routes": self.routes, "after_write_round": self.after_write_round}
+
+    def classify(self, context: UIContext) -> str:
+        last = context.context[-1] if context.context else None
+        if isinstance(last, ChoiceResult):
+            return "choice_answer"
+        if isinstance(last, FormResult):
+            return "form_answer"
+
+        if get_report_store().read_head(context.user_id).exists:
+            return "edit"
+
+        # no answer from the agent yet, it will clarify the requirements first
+        has_assistant_turn = any(
+            not isinstance(item, Message) or item.role == "assistant" for item in context.context
+        )
+        return "new_report" if has_assistant_turn else "clarify"
+
+    async def route_turn(self, context: UIContext) -> RouteDecision:
+        # classify reads the report head, a file or database read
+        turn_class = await asyncio.to_thread(self.classify, context)
+        decision = RouteDecision(turn_class, dict(self.routes.get(turn_class, {})))
+        logger.info(f"routing decision: {decision.to_dict()}")
+        return decision
+
+    def route_round(self, decision: RouteDecision, defaults: dict, previous_tool_names: list[str]) -> dict:
+        """Settings of the next round, `defaults` are the agent's own settings."""
+        settings = {**defaults, **decision.settings}
+        if previous_tool_names and all(name in WRITE_TOOLS for name in previous_tool_names):
+            # the model stays, see the module docstring
+            settings.update({key: value for key, value in self.after_write_round.items() if key != "model"})
+        return settings
+
+    async def record_round(self, decision: RouteDecision, round_index: int, settings: dict, seconds: float, usage=None, tool_names: list[str] | None = None):
+        record = {
+            "time": time.time(),
+            "turn_id": decision.turn_id,
+            "turn_class": decision.turn_class,
+            "round": round_index,
+            "model": settings["model"],
+            "reasoning_effort": settings["reasoning_effort"],
+            "verbosity": settings["verbosity"],
+            "seconds": round(seconds, 3),
+            "input_tokens": getattr(usage, "input_tokens", None),
+            "output_tokens": getattr(usage, "output_tokens", None),
+            "tool_calls": tool_names or [],
+        }
+        self.records.append(record)
+        if self.log_path is not None:
+            await asyncio.to_thread(self._append_record, record)
+
+    def _append_record(self, record: dict):
+        try:
+            with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"failed to write routing record: {e}")
+
+    def stats(self) -> dict:
+        # per turn class and model: turns, rounds and latencies of the recorded rounds
+        groups: dict[tuple[str, str], list[dict]] = {}
+        for record in self.records:
+            groups.setdefault((record["turn_class"], record["model"]), []).append(record)
+
+        stats = {}
+        for (turn_class, model), records in groups.items():
+            round_seconds = [record["seconds"] for record in records]
+            turn_seconds: dict[str, float] = {}
+            for record in records:
+                turn_seconds[record["turn_id"]] = turn_seconds.get(record["turn_id"], 0.0) + record["seconds"]
+            output_tokens = [record["output_tokens"] for record in records if record["output_tokens"] is not None]
+            stats.setdefault(turn_class, {})[model] = {
+                "turns": len(turn_seconds),
+                "rounds": len(records),
+                "round_seconds_p50": round(statistics.median(round_seconds), 3),
+                "turn_seconds_mean": round(statistics.mean(turn_seconds.values()), 3),
+                "output_tokens_mean": round(statistics.mean(output_tokens), 1) if output_tokens else None,
+            }
+        return stats
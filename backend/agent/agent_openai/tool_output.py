@@ -0,0 +1,74 @@
+"""
+Tool outputs, as sent to the model and as previewed to the user
+
+The user only sees a bounded preview of each tool output, it is cut at the source: text parts are
+collected only until the preview is full, the output itself is never stringified or joined for display.
+Streamed tool outputs are collected chunk by chunk and joined into the model-facing output once.
+
+"""
+
+# characters of a tool output shown to the user
+TOOL_PREVIEW_CHARS = 300
+
+
+def preview_tool_output(output, limit: int = TOOL_PREVIEW_CHARS) -> str:
+    if isinstance(output, str):
+        return output[:limit] + "..." if len(output) > limit else output
+
+    if isinstance(output, list):
+        # text of multimodal content, until the preview is full
+        display_parts = []
+        length = 0
+        for item in output:
+            if length > limit:
+                break
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") == "input_text":
+                text = item["text"][: limit + 1]
+            elif item.get("type") == "input_image":
+                text = "[image]"
+            else:
+                continue
+            display_parts.append(text)
+            length += len(text) + 1
+        return preview_tool_output("\n".join(display_parts), limit)
+
+    return preview_tool_output(str(output), limit)
+
+
+class ToolOutputAssembler:
+    """Collects the chunks of a streaming tool, text (str) or content parts (dict)."""
+
+    def __init__(self, preview_limit: int = TOOL_PREVIEW_CHARS):
+        self.preview_remaining = preview_limit
+        # content parts, consecutive text chunks are kept as a list of strings until the output is built
+        self._parts: list[dict | list[str]] = []
+
+    def add(self, chunk) -> str:
+        """Add an output chunk, returns the part of it to preview, empty once the preview budget is spent."""
+        if isinstance(chunk, dict):
+            self._parts.append(chunk)
+            text = "[image]" if chunk.get("type") == "input_image" else chunk.get("text", "")
+        else:
+            text = str(chunk)
+            if self._parts and isinstance(self._parts[-1], list):
+                self._parts[-1].append(text)
+            else:
+                self._parts.append([text])
+
+        if self.preview_remaining <= 0:
+            return ""
+        preview = text[: self.preview_remaining]
+        self.preview_remaining -= len(preview)
+        return preview
+
+    def output(self) -> str | list[dict]:
+        # plain text output unless the tool streamed content parts
+        if not self._parts:
+            return ""
+        if len(self._parts) == 1 and isinstance(self._parts[0], list):
+            return "".join(self._parts[0])
+        return [
+            {"type": "input_text", "text": "".join(part)} if isinstance(part, list) else part for part in self._parts
+        ]
@@ -0,0 +1,112 @@
+"""
+Memory held by a turn
+
+A turn holds the input items of its next request, which grow round by round, and the output of the
+round being streamed. The input keeps compact items only, the fields the next request needs instead of
+the full response objects, and the round output is accounted by the bytes received.
+
+A turn over its byte cap is ended instead of growing further. The peak bytes of finished turns are
+aggregated, so the number of concurrent streams a worker can hold can be estimated from them.
+
+"""
+
+import logging
+import statistics
+from collections import deque
+
+from .. import json_codec
+
+logger = logging.getLogger(__name__)
+
+GIB = 1024**3
+
+
+def compact_input_item(item) -> dict:
+    """The input item for the next request from an output item of a response."""
+    if isinstance(item, dict):
+        return item
+
+    item_type = getattr(item, "type", None)
+    if item_type == "function_call":
+        compact = {"type": "function_call", "call_id": item.call_id, "name": item.name, "arguments": item.arguments}
+    elif item_type == "reasoning":
+        compact = {
+            "type": "reasoning",
+            "summary": [{"type": "summary_text", "text": summary.text} for summary in item.summary or []],
+        }
+        if getattr(item, "encrypted_content", None):
+            compact["encrypted_content"] = item.encrypted_content
+    else:
+        return item.model_dump(exclude_none=True, warnings=False)
+
+    # reasoning items are matched with the items following them by id
+    item_id = getattr(item, "id", None)
+    if item_id:
+        compact["id"] = item_id
+    return compact
+
+
+def item_bytes(item) -> int:
+    return len(json_codec.dumps(item).encode("utf-8"))
+
+
+class TurnMemory:
+    def __init__(self, max_bytes: int | None = None):
+        # None is no cap
+        self.max_bytes = max_bytes
+        self.input_bytes = 0
+        self.stream_bytes = 0
+        self.peak_bytes = 0
+        self.rounds = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self.input_bytes + self.stream_bytes
+
+    @property
+    def exceeded(self) -> bool:
+        return self.max_bytes is not None and self.current_bytes > self.max_bytes
+
+    def add_input(self, items: list):
+        self.input_bytes += sum(item_bytes(item) for item in items)
+        self._update_peak()
+
+    def set_stream(self, stream_bytes: int):
+        self.stream_bytes = stream_bytes
+        self._update_peak()
+
+    def end_round(self):
+        # the round output is either released or added to the input by now
+        self.stream_bytes = 0
+        self.rounds += 1
+
+    def _update_peak(self):
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes)
+
+
+class TurnMemoryStats:
+    # peak bytes of recent turns, shared between agents
+    def __init__(self, max_records: int = 1000):
+        self.peaks: deque[int] = deque(maxlen=max_records)
+        self.capped_turns = 0
+
+    def record(self, memory: TurnMemory):
+        self.peaks.append(memory.peak_bytes)
+        if memory.exceeded:
+            self.capped_turns += 1
+
+    def stats(self) -> dict:
+        if not self.peaks:
+            return {"turns": 0, "capped_turns": self.capped_turns}
+
+        peaks = sorted(self.peaks)
+        p95 = peaks[min(len(peaks) - 1, int(len(peaks) * 0.95))]
+        return {
+            "turns": len(peaks),
+            "capped_turns": self.capped_turns,
+            "peak_bytes_p50": int(statistics.median(peaks)),
+            "peak_bytes_p95": p95,
+            "peak_bytes_max": peaks[-1],
+            # concurrent streams per GiB of turn state, at the p95 peak
+            "streams_per_gib": GIB // max(p95, 1),
+        }
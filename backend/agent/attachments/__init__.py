@@ -0,0 +1,36 @@
+import os
+from pathlib import Path
+
+from .file_store import FileStore, LocalFileStore, OpenAIFileStore, content_hash
+from .manager import AttachmentManager, redact_data_urls
+
+# project_root/temp/files/
+DEFAULT_FILES_DIR = Path(__file__).parent.parent.parent.parent / "temp" / "files"
+
+
+def create_attachment_manager(oai_client=None) -> AttachmentManager | None:
+    """
+    Create the attachment manager configured by IMAGE_STORE: "off" (images stay inline), "openai" (the
+    provider's files api) or "local" (a stand-in at IMAGE_STORE_PATH, only for development and tests).
+    """
+    backend = os.getenv("IMAGE_STORE", "off")
+    if backend == "off":
+        return None
+    elif backend == "openai":
+        return AttachmentManager(OpenAIFileStore(oai_client))
+    elif backend == "local":
+        path = os.getenv("IMAGE_STORE_PATH")
+        return AttachmentManager(LocalFileStore(Path(path) if path else DEFAULT_FILES_DIR))
+    else:
+        raise ValueError(f"unknown image store: {backend}")
+
+
+__all__ = [
+    "FileStore",
+    "LocalFileStore",
+    "OpenAIFileStore",
+    "AttachmentManager",
+    "content_hash",
+    "redact_data_urls",
+    "create_attachment_manager",
+]
@@ -0,0 +1,67 @@
+"""
+File stores for attachments sent to the model
+
+Images are uploaded once and referenced by file id in the model input afterwards. `OpenAIFileStore`
+uploads to the provider's files API, `LocalFileStore` is a local stand-in with the same interface, for
+development and tests with the fake client.
+
+"""
+
+import json
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+MIME_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+
+class FileStore(ABC):
+    @abstractmethod
+    async def upload(self, data: bytes, mime_type: str, content_hash: str) -> str:
+        """Store the file and return its file id."""
+        raise NotImplementedError
+
+
+class LocalFileStore(FileStore):
+    def __init__(self, files_dir: Path):
+        self.files_dir = files_dir
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+
+    async def upload(self, data: bytes, mime_type: str, content_hash: str) -> str:
+        # the id is derived from the content, uploading the same file again is a no-op
+        file_id = f"file-{content_hash[:32]}"
+        path = self._path(file_id, mime_type)
+        if not path.exists():
+            await asyncio.to_thread(self._write, path, data, mime_type)
+        return file_id
+
+    def read(self, file_id: str) -> tuple[bytes, str] | None:
+        meta_path = self.files_dir / f"{file_id}.json"
+        if not meta_path.exists():
+            return None
+        mime_type = json.loads(meta_path.read_text(encoding="utf-8"))["mime_type"]
+        return self._path(file_id, mime_type).read_bytes(), mime_type
+
+    def _path(self, file_id: str, mime_type: str) -> Path:
+        return self.files_dir / f"{file_id}{MIME_EXTENSIONS.get(mime_type, '.bin')}"
+
+    def _write(self, path: Path, data: bytes, mime_type: str):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        (self.files_dir / f"{path.stem}.json").write_text(json.dumps({"mime_type": mime_type}), encoding="utf-8")
+
+
+class OpenAIFileStore(FileStore):
+    def __init__(self, oai_client):
+        self.client = oai_client
+
+    async def upload(self, data: bytes, mime_type: str, content_hash: str) -> str:
+        filename = f"{content_hash[:32]}{MIME_EXTENSIONS.get(mime_type, '.bin')}"
+        uploaded = await self.client.files.create(file=(filename, data, mime_type), purpose="vision")
+        return uploaded.id
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,113 @@
+"""
+Image deduplication for the model input
+
+Tools return images as data urls in `input_image` parts. Kept as they are, every following round of the
+turn resends and holds the whole base64 payload. The attachment manager uploads each image once, keyed
+by its content hash, and replaces the part by a file id reference, so the size of the input stays flat
+no matter how many rounds carry the image.
+
+"""
+
+import re
+import base64
+import asyncio
+import logging
+from collections import OrderedDict
+
+from .file_store import FileStore, content_hash
+
+logger = logging.getLogger(__name__)
+
+DATA_URL = re.compile(r"data:([\w.+-]+/[\w.+-]+);base64,", re.ASCII)
+
+
+class AttachmentManager:
+    def __init__(self, file_store: FileStore, max_entries: int = 10000):
+        self.file_store = file_store
+        self.max_entries = max_entries
+        # content hash -> file id, recently used last
+        self._file_ids: OrderedDict[str, str] = OrderedDict()
+        self._uploads: dict[str, asyncio.Future] = {}
+
+        self.uploaded_bytes = 0
+        self.dedup_hits = 0
+
+    async def intern_output(self, output):
+        """Replace the data url images of a tool output by file id references."""
+        if not isinstance(output, list):
+            return output
+        return [await self._intern_part(part) for part in output]
+
+    async def _intern_part(self, part):
+        if not isinstance(part, dict) or part.get("type") != "input_image":
+            return part
+        image_url = part.get("image_url")
+        if not isinstance(image_url, str):
+            return part
+        match = DATA_URL.match(image_url)
+        if match is None:
+            return part
+
+        data = base64.b64decode(image_url[match.end() :])
+        file_id = await self.upload(data, match.group(1))
+        referenced = {key: value for key, value in part.items() if key != "image_url"}
+        referenced["file_id"] = file_id
+        return referenced
+
+    async def upload(self, data: bytes, mime_type: str) -> str:
+        digest = content_hash(data)
+        file_id = self._file_ids.get(digest)
+        if file_id is not None:
+            self._file_ids.move_to_end(digest)
+            self.dedup_hits += 1
+            return file_id
+
+        # concurrent uploads of the same image share one upload
+        pending = self._uploads.get(digest)
+        if pending is not None:
+            self.dedup_hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # the uploading task was cancelled, not this one, upload it here instead
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.upload(data, mime_type)
+                raise
+
+        pending = asyncio.get_running_loop().create_future()
+        self._uploads[digest] = pending
+        try:
+            file_id = await self.file_store.upload(data, mime_type, digest)
+            pending.set_result(file_id)
+        except Exception as e:
+            pending.set_exception(e)
+            # retrieved here, so that a failed upload without concurrent waiters is not reported as unhandled
+            pending.exception()
+            raise
+        finally:
+            del self._uploads[digest]
+            # e.g. the uploading task was cancelled, the waiters must not hang
+            if not pending.done():
+                pending.cancel()
+
+        self.uploaded_bytes += len(data)
+        logger.info(f"uploaded image {digest[:12]} ({mime_type}, {len(data)} bytes) as {file_id}")
+
+        self._file_ids[digest] = file_id
+        while len(self._file_ids) > self.max_entries:
+            self._file_ids.popitem(last=False)
+        return file_id
+
+
+def redact_data_urls(value):
+    """Copy of a json-like value for logging, with the base64 payload of data urls left out."""
+    if isinstance(value, str):
+        match = DATA_URL.match(value)
+        if match is None:
+            return value
+        return f"<{match.group(1)} data url, {len(value) - match.end()} base64 chars>"
+    if isinstance(value, dict):
+        return {key: redact_data_urls(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact_data_urls(item) for item in value]
+    return value
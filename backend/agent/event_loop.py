@@ -0,0 +1,33 @@
+"""
+Event loop of the service and the batch runner
+
+uvloop is used when it is installed, EVENT_LOOP ("auto", "uvloop" or "asyncio") picks one explicitly.
+
+"""
+
+import os
+import asyncio
+import logging
+from typing import Callable
+
+try:
+    import uvloop
+except ImportError:  # optional dependency, not available on windows
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+
+def event_loop_name(name: str | None = None) -> str:
+    name = name or os.getenv("EVENT_LOOP", "auto")
+    if name == "auto":
+        return "uvloop" if uvloop is not None else "asyncio"
+    if name == "uvloop" and uvloop is None:
+        logger.warning("uvloop is not installed, using asyncio")
+        return "asyncio"
+    return name
+
+
+def event_loop_factory(name: str | None = None) -> Callable[[], asyncio.AbstractEventLoop] | None:
+    # for asyncio.run(..., loop_factory=...), None is the default loop
+    return uvloop.new_event_loop if event_loop_name(name) == "uvloop" else None
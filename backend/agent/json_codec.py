@@ -0,0 +1,52 @@
+"""
+JSON encoding of the streaming hot path
+
+Every SSE frame of a turn is encoded here, and every function call's arguments are decoded here. orjson
+is used when it is installed, stdlib json otherwise, JSON_BACKEND ("auto", "orjson" or "json") picks one
+explicitly. Both write compact UTF-8 JSON, so the frames only differ in speed.
+
+"""
+
+import os
+import json
+import logging
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode("utf-8")
+
+
+BACKENDS: dict[str, tuple[Callable[[Any], str], Callable[[str | bytes], Any]]] = {"json": (_json_dumps, json.loads)}
+if orjson is not None:
+    BACKENDS["orjson"] = (_orjson_dumps, orjson.loads)
+
+backend = ""
+dumps: Callable[[Any], str] = _json_dumps
+loads: Callable[[str | bytes], Any] = json.loads
+
+
+def use_backend(name: str = "auto"):
+    """Switch the encoder and decoder of the module, "auto" prefers orjson."""
+    global backend, dumps, loads
+    if name == "auto":
+        name = "orjson" if "orjson" in BACKENDS else "json"
+    if name not in BACKENDS:
+        logger.warning(f"json backend {name} is not available, using json")
+        name = "json"
+    backend = name
+    dumps, loads = BACKENDS[name]
+
+
+use_backend(os.getenv("JSON_BACKEND", "auto"))
@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+
+from .base import RateLimitBackend, RateLimitExceeded, Bucket, BucketCharge
+from .memory import MemoryRateLimitBackend
+from .sqlite_backend import SqliteRateLimitBackend
+from .limiter import RateLimiter
+
+# project_root/temp/rate_limits.db
+DEFAULT_RATE_LIMIT_DB = Path(__file__).parent.parent.parent.parent / "temp" / "rate_limits.db"
+
+RATE_LIMIT_ENV = {
+    "user_requests_per_minute": "RATE_LIMIT_USER_RPM",
+    "user_tokens_per_minute": "RATE_LIMIT_USER_TPM",
+    "global_requests_per_minute": "RATE_LIMIT_GLOBAL_RPM",
+    "global_tokens_per_minute": "RATE_LIMIT_GLOBAL_TPM",
+}
+
+
+def create_rate_limit_backend(backend: str | None = None, path: str | None = None) -> RateLimitBackend:
+    backend = backend or os.getenv("RATE_LIMIT_BACKEND", "memory")
+    path = path or os.getenv("RATE_LIMIT_DB_PATH")
+
+    if backend == "memory":
+        return MemoryRateLimitBackend()
+    elif backend == "sqlite":
+        return SqliteRateLimitBackend(Path(path) if path else DEFAULT_RATE_LIMIT_DB)
+    else:
+        raise ValueError(f"unknown rate limit backend: {backend}")
+
+
+def create_rate_limiter() -> RateLimiter | None:
+    """
+    Create the rate limiter configured by RATE_LIMIT_USER_RPM, RATE_LIMIT_USER_TPM, RATE_LIMIT_GLOBAL_RPM
+    and RATE_LIMIT_GLOBAL_TPM, None if no limit is set. The buckets are kept by RATE_LIMIT_BACKEND
+    ("memory" or "sqlite", at RATE_LIMIT_DB_PATH).
+    """
+    limits = {name: float(os.environ[env]) for name, env in RATE_LIMIT_ENV.items() if os.getenv(env)}
+    if not limits:
+        return None
+
+    return RateLimiter(
+        create_rate_limit_backend(),
+        max_wait_seconds=float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60")),
+        **limits,
+    )
+
+
+__all__ = [
+    "RateLimitBackend",
+    "RateLimitExceeded",
+    "Bucket",
+    "BucketCharge",
+    "MemoryRateLimitBackend",
+    "SqliteRateLimitBackend",
+    "RateLimiter",
+    "create_rate_limit_backend",
+    "create_rate_limiter",
+]
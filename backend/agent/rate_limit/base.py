@@ -0,0 +1,74 @@
+"""
+Token bucket storage interface
+
+A bucket holds up to `capacity` units and refills at `refill_per_second`, a new bucket starts full.
+Backends refill lazily on access, so a bucket is just its level and the time of its last update.
+
+`acquire` checks and charges several buckets atomically, e.g. the request budgets of a user and the
+global one. Token usage is only known after a response, `consume` charges it afterwards and may leave
+a bucket in debt, which then holds back the next requests until it has refilled.
+
+"""
+
+import time
+from abc import ABC, abstractmethod
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, user_id: str | None, wait_seconds: float):
+        self.user_id = user_id
+        self.wait_seconds = wait_seconds
+        super().__init__(f"rate limit of {user_id} exceeded, retry in {wait_seconds:.1f}s")
+
+
+class Bucket:
+    def __init__(self, key: str, capacity: float, refill_per_second: float):
+        self.key = key
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    def refilled(self, level: float, updated_at: float, now: float) -> float:
+        return min(self.capacity, level + max(0.0, now - updated_at) * self.refill_per_second)
+
+
+class BucketCharge:
+    # a bucket must hold at least `required` units, `cost` units are taken from it
+    def __init__(self, bucket: Bucket, required: float, cost: float):
+        self.bucket = bucket
+        self.required = required
+        self.cost = cost
+
+
+class RateLimitBackend(ABC):
+    # whether the calls may block on i/o or on other processes, the limiter then makes them in a thread
+    blocking = False
+
+    @abstractmethod
+    def acquire(self, charges: list[BucketCharge]) -> float:
+        """Charge all buckets if all of them hold the required units and return 0, else the seconds to wait."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def consume(self, bucket: Bucket, amount: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    def level(self, bucket: Bucket) -> float:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _try_charge(charges: list[BucketCharge], levels: list[float]) -> float:
+        # the seconds until the emptiest bucket holds the required units, 0 if all of them do
+        wait = 0.0
+        for charge, level in zip(charges, levels):
+            if level < charge.required:
+                wait = max(wait, (charge.required - level) / charge.bucket.refill_per_second)
+        return wait
+
+    @staticmethod
+    def _now() -> float:
+        # wall clock, buckets in a shared database are updated by several processes
+        return time.time()
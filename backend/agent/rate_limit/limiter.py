@@ -0,0 +1,188 @@
+"""
+Per-user and global rate limits of the upstream model calls
+
+Every model request is admitted against four token buckets: the request and token budgets of its user
+and the global ones. A request takes one unit of both request buckets and needs the token buckets to be
+out of debt, the tokens of the response are charged once its usage is known.
+
+Waiting requests are queued per user and admitted round-robin across users, so one user with many
+queued requests cannot hold back the others when the global budget is the bottleneck. The admission runs
+in one task at a time, the calls of a blocking backend (a shared database) are made in a thread.
+
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+from .base import RateLimitBackend, RateLimitExceeded, Bucket, BucketCharge
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "global"
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        user_requests_per_minute: float | None = None,
+        user_tokens_per_minute: float | None = None,
+        global_requests_per_minute: float | None = None,
+        global_tokens_per_minute: float | None = None,
+        max_wait_seconds: float = 60.0,
+    ):
+        """Limits of None are not enforced. Each bucket holds one minute worth of its budget."""
+        self.backend = backend
+        self.user_requests_per_minute = user_requests_per_minute
+        self.user_tokens_per_minute = user_tokens_per_minute
+        self.global_requests_per_minute = global_requests_per_minute
+        self.global_tokens_per_minute = global_tokens_per_minute
+        self.max_wait_seconds = max_wait_seconds
+
+        # user key -> waiting requests, in round-robin order
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._admitting: asyncio.Task | None = None
+        self._dispatch_again = False
+
+    async def acquire(self, user_id: str | None):
+        """Wait until a model request of the user is admitted, raises RateLimitExceeded after max_wait_seconds."""
+        user_key = user_id or ""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_key, deque()).append(future)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._remove(user_key, future)
+                raise RateLimitExceeded(user_id, await self._wait_seconds(user_key))
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+                self._remove(user_key, future)
+            raise
+
+    async def record_usage(self, user_id: str | None, usage):
+        # charged after the response, `usage` is the response.usage of the openai response
+        total_tokens = getattr(usage, "total_tokens", None) if usage is not None else None
+        if not total_tokens:
+            return
+        for bucket in self._token_buckets(user_id or ""):
+            await self._call_backend(self.backend.consume, bucket, total_tokens)
+
+    def remaining(self, user_id: str | None) -> dict:
+        user_key = user_id or ""
+        return {
+            bucket.key: self.backend.level(bucket)
+            for bucket in self._request_buckets(user_key) + self._token_buckets(user_key)
+        }
+
+    def _dispatch(self):
+        # a dispatch while the admission task runs makes it go round once more
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        if self._admitting is not None and not self._admitting.done():
+            self._dispatch_again = True
+            return
+        self._admitting = asyncio.get_running_loop().create_task(self._admit())
+
+    async def _admit(self):
+        try:
+            while True:
+                self._dispatch_again = False
+                waits = await self._admit_round_robin()
+                if not self._dispatch_again:
+                    break
+        except Exception as e:
+            # e.g. the database is gone, the waiting requests fail with the error
+            logger.error(f"rate limit admission failed: {e}")
+            for queue in self._waiters.values():
+                for future in queue:
+                    if not future.done():
+                        future.set_exception(e)
+            self._waiters.clear()
+            return
+
+        if self._waiters and waits:
+            # buckets may also be refilled or charged by other processes, so the wait is only a hint
+            delay = min(min(waits), 1.0)
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def _admit_round_robin(self) -> list[float]:
+        # admits the head request of each user in turn, as long as the buckets allow
+        waits = []
+        admitted = True
+        while admitted:
+            admitted = False
+            for user_key in list(self._waiters):
+                queue = self._waiters.get(user_key)
+                while queue and queue[0].done():
+                    queue.popleft()
+                if not queue:
+                    self._waiters.pop(user_key, None)
+                    continue
+
+                head = queue[0]
+                charges = self._charges(user_key)
+                wait = await self._call_backend(self.backend.acquire, charges)
+                if wait > 0:
+                    waits.append(wait)
+                    continue
+
+                if head.done():
+                    # gave up while the buckets were charged, the units go back
+                    for charge in charges:
+                        if charge.cost:
+                            await self._call_backend(self.backend.consume, charge.bucket, -charge.cost)
+                else:
+                    head.set_result(None)
+                self._remove(user_key, head)
+                admitted = True
+                # served, goes to the back of the round
+                if user_key in self._waiters:
+                    self._waiters.move_to_end(user_key)
+        return waits
+
+    async def _call_backend(self, method, *args):
+        # a blocking backend waits for its database lock in a thread, not on the event loop
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def _remove(self, user_key: str, future: asyncio.Future):
+        queue = self._waiters.get(user_key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiters[user_key]
+
+    async def _wait_seconds(self, user_key: str) -> float:
+        charges = self._charges(user_key)
+        levels = [await self._call_backend(self.backend.level, charge.bucket) for charge in charges]
+        return RateLimitBackend._try_charge(charges, levels)
+
+    def _charges(self, user_key: str) -> list[BucketCharge]:
+        charges = [BucketCharge(bucket, required=1, cost=1) for bucket in self._request_buckets(user_key)]
+        # tokens are charged after the response, a request only needs the token budget to be out of debt
+        charges += [BucketCharge(bucket, required=1, cost=0) for bucket in self._token_buckets(user_key)]
+        return charges
+
+    def _request_buckets(self, user_key: str) -> list[Bucket]:
+        return self._buckets(user_key, "requests", self.user_requests_per_minute, self.global_requests_per_minute)
+
+    def _token_buckets(self, user_key: str) -> list[Bucket]:
+        return self._buckets(user_key, "tokens", self.user_tokens_per_minute, self.global_tokens_per_minute)
+
+    def _buckets(self, user_key: str, kind: str, user_per_minute: float | None, global_per_minute: float | None) -> list[Bucket]:
+        buckets = []
+        if user_per_minute:
+            buckets.append(Bucket(f"user:{user_key}:{kind}", user_per_minute, user_per_minute / 60))
+        if global_per_minute:
+            buckets.append(Bucket(f"{GLOBAL_KEY}:{kind}", global_per_minute, global_per_minute / 60))
+        return buckets
@@ -0,0 +1,36 @@
+import threading
+
+from .base import RateLimitBackend, Bucket, BucketCharge
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets of this process only, lost on restart."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, charges: list[BucketCharge]) -> float:
+        with self._lock:
+            now = self._now()
+            levels = [self._level(charge.bucket, now) for charge in charges]
+            wait = self._try_charge(charges, levels)
+            if wait == 0:
+                for charge, level in zip(charges, levels):
+                    self._buckets[charge.bucket.key] = (level - charge.cost, now)
+            return wait
+
+    def consume(self, bucket: Bucket, amount: float):
+        with self._lock:
+            now = self._now()
+            self._buckets[bucket.key] = (self._level(bucket, now) - amount, now)
+
+    def level(self, bucket: Bucket) -> float:
+        with self._lock:
+            return self._level(bucket, self._now())
+
+    def _level(self, bucket: Bucket, now: float) -> float:
+        state = self._buckets.get(bucket.key)
+        if state is None:
+            return bucket.capacity
+        return bucket.refilled(state[0], state[1], now)
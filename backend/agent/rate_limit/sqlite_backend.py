@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+from .base import RateLimitBackend, Bucket, BucketCharge
+
+
+class SqliteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in a SQLite database in WAL mode, kept across restarts and shared by all worker processes
+    of a host. Every acquire is one short write transaction, it may wait for the writers of other
+    processes.
+    """
+
+    blocking = True
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def acquire(self, charges: list[BucketCharge]) -> float:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = self._now()
+            levels = [self._level(conn, charge.bucket, now) for charge in charges]
+            wait = self._try_charge(charges, levels)
+            if wait == 0:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_buckets (key, level, updated_at) VALUES (?, ?, ?)",
+                    [(charge.bucket.key, level - charge.cost, now) for charge, level in zip(charges, levels)],
+                )
+            return wait
+
+    def consume(self, bucket: Bucket, amount: float):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = self._now()
+            level = self._level(conn, bucket, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, level, updated_at) VALUES (?, ?, ?)",
+                (bucket.key, level - amount, now),
+            )
+
+    def level(self, bucket: Bucket) -> float:
+        return self._level(self._connection(), bucket, self._now())
+
+    def _level(self, conn: sqlite3.Connection, bucket: Bucket, now: float) -> float:
+        row = conn.execute("SELECT level, updated_at FROM rate_buckets WHERE key = ?", (bucket.key,)).fetchone()
+        if row is None:
+            return bucket.capacity
+        return bucket.refilled(row[0], row[1], now)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
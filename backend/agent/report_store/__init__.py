@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+from .base import ReportStore, ReportHead, ReportSnapshot, ReportVersionConflict, ReportVersionNotFound
+from .local_file import LocalFileReportStore
+from .sqlite_store import SqliteReportStore
+from .delta import split_lines
+from .durability import DURABILITY_MODES, GroupCommitLog, get_commit_log
+
+# project_root/temp/reports/
+DEFAULT_REPORTS_DIR = Path(__file__).parent.parent.parent.parent / "temp" / "reports"
+
+_report_store: ReportStore | None = None
+
+
+def create_report_store(backend: str | None = None, path: str | None = None) -> ReportStore:
+    """
+    Create the report store configured by REPORT_STORE ("local" or "sqlite") and REPORT_STORE_PATH,
+    history is configured by REPORT_SNAPSHOT_INTERVAL and REPORT_RETENTION_VERSIONS, the durability of
+    the writes by REPORT_DURABILITY ("fast", "atomic" or "strict").
+    """
+    backend = backend or os.getenv("REPORT_STORE", "local")
+    path = path or os.getenv("REPORT_STORE_PATH")
+    history_config = {
+        "snapshot_interval": int(os.getenv("REPORT_SNAPSHOT_INTERVAL", "10")),
+        "retention_versions": int(os.getenv("REPORT_RETENTION_VERSIONS", "100")),
+        "durability": os.getenv("REPORT_DURABILITY", "atomic"),
+    }
+
+    if backend == "local":
+        return LocalFileReportStore(Path(path) if path else DEFAULT_REPORTS_DIR, **history_config)
+    elif backend == "sqlite":
+        return SqliteReportStore(Path(path) if path else DEFAULT_REPORTS_DIR / "reports.db", **history_config)
+    else:
+        raise ValueError(f"unknown report store backend: {backend}")
+
+
+def get_report_store() -> ReportStore:
+    # process wide report store, shared by the tools and the service
+    global _report_store
+    if _report_store is None:
+        _report_store = create_report_store()
+    return _report_store
+
+
+def set_report_store(report_store: ReportStore):
+    global _report_store
+    _report_store = report_store
+
+
+__all__ = [
+    "ReportStore",
+    "ReportHead",
+    "ReportSnapshot",
+    "ReportVersionConflict",
+    "ReportVersionNotFound",
+    "LocalFileReportStore",
+    "SqliteReportStore",
+    "split_lines",
+    "DURABILITY_MODES",
+    "GroupCommitLog",
+    "get_commit_log",
+    "create_report_store",
+    "get_report_store",
+    "set_report_store",
+]
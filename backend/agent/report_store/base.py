@@ -0,0 +1,145 @@
+"""
+Report storage interface
+
+Reports are versioned, version 0 means there is no report yet. Writes are compare-and-swap on the
+version the writer read, so concurrent turns detect conflicts instead of clobbering each other.
+
+Every write is also recorded in the report history, as a compact line-range delta against the previous
+version, with a full snapshot every `snapshot_interval` versions. Reconstructing a version therefore
+applies at most `snapshot_interval - 1` deltas. Versions older than `retention_versions` are dropped.
+
+Listeners are called with the new snapshot and the line-range delta of every successful write, this is
+what feeds the live report updates.
+
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from .delta import compute_delta, apply_delta, format_delta
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReportVersionConflict(Exception):
+    def __init__(self, user_id: str | None, expected_version: int, actual_version: int):
+        self.user_id = user_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super().__init__(
+            f"report of {user_id} is at version {actual_version}, expected version {expected_version}"
+        )
+
+
+class ReportVersionNotFound(Exception):
+    pass
+
+
+class ReportHead:
+    # the version of a report without its content, see ReportStore.read_head
+    def __init__(self, version: int = 0, updated_at: float | None = None):
+        self.version = version
+        self.updated_at = updated_at
+
+    @property
+    def exists(self) -> bool:
+        return self.version > 0
+
+
+class ReportSnapshot(ReportHead):
+    def __init__(self, content: str = "", version: int = 0, updated_at: float | None = None):
+        super().__init__(version=version, updated_at=updated_at)
+        self.content = content
+
+
+class ReportStore(ABC):
+    def __init__(self, snapshot_interval: int = 10, retention_versions: int = 100):
+        self.snapshot_interval = snapshot_interval
+        self.retention_versions = retention_versions
+        self._listeners: list[Callable[[str | None, ReportSnapshot, list[dict]], None]] = []
+
+    @abstractmethod
+    def read(self, user_id: str | None = None) -> ReportSnapshot:
+        raise NotImplementedError("Not implemented yet!")
+
+    def read_head(self, user_id: str | None = None) -> ReportHead:
+        """The current version of the report, without reading its content."""
+        snapshot = self.read(user_id)
+        return ReportHead(version=snapshot.version, updated_at=snapshot.updated_at)
+
+    @abstractmethod
+    def write(self, user_id: str | None, content: str, expected_version: int) -> ReportSnapshot:
+        # replace the report if it is still at expected_version, raise ReportVersionConflict otherwise
+        raise NotImplementedError("Not implemented yet!")
+
+    def close(self):
+        pass
+
+    def add_listener(self, listener: Callable[[str | None, ReportSnapshot, list[dict]], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str | None, ReportSnapshot, list[dict]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def read_version(self, user_id: str | None, version: int) -> ReportSnapshot:
+        """Reconstruct an earlier version from its nearest snapshot and the deltas after it."""
+        current = self.read(user_id)
+        if version == current.version:
+            return current
+        if version == 0:
+            return ReportSnapshot()
+        if version < 0 or version > current.version:
+            raise ReportVersionNotFound(f"report of {user_id} has no version {version}")
+
+        records = self._load_history(user_id, version)
+        if not records or records[0][1]["snapshot"] is None:
+            raise ReportVersionNotFound(f"version {version} of the report of {user_id} is no longer kept")
+
+        content = records[0][1]["snapshot"]
+        for _, record in records[1:]:
+            content = apply_delta(content, record["delta"])
+        return ReportSnapshot(content=content, version=version)
+
+    def diff_since(self, user_id: str | None, version: int) -> tuple[ReportSnapshot, str]:
+        """The current report and a line-range diff of it against the given earlier version."""
+        current = self.read(user_id)
+        base = self.read_version(user_id, version)
+        return current, format_delta(base.content, current.content)
+
+    def _history_record(self, old_content: str, new_snapshot: ReportSnapshot) -> dict:
+        # called by the backends before they take the write lock, with the content of the expected version.
+        # A version never changes once written, the record stays valid if the version check passes
+        if (new_snapshot.version - 1) % self.snapshot_interval == 0:
+            return {"snapshot": new_snapshot.content, "delta": None}
+        return {"snapshot": None, "delta": compute_delta(old_content, new_snapshot.content)}
+
+    def _notify(self, user_id: str | None, old_content: str, new_snapshot: ReportSnapshot, record: dict):
+        # called by the backends after a successful write, once the write lock is released
+        if not self._listeners:
+            return
+
+        delta = record["delta"] if record["delta"] is not None else compute_delta(old_content, new_snapshot.content)
+        for listener in self._listeners:
+            try:
+                listener(user_id, new_snapshot, delta)
+            except Exception as e:
+                logger.error(f"error in report listener: {e}")
+
+    def _history_gc_version(self, user_id: str | None, version: int) -> int | None:
+        # history before the returned version can be dropped, it is the oldest snapshot still needed
+        cutoff = version - self.retention_versions
+        if cutoff < 1:
+            return None
+        return self._latest_snapshot_version(user_id, cutoff)
+
+    @abstractmethod
+    def _load_history(self, user_id: str | None, version: int) -> list[tuple[int, dict]]:
+        # history records from the latest snapshot at or before version up to version, ascending
+        raise NotImplementedError("Not implemented yet!")
+
+    @abstractmethod
+    def _latest_snapshot_version(self, user_id: str | None, max_version: int) -> int | None:
+        raise NotImplementedError("Not implemented yet!")
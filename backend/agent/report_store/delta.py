@@ -0,0 +1,78 @@
+"""
+Compact line-range deltas between two report versions
+
+A delta is a list of operations {"start": i, "end": j, "lines": [...]}, each replacing the old lines
+[start, end) with the given lines. Lines keep their line endings, so applying a delta is exact.
+
+"""
+
+import difflib
+
+
+def split_lines(content: str) -> list[str]:
+    # like readlines, only "\n" ends a line (str.splitlines also splits on \r, \x0c, \u2028, ...)
+    lines = content.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _changed_opcodes(old_lines: list[str], new_lines: list[str]) -> list[tuple[str, int, int, int, int]]:
+    # report writes replace a few line ranges, the common head and tail are skipped in linear time so the
+    # matcher only compares the lines between the first and the last change
+    head = 0
+    max_head = min(len(old_lines), len(new_lines))
+    while head < max_head and old_lines[head] == new_lines[head]:
+        head += 1
+    tail = 0
+    max_tail = max_head - head
+    while tail < max_tail and old_lines[-1 - tail] == new_lines[-1 - tail]:
+        tail += 1
+
+    matcher = difflib.SequenceMatcher(
+        None, old_lines[head : len(old_lines) - tail], new_lines[head : len(new_lines) - tail]
+    )
+    return [
+        (tag, i1 + head, i2 + head, j1 + head, j2 + head)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def compute_delta(old_content: str, new_content: str) -> list[dict]:
+    old_lines = split_lines(old_content)
+    new_lines = split_lines(new_content)
+
+    delta = []
+    for tag, i1, i2, j1, j2 in _changed_opcodes(old_lines, new_lines):
+        delta.append({"start": i1, "end": i2, "lines": new_lines[j1:j2]})
+    return delta
+
+
+def apply_delta(content: str, delta: list[dict]) -> str:
+    lines = split_lines(content)
+    # back to front, so the line numbers of the earlier operations stay valid
+    for operation in sorted(delta, key=lambda op: op["start"], reverse=True):
+        lines[operation["start"] : operation["end"]] = operation["lines"]
+    return "".join(lines)
+
+
+def format_delta(old_content: str, new_content: str) -> str:
+    """Human (and model) readable diff, new lines are prefixed with their line number in the new content."""
+    old_lines = split_lines(old_content)
+    new_lines = split_lines(new_content)
+
+    parts = []
+    for tag, i1, i2, j1, j2 in _changed_opcodes(old_lines, new_lines):
+        if tag == "insert":
+            header = f"@@ inserted as lines {j1}-{j2 - 1}"
+        elif tag == "delete":
+            header = f"@@ old lines {i1}-{i2 - 1} deleted, following lines now start at {j1}"
+        else:
+            header = f"@@ old lines {i1}-{i2 - 1} replaced by lines {j1}-{j2 - 1}"
+        parts.append(header + "\n")
+        for line_idx, line in enumerate(new_lines[j1:j2], start=j1):
+            parts.append(f"{line_idx}|{line}" if line.endswith("\n") else f"{line_idx}|{line}\n")
+    return "".join(parts)
@@ -0,0 +1,148 @@
+"""
+Durability of report writes
+
+A write stores the new files it needs (e.g. the report version and its history record) under names nothing
+refers to yet, then publishes them by renaming one small file (e.g. the report manifest) over the old one.
+That rename is the single commit point in all modes, a reader or a crashed process sees the old or the new
+version, never a mix of both.
+
+- "fast": nothing is fsynced. A crash of the host can lose recent writes.
+- "atomic": the rename is made durable by a directory fsync, the file contents are left to the page cache.
+  After a power loss the report may be at the new version with its content not yet on disk.
+- "strict": "atomic", and the new files are fsynced before the rename. This is the only mode that fsyncs
+  file data, a write survives a power loss once it returns.
+
+The fsyncs go through a `GroupCommitLog`: a writer that needs a sync while another one is syncing joins
+the next batch, and one fsync per path covers the whole batch. Concurrent writers then share the cost of
+the disk flushes instead of queueing on them one by one.
+
+"""
+
+import os
+import threading
+from pathlib import Path
+
+DURABILITY_MODES = ("fast", "atomic", "strict")
+
+# the PRAGMA synchronous setting of the SQLite store per mode, in WAL mode NORMAL commits atomically
+# and only syncs at checkpoints
+SQLITE_SYNCHRONOUS = {"fast": "OFF", "atomic": "NORMAL", "strict": "FULL"}
+
+
+def check_durability(durability: str) -> str:
+    if durability not in DURABILITY_MODES:
+        raise ValueError(f"unknown report durability: {durability}, expected one of {DURABILITY_MODES}")
+    return durability
+
+
+class _Batch:
+    def __init__(self):
+        self.paths: set[Path] = set()
+        self.done = False
+        self.error: OSError | None = None
+
+
+class GroupCommitLog:
+    """Coalesces the fsyncs of concurrent writers, shared by the writer threads of a process."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # the batch writers join, and whether a batch is being synced
+        self._open = _Batch()
+        self._syncing = False
+        self.batches = 0
+        self.requests = 0
+
+    def sync(self, paths: list[Path]):
+        """Return once the given files and directories are synced to disk, raises the OSError of a failed fsync."""
+        with self._condition:
+            self.requests += 1
+            batch = self._open
+            batch.paths.update(paths)
+            while not batch.done:
+                if self._syncing:
+                    self._condition.wait()
+                    continue
+
+                # this writer syncs the batch it is in, the writers arriving meanwhile join the next one
+                self._syncing = True
+                self._open = _Batch()
+                self._condition.release()
+                try:
+                    batch.error = self._fsync_all(batch.paths)
+                finally:
+                    self._condition.acquire()
+                    self._syncing = False
+                    self.batches += 1
+                    batch.done = True
+                    self._condition.notify_all()
+
+        if batch.error is not None:
+            raise batch.error
+
+    def _fsync_all(self, paths: set[Path]) -> OSError | None:
+        for path in sorted(paths):
+            try:
+                fsync_path(path)
+            except OSError as e:
+                return e
+        return None
+
+
+def fsync_path(path: Path):
+    # fsync works on any descriptor of the file, directories are opened read only
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# process wide, the fsyncs of all stores of a process are coalesced
+_commit_log = GroupCommitLog()
+
+
+def get_commit_log() -> GroupCommitLog:
+    return _commit_log
+
+
+class FileCommit:
+    """
+    The files of one write. `write_text` writes new files in place, nothing refers to them before the
+    commit. `publish_text` stages the file that refers to them as a temp file, `commit` renames it over
+    the old one.
+    """
+
+    def __init__(self, durability: str, commit_log: GroupCommitLog | None = None):
+        self.durability = check_durability(durability)
+        self.commit_log = commit_log or _commit_log
+        self._written: list[Path] = []
+        self._published: tuple[Path, Path] | None = None
+
+    def write_text(self, path: Path, content: str):
+        self._written.append(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def publish_text(self, path: Path, content: str):
+        # unique per thread, writers of other processes hold the report lock
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._published = (tmp_path, path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def commit(self):
+        tmp_path, path = self._published
+        if self.durability == "strict":
+            self.commit_log.sync(self._written + [tmp_path])
+        os.replace(tmp_path, path)
+        self._published = None
+        if self.durability != "fast":
+            self.commit_log.sync(list({written.parent for written in self._written} | {path.parent}))
+
+    def abort(self):
+        # removes the files of a write that was not committed, after a failure
+        if self._published is None:
+            return
+        for path in self._written + [self._published[0]]:
+            path.unlink(missing_ok=True)
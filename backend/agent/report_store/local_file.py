@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import fcntl
+from pathlib import Path
+from contextlib import contextmanager
+
+from .base import ReportStore, ReportHead, ReportSnapshot, ReportVersionConflict
+from .durability import FileCommit, GroupCommitLog, check_durability
+
+
+class LocalFileReportStore(ReportStore):
+    """
+    One html file per report version, and a small manifest file naming the current one. A write adds the
+    new version file and its history record, then replaces the manifest, so the manifest rename is the
+    commit point and readers need no lock. Writers take an exclusive file lock, so compare-and-swap also
+    holds across worker processes of the same host. The files are written with the given durability, see
+    durability.py.
+    """
+
+    def __init__(
+        self,
+        reports_dir: Path,
+        snapshot_interval: int = 10,
+        retention_versions: int = 100,
+        durability: str = "atomic",
+        commit_log: GroupCommitLog | None = None,
+    ):
+        super().__init__(snapshot_interval=snapshot_interval, retention_versions=retention_versions)
+        self.reports_dir = reports_dir
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        self.durability = check_durability(durability)
+        self.commit_log = commit_log
+
+    def report_path(self, user_id: str | None = None) -> Path:
+        # the report as written before version files, read when the manifest names no file
+        filename = f"html_report_{user_id}.html" if user_id else "html_report.html"
+        return self.reports_dir / filename
+
+    def read(self, user_id: str | None = None) -> ReportSnapshot:
+        # a version file is deleted two writes after it was replaced, a reader that lost that race reads again
+        for _ in range(3):
+            try:
+                return self._read(user_id)
+            except FileNotFoundError:
+                pass
+        with self._lock(user_id, exclusive=False):
+            return self._read(user_id)
+
+    def read_head(self, user_id: str | None = None) -> ReportHead:
+        # the manifest only
+        manifest = self._read_manifest(user_id)
+        if manifest is not None:
+            return ReportHead(version=manifest["version"], updated_at=manifest["updated_at"])
+
+        html_path = self.report_path(user_id)
+        if html_path.exists():
+            # reports written before versioning
+            return ReportHead(version=1, updated_at=os.path.getmtime(html_path))
+        return ReportHead()
+
+    def write(self, user_id: str | None, content: str, expected_version: int) -> ReportSnapshot:
+        # the history record is computed outside the lock, the version is checked again under it
+        current = self.read(user_id)
+        if current.version != expected_version:
+            raise ReportVersionConflict(user_id, expected_version, current.version)
+        snapshot = ReportSnapshot(content=content, version=current.version + 1)
+        record = self._history_record(current.content, snapshot)
+
+        with self._lock(user_id, exclusive=True):
+            current_version = self.read_head(user_id).version
+            if current_version != expected_version:
+                raise ReportVersionConflict(user_id, expected_version, current_version)
+            snapshot.updated_at = time.time()
+
+            # the version file and its history record are not visible until the manifest names them
+            commit = FileCommit(self.durability, self.commit_log)
+            try:
+                self._store_history(commit, user_id, snapshot.version, record)
+                version_path = self._version_file_path(user_id, snapshot.version)
+                commit.write_text(version_path, content)
+                manifest = {"version": snapshot.version, "updated_at": snapshot.updated_at, "file": version_path.name}
+                commit.publish_text(self._manifest_path(user_id), json.dumps(manifest))
+                commit.commit()
+            except BaseException:
+                commit.abort()
+                raise
+            self._collect_versions(user_id, snapshot.version)
+            self._collect_history(user_id, snapshot.version)
+
+        self._notify(user_id, current.content, snapshot, record)
+        return snapshot
+
+    def _read(self, user_id: str | None) -> ReportSnapshot:
+        manifest = self._read_manifest(user_id)
+        if manifest is None:
+            html_path = self.report_path(user_id)
+            if not html_path.exists():
+                return ReportSnapshot()
+            with open(html_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            # reports written before versioning
+            return ReportSnapshot(content=content, version=1, updated_at=os.path.getmtime(html_path))
+
+        # manifests written before version files name no file
+        html_path = self.reports_dir / manifest["file"] if "file" in manifest else self.report_path(user_id)
+        with open(html_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return ReportSnapshot(content=content, version=manifest["version"], updated_at=manifest["updated_at"])
+
+    def _read_manifest(self, user_id: str | None) -> dict | None:
+        try:
+            with open(self._manifest_path(user_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _manifest_path(self, user_id: str | None) -> Path:
+        return self.report_path(user_id).with_suffix(".version")
+
+    def _version_file_path(self, user_id: str | None, version: int) -> Path:
+        return self.report_path(user_id).with_suffix(f".v{version:08d}.html")
+
+    def _collect_versions(self, user_id: str | None, version: int):
+        # the previous version file is kept for the readers that read the manifest before the commit
+        report_path = self.report_path(user_id)
+        for html_path in self.reports_dir.glob(f"{report_path.stem}.v*.html"):
+            file_version = html_path.name[len(report_path.stem) + 2:-len(".html")]
+            if file_version.isdigit() and int(file_version) < version - 1:
+                html_path.unlink(missing_ok=True)
+        if version > 2:
+            report_path.unlink(missing_ok=True)
+
+    def _history_dir(self, user_id: str | None) -> Path:
+        history_dir = self.reports_dir / "history" / self.report_path(user_id).stem
+        history_dir.mkdir(parents=True, exist_ok=True)
+        return history_dir
+
+    def _store_history(self, commit: FileCommit, user_id: str | None, version: int, record: dict):
+        history_dir = self._history_dir(user_id)
+        if record["snapshot"] is not None:
+            commit.write_text(history_dir / f"{version:08d}.snapshot.html", record["snapshot"])
+        else:
+            commit.write_text(history_dir / f"{version:08d}.delta.json", json.dumps(record["delta"], ensure_ascii=False))
+
+    def _collect_history(self, user_id: str | None, version: int):
+        # retention
+        keep_from = self._history_gc_version(user_id, version)
+        if keep_from is not None:
+            for history_path in self._history_dir(user_id).iterdir():
+                # temp files of the atomic writes start with a dot
+                if not history_path.name.startswith(".") and int(history_path.name.split(".", 1)[0]) < keep_from:
+                    history_path.unlink()
+
+    def _load_history(self, user_id: str | None, version: int) -> list[tuple[int, dict]]:
+        snapshot_version = self._latest_snapshot_version(user_id, version)
+        if snapshot_version is None:
+            return []
+
+        history_dir = self._history_dir(user_id)
+        with open(history_dir / f"{snapshot_version:08d}.snapshot.html", "r", encoding="utf-8") as f:
+            records = [(snapshot_version, {"snapshot": f.read(), "delta": None})]
+
+        for delta_version in range(snapshot_version + 1, version + 1):
+            delta_path = history_dir / f"{delta_version:08d}.delta.json"
+            if not delta_path.exists():
+                return []
+            with open(delta_path, "r", encoding="utf-8") as f:
+                records.append((delta_version, {"snapshot": None, "delta": json.load(f)}))
+        return records
+
+    def _latest_snapshot_version(self, user_id: str | None, max_version: int) -> int | None:
+        snapshot_versions = [
+            int(history_path.name.split(".", 1)[0])
+            for history_path in self._history_dir(user_id).glob("*.snapshot.html")
+        ]
+        snapshot_versions = [version for version in snapshot_versions if version <= max_version]
+        return max(snapshot_versions) if snapshot_versions else None
+
+    @contextmanager
+    def _lock(self, user_id: str | None, exclusive: bool):
+        lock_path = self.report_path(user_id).with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
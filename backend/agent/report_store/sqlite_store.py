@@ -0,0 +1,132 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from .base import ReportStore, ReportHead, ReportSnapshot, ReportVersionConflict
+from .durability import SQLITE_SYNCHRONOUS, check_durability
+
+
+class SqliteReportStore(ReportStore):
+    """
+    All reports in one SQLite database in WAL mode, readers never block the writer and the database
+    can be shared by all worker processes of a host. The durability modes map to PRAGMA synchronous,
+    the group commit of the fsyncs is done by SQLite itself.
+    """
+
+    def __init__(
+        self, db_path: Path, snapshot_interval: int = 10, retention_versions: int = 100, durability: str = "atomic"
+    ):
+        super().__init__(snapshot_interval=snapshot_interval, retention_versions=retention_versions)
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.synchronous = SQLITE_SYNCHRONOUS[check_durability(durability)]
+
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "user_id TEXT PRIMARY KEY, content TEXT NOT NULL, version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            # snapshot rows hold the full content, delta rows the json delta against the previous version
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_history ("
+                "user_id TEXT NOT NULL, version INTEGER NOT NULL, is_snapshot INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "PRIMARY KEY (user_id, version))"
+            )
+
+    def read(self, user_id: str | None = None) -> ReportSnapshot:
+        row = self._connection().execute(
+            "SELECT content, version, updated_at FROM reports WHERE user_id = ?", (user_id or "",)
+        ).fetchone()
+        if row is None:
+            return ReportSnapshot()
+        return ReportSnapshot(content=row[0], version=row[1], updated_at=row[2])
+
+    def read_head(self, user_id: str | None = None) -> ReportHead:
+        row = self._connection().execute(
+            "SELECT version, updated_at FROM reports WHERE user_id = ?", (user_id or "",)
+        ).fetchone()
+        if row is None:
+            return ReportHead()
+        return ReportHead(version=row[0], updated_at=row[1])
+
+    def write(self, user_id: str | None, content: str, expected_version: int) -> ReportSnapshot:
+        key = user_id or ""
+        # the history record is computed before the write lock is taken, the version is checked again under it
+        current = self.read(user_id)
+        if current.version != expected_version:
+            raise ReportVersionConflict(user_id, expected_version, current.version)
+        snapshot = ReportSnapshot(content=content, version=expected_version + 1)
+        record = self._history_record(current.content, snapshot)
+        is_snapshot = record["snapshot"] is not None
+        payload = record["snapshot"] if is_snapshot else json.dumps(record["delta"], ensure_ascii=False)
+
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM reports WHERE user_id = ?", (key,)).fetchone()
+            current_version = row[0] if row is not None else 0
+            if current_version != expected_version:
+                conn.rollback()
+                raise ReportVersionConflict(user_id, expected_version, current_version)
+
+            snapshot.updated_at = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO reports (user_id, content, version, updated_at) VALUES (?, ?, ?, ?)",
+                (key, content, snapshot.version, snapshot.updated_at),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO report_history (user_id, version, is_snapshot, payload) VALUES (?, ?, ?, ?)",
+                (key, snapshot.version, int(is_snapshot), payload),
+            )
+
+            # retention
+            keep_from = self._history_gc_version(user_id, snapshot.version)
+            if keep_from is not None:
+                conn.execute("DELETE FROM report_history WHERE user_id = ? AND version < ?", (key, keep_from))
+
+        self._notify(user_id, current.content, snapshot, record)
+        return snapshot
+
+    def _load_history(self, user_id: str | None, version: int) -> list[tuple[int, dict]]:
+        snapshot_version = self._latest_snapshot_version(user_id, version)
+        if snapshot_version is None:
+            return []
+
+        rows = self._connection().execute(
+            "SELECT version, is_snapshot, payload FROM report_history WHERE user_id = ? AND version >= ? AND version <= ? "
+            "ORDER BY version",
+            (user_id or "", snapshot_version, version),
+        ).fetchall()
+        if len(rows) != version - snapshot_version + 1:
+            return []
+
+        return [
+            (row_version, {"snapshot": payload, "delta": None} if is_snapshot else {"snapshot": None, "delta": json.loads(payload)})
+            for row_version, is_snapshot, payload in rows
+        ]
+
+    def _latest_snapshot_version(self, user_id: str | None, max_version: int) -> int | None:
+        row = self._connection().execute(
+            "SELECT MAX(version) FROM report_history WHERE user_id = ? AND is_snapshot = 1 AND version <= ?",
+            (user_id or "", max_version),
+        ).fetchone()
+        return row[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
@@ -72,6 +72,30 @@ class MessageDelta(BaseModel):
     content: str
 
 
+class ReportPreviewDelta(BaseModel):
+    # provisional report change while a write_html_report call is streamed, the text appended to change `index`
+    type: Literal["report_preview"] = Field(default="report_preview")
+    call_id: str
+    index: int
+    start_line: int
+    end_line: int
+    content: str
+
+
+class FormRowDelta(BaseModel):
+    # a completed row of a form request that is still streamed, the rows arrive in order
+    type: Literal["form_row_delta"] = Field(default="form_row_delta")
+    index: int
+    row: FormRow
+
+
+class ChoiceOptionDelta(BaseModel):
+    # a completed option of a choice request that is still streamed, the options arrive in order
+    type: Literal["choice_option_delta"] = Field(default="choice_option_delta")
+    index: int
+    option: str
+
+
 # possible types for agent input
 Input = Annotated[Union[Message, FormRequest, FormResult, ChoiceRequest, ChoiceResult], Field(discriminator="type")]
 
@@ -86,6 +110,9 @@ Output = Annotated[
         ChoiceRequest,
         MessageDelta,
         StreamingDisplayOutput,
+        ReportPreviewDelta,
+        FormRowDelta,
+        ChoiceOptionDelta,
     ],
     Field(discriminator="type"),
 ]
@@ -0,0 +1,23 @@
+from .broadcast import TurnBroadcaster, SingleFlight
+from .replay_buffer import ReplayBuffer, ReplayGapError, frame_data, frame_event_id
+from .shared_turns import SharedTurnLog, RemoteTurn
+from .turns import TurnRegistry
+from .jobs import Job, JobQueue, JobQueueFull
+from .report_events import ReportChangeBus
+
+
+__all__ = [
+    "TurnBroadcaster",
+    "SingleFlight",
+    "ReplayBuffer",
+    "ReplayGapError",
+    "frame_data",
+    "frame_event_id",
+    "SharedTurnLog",
+    "RemoteTurn",
+    "TurnRegistry",
+    "Job",
+    "JobQueue",
+    "JobQueueFull",
+    "ReportChangeBus",
+]
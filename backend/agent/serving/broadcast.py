@@ -0,0 +1,163 @@
+"""
+Single-flight coalescing of identical in-flight turns
+
+The first request for a key starts the upstream turn in a background task, identical requests arriving
+while it is running attach as extra subscribers. Every subscriber owns a buffer, late subscribers are
+seeded with the frames produced so far, so each client still gets the full sse sequence.
+
+The produced frames are kept in a bounded replay buffer, a reconnecting client resumes from its
+Last-Event-ID instead of re-running the turn. The subscriber buffers are bounded too: a subscriber whose
+buffer overflows is detached and catches up from the replay buffer once it has drained it, or is
+disconnected if its frames are no longer there.
+
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from typing import AsyncGenerator, Callable
+
+from .replay_buffer import ReplayBuffer, ReplayGapError, frame_event_id
+
+logger = logging.getLogger(__name__)
+
+# marks the end of the stream in the subscriber buffers
+_END = object()
+
+# frames buffered per subscriber before it is detached
+MAX_PENDING_FRAMES = 1024
+
+
+def _event_id(frame: str, last_event_id: int | None) -> int:
+    # frames without an id are numbered on by the replay buffer
+    event_id = frame_event_id(frame)
+    return event_id if event_id is not None else (last_event_id or 0) + 1
+
+
+class _Subscriber:
+    def __init__(self, max_pending: int):
+        self.buffer: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        # set once the buffer overflowed, the frames after it are read from the replay buffer
+        self.detached = False
+
+
+class TurnBroadcaster:
+    def __init__(
+        self,
+        upstream: AsyncGenerator[str, None],
+        replay_buffer: ReplayBuffer | None = None,
+        turn_id: str | None = None,
+        max_pending: int = MAX_PENDING_FRAMES,
+    ):
+        self.upstream = upstream
+        self.turn_id = turn_id or uuid.uuid4().hex
+
+        # the frames produced so far, late subscribers, reconnects and detached subscribers start from here
+        self.history = replay_buffer if replay_buffer is not None else ReplayBuffer()
+        self.max_pending = max_pending
+        self.subscribers: set[_Subscriber] = set()
+
+        self.done = False
+        self.finished_at: float | None = None
+        self.error: BaseException | None = None
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> "TurnBroadcaster":
+        # the turn keeps running even if all subscribers go away, so that its report writes complete
+        self.task = asyncio.create_task(self._pump())
+        return self
+
+    async def _pump(self):
+        try:
+            async for frame in self.upstream:
+                self.history.append(frame)
+                self._offer(frame)
+        except Exception as e:
+            logger.error(f"error in broadcasted turn: {e}")
+            self.error = e
+        finally:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self.history.close()
+            self._offer(_END)
+
+    def _offer(self, frame):
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.buffer.put_nowait(frame)
+            except asyncio.QueueFull:
+                # a slow client, it does not hold up the turn nor the other subscribers
+                logger.warning(f"subscriber of turn {self.turn_id} fell behind, detached")
+                subscriber.detached = True
+                self.subscribers.discard(subscriber)
+
+    def can_resume(self, last_event_id: int | None = None) -> bool:
+        try:
+            self.history.frames_after(last_event_id)
+        except ReplayGapError:
+            return False
+        return True
+
+    async def subscribe(self, last_event_id: int | None = None) -> AsyncGenerator[str, None]:
+        """
+        Yield the frames of the turn after last_event_id, the full sequence if it is None. Raises
+        ReplayGapError if the subscriber fell behind further than the replay buffer reaches.
+        """
+        subscriber = None
+        try:
+            while True:
+                # the frames produced so far come from the history, the subscriber is attached in the same step
+                # so it gets every later frame
+                missed = self.history.frames_after(last_event_id)
+                subscriber = None
+                if not self.done:
+                    subscriber = _Subscriber(self.max_pending)
+                    self.subscribers.add(subscriber)
+
+                for frame in missed:
+                    yield frame
+                    last_event_id = _event_id(frame, last_event_id)
+                if subscriber is None:
+                    break
+
+                ended = False
+                while not (subscriber.detached and subscriber.buffer.empty()):
+                    frame = await subscriber.buffer.get()
+                    if frame is _END:
+                        ended = True
+                        break
+                    yield frame
+                    last_event_id = _event_id(frame, last_event_id)
+                if ended:
+                    break
+                # detached, the frames after the buffered ones are read from the history
+        finally:
+            self.subscribers.discard(subscriber)
+
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight: dict[str, TurnBroadcaster] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def attach(self, key: str, start_turn: Callable[[], TurnBroadcaster]) -> TurnBroadcaster:
+        """Return the in-flight turn for the key, starting a new one if there is none."""
+        broadcaster = self._in_flight.get(key)
+        if broadcaster is not None and not broadcaster.done:
+            logger.info(f"coalescing turn into in-flight turn: {key}")
+            return broadcaster
+
+        broadcaster = start_turn()
+        self._in_flight[key] = broadcaster
+        broadcaster.task.add_done_callback(lambda _: self._release(key, broadcaster))
+        return broadcaster
+
+    def _release(self, key: str, broadcaster: TurnBroadcaster):
+        if self._in_flight.get(key) is broadcaster:
+            del self._in_flight[key]
@@ -0,0 +1,100 @@
+"""
+Graceful drain of a worker process
+
+On SIGTERM the worker stops taking new turns, its health check fails so the load balancer routes new
+streams to the other workers, and the streams already running are finished before the server's own
+shutdown handler runs. Open-ended streams, like the live report updates, are ended right away, their
+clients reconnect to another worker with Last-Event-ID.
+
+"""
+
+import time
+import signal
+import asyncio
+import threading
+import logging
+from typing import AsyncGenerator, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class DrainController:
+    def __init__(self, timeout_seconds: float = 300.0, poll_interval: float = 0.2):
+        # the server is shut down after timeout_seconds even if streams are still running
+        self.timeout_seconds = timeout_seconds
+        self.poll_interval = poll_interval
+        self.draining = False
+        self.active_streams = 0
+
+        # other work the drain waits for, e.g. running jobs, each returns the number of running units
+        self._busy_checks: list[Callable[[], int]] = []
+        self._drained: asyncio.Event | None = None
+        self._previous_handler = None
+
+    def add_busy_check(self, check: Callable[[], int]):
+        self._busy_checks.append(check)
+
+    def busy_count(self) -> int:
+        return self.active_streams + sum(check() for check in self._busy_checks)
+
+    def install(self):
+        """Wrap the SIGTERM handler of the server, called on the event loop at startup."""
+        loop = asyncio.get_running_loop()
+        self._drained = asyncio.Event()
+        # signals can only be handled on the main thread, e.g. not under a test client
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self._previous_handler = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            if self.draining:
+                # a second SIGTERM shuts the server down right away
+                self._shutdown(signum, frame)
+                return
+            loop.call_soon_threadsafe(self.start_drain, signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+    def start_drain(self, signum: int = signal.SIGTERM, frame=None) -> asyncio.Task:
+        self.draining = True
+        if self._drained is None:
+            self._drained = asyncio.Event()
+        self._drained.set()
+        logger.info(f"draining, {self.busy_count()} streams and jobs running")
+        return asyncio.get_running_loop().create_task(self._drain(signum, frame))
+
+    async def wait_draining(self):
+        # resolves once the drain started, open-ended streams end on it
+        if self._drained is None:
+            self._drained = asyncio.Event()
+        await self._drained.wait()
+
+    async def track(self, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        """Count the stream as running until it is exhausted or closed."""
+        self.active_streams += 1
+        try:
+            async for frame in stream:
+                yield frame
+        finally:
+            self.active_streams -= 1
+
+    async def _drain(self, signum: int, frame):
+        deadline = time.monotonic() + self.timeout_seconds
+        while self.busy_count() > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+
+        remaining = self.busy_count()
+        if remaining:
+            logger.warning(f"drain timed out, {remaining} streams and jobs still running")
+        else:
+            logger.info("drained")
+        self._shutdown(signum, frame)
+
+    def _shutdown(self, signum: int, frame):
+        previous = self._previous_handler
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            # no handler of the server, the default action terminates the process
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.raise_signal(signal.SIGTERM)
@@ -0,0 +1,201 @@
+"""
+Detached background turns
+
+`/trigger?detach=true` enqueues the turn and returns a job id right away. A bounded pool of workers runs
+the turns, every sse frame is persisted to the job's event log, clients subscribe to the live stream or
+poll the persisted events later.
+
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncGenerator, Callable
+
+from .turns import TurnRegistry
+from .replay_buffer import frame_event_id
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str, status: str = "queued", created_at: float | None = None):
+        self.job_id = job_id
+        # queued -> running -> completed | failed
+        self.status = status
+        self.created_at = created_at or time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        job = cls(job_id=data["job_id"], status=data["status"], created_at=data["created_at"])
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        job.error = data.get("error")
+        return job
+
+
+class JobQueue:
+    def __init__(
+        self,
+        registry: TurnRegistry,
+        jobs_dir: Path,
+        workers: int = 4,
+        max_queued: int = 1000,
+        flush_interval: float = 0.5,
+    ):
+        self.registry = registry
+        self.jobs_dir = jobs_dir
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        # the events of a running job are written in batches, at most this many seconds apart
+        self.flush_interval = flush_interval
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs: dict[str, Job] = {}
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def submit(self, start_upstream: Callable[[], AsyncGenerator[str, None]]) -> Job:
+        """Enqueue a turn, the upstream is only created once a worker picks the job up."""
+        self._ensure_workers()
+
+        job = Job(job_id=uuid.uuid4().hex)
+        try:
+            self._queue.put_nowait((job, start_upstream))
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"job queue is full ({self._queue.maxsize} jobs)")
+
+        self._jobs[job.job_id] = job
+        self._save_status(job)
+        logger.info(f"queued job: {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        # finished jobs of earlier processes are read back from disk
+        if not job_id.isalnum():
+            return None
+        status_path = self._status_path(job_id)
+        if not status_path.exists():
+            return None
+        with open(status_path, "r", encoding="utf-8") as f:
+            return Job.from_dict(json.load(f))
+
+    def events_after(self, job_id: str, after: int = 0) -> list[tuple[int, str]]:
+        """Persisted (event id, sse frame) pairs of the job with an id greater than after."""
+        events_path = self._events_path(job_id)
+        if not events_path.exists():
+            return []
+
+        events = []
+        with open(events_path, "r", encoding="utf-8") as f:
+            for line in f:
+                event_id, frame = json.loads(line)
+                if event_id > after:
+                    events.append((event_id, frame))
+        return events
+
+    def active_count(self) -> int:
+        # queued and running jobs of this process
+        return len(self._jobs)
+
+    async def close(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def _ensure_workers(self):
+        # workers are started lazily, on the event loop of the first request
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            job, start_upstream = await self._queue.get()
+            try:
+                await self._run(job, start_upstream)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job, start_upstream: Callable[[], AsyncGenerator[str, None]]):
+        job.status = "running"
+        job.started_at = time.time()
+        self._save_status(job)
+        logger.info(f"running job: {job.job_id}")
+
+        # registered as a turn, so live subscribers can attach with Last-Event-ID as well
+        broadcaster = self.registry.start(self._persisted(job, start_upstream()), turn_id=job.job_id)
+        await broadcaster.task
+
+        job.finished_at = time.time()
+        if broadcaster.error is not None:
+            job.status = "failed"
+            job.error = str(broadcaster.error)
+        else:
+            job.status = "completed"
+        self._save_status(job)
+        # finished jobs are served from disk
+        self._jobs.pop(job.job_id, None)
+        logger.info(f"finished job: {job.job_id}, status: {job.status}")
+
+    async def _persisted(self, job: Job, upstream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        event_id = 0
+        pending: list[str] = []
+        last_flush = time.monotonic()
+        with open(self._events_path(job.job_id), "a", encoding="utf-8") as f:
+            try:
+                async for frame in upstream:
+                    event_id = frame_event_id(frame) or event_id + 1
+                    pending.append(json.dumps([event_id, frame], ensure_ascii=False) + "\n")
+                    yield frame
+
+                    if time.monotonic() - last_flush >= self.flush_interval:
+                        await asyncio.to_thread(self._write_events, f, pending)
+                        pending = []
+                        last_flush = time.monotonic()
+
+                # the end of the turn
+                await asyncio.to_thread(self._write_events, f, pending)
+                pending = []
+            finally:
+                # a failed or cancelled turn keeps the events produced so far
+                self._write_events(f, pending)
+
+    def _write_events(self, f, lines: list[str]):
+        if lines:
+            f.write("".join(lines))
+            f.flush()
+
+    def _save_status(self, job: Job):
+        with open(self._status_path(job.job_id), "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f)
+
+    def _status_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _events_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.events.jsonl"
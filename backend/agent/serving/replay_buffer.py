@@ -0,0 +1,110 @@
+"""
+Bounded replay buffer of the sse frames of a turn
+
+The latest frames are kept in memory, older frames are either dropped or spilled to disk. Frames carry
+the sse `id:` assigned by Agent.trigger, which is what a reconnecting client sends as Last-Event-ID.
+
+The spill file stays open while the turn runs, its writes are buffered and reach the disk in batches of
+`SPILL_BUFFER_BYTES`, or when a reconnecting client reads it.
+
+"""
+
+import json
+import logging
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SPILL_BUFFER_BYTES = 1 << 16
+
+
+def frame_event_id(frame: str) -> int | None:
+    # "id: 12\ndata: {...}\n\n" -> 12
+    if not frame.startswith("id: "):
+        return None
+    first_line = frame.split("\n", 1)[0]
+    try:
+        return int(first_line[4:])
+    except ValueError:
+        return None
+
+
+def frame_data(frame: str) -> str:
+    # "id: 12\ndata: {...}\n\n" -> "{...}"
+    for line in frame.split("\n"):
+        if line.startswith("data: "):
+            return line[6:]
+    return ""
+
+
+class ReplayGapError(Exception):
+    # the requested frames were evicted from memory and there is no disk spill
+    pass
+
+
+class ReplayBuffer:
+    def __init__(self, max_events: int = 20000, spill_path: Path | None = None):
+        self.max_events = max_events
+        self.spill_path = spill_path
+
+        self._frames: deque[tuple[int, str]] = deque()
+        self._spill_file = None
+        self._next_event_id = 1
+        # id of the oldest frame still available, from memory or from the spill file
+        self.first_event_id = 1
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def last_event_id(self) -> int:
+        return self._next_event_id - 1
+
+    def append(self, frame: str):
+        event_id = frame_event_id(frame)
+        if event_id is None:
+            event_id = self._next_event_id
+        self._next_event_id = event_id + 1
+        self._frames.append((event_id, frame))
+
+        if len(self._frames) > self.max_events:
+            evicted = self._frames.popleft()
+            if self.spill_path is not None:
+                if self._spill_file is None:
+                    self._spill_file = open(self.spill_path, "a", encoding="utf-8", buffering=SPILL_BUFFER_BYTES)
+                self._spill_file.write(json.dumps(evicted, ensure_ascii=False) + "\n")
+            else:
+                self.first_event_id = self._frames[0][0]
+
+    def frames_after(self, last_event_id: int | None = None) -> list[str]:
+        """Frames with an id greater than last_event_id, all frames if it is None."""
+        after = last_event_id or 0
+        if after + 1 < self.first_event_id:
+            raise ReplayGapError(f"frames after {after} are no longer available, oldest is {self.first_event_id}")
+
+        frames = []
+        oldest_in_memory = self._frames[0][0] if self._frames else self._next_event_id
+        if after + 1 < oldest_in_memory and self.spill_path is not None and self.spill_path.exists():
+            if self._spill_file is not None:
+                self._spill_file.flush()
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    event_id, frame = json.loads(line)
+                    if event_id > after:
+                        frames.append(frame)
+
+        frames.extend(frame for event_id, frame in self._frames if event_id > after)
+        return frames
+
+    def close(self):
+        # the turn is finished, no more frames are appended
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def discard(self):
+        self.close()
+        self._frames.clear()
+        if self.spill_path is not None and self.spill_path.exists():
+            self.spill_path.unlink()
@@ -0,0 +1,149 @@
+"""
+Live report updates
+
+Every report write is published to the subscribers of that report as a patch event, holding the new
+version and the line-range delta against the previous version. Clients apply the patches to their copy
+instead of re-downloading the report, and refetch it only when they missed a version.
+
+The store listeners only see the writes of this process. With several worker processes, the bus also
+polls the store version of the reports it has subscribers for, and publishes the writes of the other
+workers as catch-up patches.
+
+"""
+
+import asyncio
+import logging
+import threading
+
+from ..report_store import ReportSnapshot, ReportStore, ReportVersionNotFound
+from ..report_store.delta import compute_delta
+
+logger = logging.getLogger(__name__)
+
+
+def report_patch_event(snapshot: ReportSnapshot, base_version: int, delta: list[dict]) -> dict:
+    return {"type": "report_patch", "version": snapshot.version, "base_version": base_version, "delta": delta}
+
+
+def report_version_event(snapshot: ReportSnapshot) -> dict:
+    # tells the client the current version, it refetches the report if its copy is older
+    return {"type": "report_version", "version": snapshot.version}
+
+
+class ReportChangeBus:
+    def __init__(self, max_buffer: int = 256, store: ReportStore | None = None, poll_interval: float | None = None):
+        # per subscriber buffer, a subscriber falling further behind is told to resync instead
+        self.max_buffer = max_buffer
+        # the store is polled for writes of other processes if a poll interval is given
+        self.store = store
+        self.poll_interval = poll_interval
+        self._subscribers: dict[str | None, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        # last published version per subscribed report
+        self._versions: dict[str | None, int] = {}
+        # guards the two dicts above, publish and poll run on report writer and poll threads
+        self._lock = threading.Lock()
+        self._poll_task: asyncio.Task | None = None
+
+    def subscriber_count(self, user_id: str | None = None) -> int:
+        return len(self._subscribers.get(user_id, ()))
+
+    def publish(self, user_id: str | None, snapshot: ReportSnapshot, delta: list[dict]):
+        """Report store listener, may be called from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+            if not subscribers:
+                return
+            self._versions[user_id] = max(self._versions.get(user_id, 0), snapshot.version)
+
+        event = report_patch_event(snapshot, snapshot.version - 1, delta)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    def poll(self):
+        """Publish the writes of other processes to the subscribers of the reports, may be called from any thread."""
+        with self._lock:
+            known_versions = {user_id: self._versions.get(user_id) for user_id in self._subscribers}
+
+        # the store is read without the lock, the state is checked again before publishing
+        for user_id, known in known_versions.items():
+            # the version only, the content is read once it changed
+            head = self.store.read_head(user_id)
+            if known is None or head.version <= known:
+                with self._lock:
+                    if user_id in self._subscribers:
+                        self._versions.setdefault(user_id, head.version)
+                continue
+
+            current = self.store.read(user_id)
+            try:
+                base = self.store.read_version(user_id, known)
+                event = report_patch_event(current, known, compute_delta(base.content, current.content))
+            except ReportVersionNotFound:
+                event = report_version_event(current)
+
+            with self._lock:
+                # published meanwhile by a write of this process
+                if self._versions.get(user_id, 0) >= current.version or user_id not in self._subscribers:
+                    continue
+                self._versions[user_id] = current.version
+                subscribers = list(self._subscribers[user_id])
+            for loop, queue in subscribers:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+
+    async def _poll_loop(self):
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                # the store reads are blocking
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                logger.error(f"failed to poll report versions: {e}")
+
+    def _offer(self, queue: asyncio.Queue, event: dict):
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "report_version", "version": event["version"]})
+            return
+        queue.put_nowait(event)
+
+    def subscribe(self, user_id: str | None) -> "ReportSubscription":
+        # registers right away, so no write between subscribing and reading the current version is missed
+        return ReportSubscription(self, user_id)
+
+    def _register(self, user_id: str | None, entry: tuple[asyncio.AbstractEventLoop, asyncio.Queue]):
+        polled = self.store is not None and self.poll_interval is not None
+        # polled from the version at subscription, the subscriber reads the current version right after
+        version = self.store.read_head(user_id).version if polled else None
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+            if polled:
+                self._versions.setdefault(user_id, version)
+        if not polled:
+            return
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    def _unregister(self, user_id: str | None, entry: tuple[asyncio.AbstractEventLoop, asyncio.Queue]):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[user_id]
+                    self._versions.pop(user_id, None)
+
+
+class ReportSubscription:
+    def __init__(self, bus: ReportChangeBus, user_id: str | None):
+        self.bus = bus
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=bus.max_buffer)
+        self._entry = (asyncio.get_running_loop(), self.queue)
+        bus._register(user_id, self._entry)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self):
+        self.bus._unregister(self.user_id, self._entry)
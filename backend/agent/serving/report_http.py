@@ -0,0 +1,112 @@
+"""
+HTTP caching of the report
+
+The report endpoint is revalidated on every poll, so it answers with validators derived from the report
+version (ETag, Last-Modified) and 304 when the client copy is current. Changed reports are sent
+compressed, the gzip/br bodies are computed once per report version and cached.
+
+"""
+
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from ..report_store import ReportHead, ReportSnapshot
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def report_etag(snapshot: ReportHead) -> str:
+    # the update time guards against version numbers restarting, e.g. after switching the store
+    updated_ms = int((snapshot.updated_at or 0) * 1000)
+    return f'"{snapshot.version}-{updated_ms}"'
+
+
+def report_last_modified(snapshot: ReportHead) -> str:
+    return formatdate(snapshot.updated_at or 0, usegmt=True)
+
+
+def is_not_modified(snapshot: ReportHead, if_none_match: str | None, if_modified_since: str | None) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since
+    if if_none_match is not None:
+        etag = report_etag(snapshot)
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if if_modified_since is not None and snapshot.updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # http dates have a resolution of one second
+        return int(snapshot.updated_at) <= since
+
+    return False
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ["br", "gzip"]:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, 0.0) > 0:
+            return encoding
+    return None
+
+
+class CompressedReportCache:
+    # compressed report bodies, keyed by user, version and encoding, shared by the threadpool threads
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str | None, snapshot: ReportSnapshot, encoding: str) -> bytes:
+        key = (user_id, report_etag(snapshot), encoding)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+
+        raw = snapshot.content.encode("utf-8")
+        if encoding == "br":
+            body = brotli.compress(raw, mode=brotli.MODE_TEXT)
+        elif encoding == "gzip":
+            body = gzip.compress(raw, compresslevel=6)
+        else:
+            raise ValueError(f"unsupported encoding: {encoding}")
+
+        # compressed outside the lock, two threads may compress the same version once each
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
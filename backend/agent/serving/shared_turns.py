@@ -0,0 +1,167 @@
+"""
+Turn events shared by the worker processes of a host
+
+With several workers, a reconnecting client may land on another worker than the one running its turn.
+Every worker appends the frames of its turns to a shared SQLite log, any worker can then resume a turn
+by tailing the log from the client's Last-Event-ID. The frames are written in batches, every
+`flush_interval` seconds, by a thread, so the streams never wait for the database write lock.
+
+"""
+
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import AsyncGenerator
+
+from .replay_buffer import frame_event_id
+
+logger = logging.getLogger(__name__)
+
+
+class SharedTurnLog:
+    def __init__(self, db_path: Path, retention_seconds: float = 300.0, flush_interval: float = 0.02):
+        # finished turns are kept for retention_seconds, like the in-process registry
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS turns (turn_id TEXT PRIMARY KEY, done INTEGER NOT NULL, error TEXT, "
+                "updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS turn_events (turn_id TEXT NOT NULL, event_id INTEGER NOT NULL, "
+                "frame TEXT NOT NULL, PRIMARY KEY (turn_id, event_id))"
+            )
+
+    def start(self, turn_id: str):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO turns (turn_id, done, error, updated_at) VALUES (?, 0, NULL, ?)",
+                (turn_id, time.time()),
+            )
+
+    def append(self, turn_id: str, frames: list[tuple[int, str]]):
+        # (event_id, frame) pairs, in one transaction
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO turn_events (turn_id, event_id, frame) VALUES (?, ?, ?)",
+                [(turn_id, event_id, frame) for event_id, frame in frames],
+            )
+
+    def finish(self, turn_id: str, error: str | None = None):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE turns SET done = 1, error = ?, updated_at = ? WHERE turn_id = ?", (error, time.time(), turn_id)
+            )
+
+    def status(self, turn_id: str) -> tuple[bool, str | None] | None:
+        # (done, error), None for unknown or expired turns
+        row = self._connection().execute("SELECT done, error FROM turns WHERE turn_id = ?", (turn_id,)).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+
+    def frames_after(self, turn_id: str, last_event_id: int | None) -> list[tuple[int, str]]:
+        return self._connection().execute(
+            "SELECT event_id, frame FROM turn_events WHERE turn_id = ? AND event_id > ? ORDER BY event_id",
+            (turn_id, last_event_id or 0),
+        ).fetchall()
+
+    def expire(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._connection() as conn:
+            expired = [row[0] for row in conn.execute("SELECT turn_id FROM turns WHERE done = 1 AND updated_at < ?", (cutoff,))]
+            for turn_id in expired:
+                conn.execute("DELETE FROM turn_events WHERE turn_id = ?", (turn_id,))
+                conn.execute("DELETE FROM turns WHERE turn_id = ?", (turn_id,))
+
+    async def logged(self, turn_id: str, upstream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        """Pass the frames of a turn through, appending them to the log in batches. The turn is started already."""
+        error = None
+        event_id = 0
+        pending: list[tuple[int, str]] = []
+        finished = asyncio.Event()
+        flusher = asyncio.create_task(self._flush_loop(turn_id, pending, finished))
+        try:
+            async for frame in upstream:
+                event_id = frame_event_id(frame) or event_id + 1
+                pending.append((event_id, frame))
+                yield frame
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # the last batch is written before the turn is marked done, readers stop at done
+            finished.set()
+            await flusher
+            await asyncio.to_thread(self.finish, turn_id, error)
+
+    async def _flush_loop(self, turn_id: str, pending: list[tuple[int, str]], finished: asyncio.Event):
+        while not finished.is_set():
+            try:
+                await asyncio.wait_for(finished.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if not pending:
+                continue
+            batch = pending[:]
+            pending.clear()
+            try:
+                await asyncio.to_thread(self.append, turn_id, batch)
+            except Exception as e:
+                # the turn goes on, only resuming it on another worker misses these frames
+                logger.error(f"failed to log {len(batch)} frames of turn {turn_id}: {e}")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class RemoteTurn:
+    """A turn running in another worker, streamed from the shared log. Quacks like a TurnBroadcaster."""
+
+    def __init__(self, log: SharedTurnLog, turn_id: str, poll_interval: float = 0.1):
+        self.log = log
+        self.turn_id = turn_id
+        self.poll_interval = poll_interval
+
+    def can_resume(self, last_event_id: int | None = None) -> bool:
+        # the log keeps every event of a turn until it expires
+        return self.log.status(self.turn_id) is not None
+
+    async def subscribe(self, last_event_id: int | None = None) -> AsyncGenerator[str, None]:
+        cursor = last_event_id or 0
+        while True:
+            status = self.log.status(self.turn_id)
+            for event_id, frame in self.log.frames_after(self.turn_id, cursor):
+                cursor = event_id
+                yield frame
+
+            if status is None:
+                return
+            done, error = status
+            if done:
+                # the status was read before the frames, so the frames read last are complete
+                if error is not None:
+                    raise RuntimeError(error)
+                return
+            await asyncio.sleep(self.poll_interval)
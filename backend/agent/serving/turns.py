@@ -0,0 +1,88 @@
+"""
+Registry of running and recently completed turns, so that a dropped connection can resume a turn by
+its id instead of re-running it.
+
+With a shared turn log, the frames of every turn are appended to it as well, so that the turns of the
+other worker processes can be resumed from this one.
+
+"""
+
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import AsyncGenerator
+
+from .broadcast import TurnBroadcaster
+from .replay_buffer import ReplayBuffer
+from .shared_turns import SharedTurnLog, RemoteTurn
+
+logger = logging.getLogger(__name__)
+
+
+class TurnRegistry:
+    def __init__(
+        self,
+        retention_seconds: float = 300.0,
+        max_events: int = 20000,
+        spill_dir: Path | None = None,
+        shared_log: SharedTurnLog | None = None,
+    ):
+        # completed turns stay resumable for retention_seconds
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.spill_dir = spill_dir
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.shared_log = shared_log
+
+        self._turns: dict[str, TurnBroadcaster] = {}
+        self._shared_expired_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def start(self, upstream: AsyncGenerator[str, None], turn_id: str | None = None) -> TurnBroadcaster:
+        """Run the upstream turn in the background and register it under a new turn id."""
+        self._expire()
+
+        turn_id = turn_id or uuid.uuid4().hex
+        spill_path = self.spill_dir / f"{turn_id}.jsonl" if self.spill_dir is not None else None
+        replay_buffer = ReplayBuffer(max_events=self.max_events, spill_path=spill_path)
+        if self.shared_log is not None:
+            # visible to the other workers right away, before the first event
+            self.shared_log.start(turn_id)
+            upstream = self.shared_log.logged(turn_id, upstream)
+
+        broadcaster = TurnBroadcaster(upstream, replay_buffer=replay_buffer, turn_id=turn_id).start()
+        self._turns[turn_id] = broadcaster
+        logger.info(f"started turn: {turn_id}")
+        return broadcaster
+
+    def get(self, turn_id: str) -> TurnBroadcaster | RemoteTurn | None:
+        self._expire()
+        broadcaster = self._turns.get(turn_id)
+        if broadcaster is not None or self.shared_log is None:
+            return broadcaster
+
+        # a turn of another worker
+        if self.shared_log.status(turn_id) is None:
+            return None
+        return RemoteTurn(self.shared_log, turn_id)
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [
+            turn_id
+            for turn_id, broadcaster in self._turns.items()
+            if broadcaster.finished_at is not None and now - broadcaster.finished_at > self.retention_seconds
+        ]
+        for turn_id in expired:
+            broadcaster = self._turns.pop(turn_id)
+            broadcaster.history.discard()
+            logger.info(f"expired turn: {turn_id}")
+
+        # the shared log is cleaned up by every worker, once a minute is enough
+        if self.shared_log is not None and now - self._shared_expired_at > 60:
+            self._shared_expired_at = now
+            self.shared_log.expire()
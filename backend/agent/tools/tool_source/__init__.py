@@ -1,14 +1,29 @@
+import importlib
 
-from .write_html import WriteHTMLTool
-from .read_html import ReadHTMLTool
+# tool classes are imported on first access, so that importing the package does not load every tool
+_TOOL_MODULES = {
+    "WriteHTMLTool": ".write_html",
+    "ReadHTMLTool": ".read_html",
+    "ReadReportDiffTool": ".read_report_diff",
+    "DraftSectionsTool": ".draft_sections",
+    "CreateFormTool": ".create_form",
+    "CreateChoiceTool": ".create_choice",
+}
 
-from .create_form import CreateFormTool
-from .create_choice import CreateChoiceTool
+
+def __getattr__(name: str):
+    if name not in _TOOL_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    tool_class = getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
+    globals()[name] = tool_class
+    return tool_class
 
 
 __all__ = [
     "WriteHTMLTool",
     "ReadHTMLTool",
+    "ReadReportDiffTool",
+    "DraftSectionsTool",
     "CreateFormTool",
     "CreateChoiceTool",
-]
\ No newline at end of file
+]
@@ -2,23 +2,56 @@
 Tool base class definition
 
 1. tool schema
-2. tool function
+2. tool function, a coroutine or an async generator streaming its output (see ToolProgress)
 3. tool call message
 4. tool result message
+5. tool metadata, declared as class attributes
 
 """
 
 from abc import ABC, abstractmethod
+from typing import Literal
+
+from .helper.schema_validator import compile_schema
+
+
+class ToolProgress:
+    """
+    Progress note of a streaming tool, shown to the user but not part of the tool output.
+
+    A tool whose `call` is an async generator yields ToolProgress items and output chunks, text (str) or
+    content parts ({"type": "input_text" | "input_image", ...}). The chunks are joined into the tool output
+    once the generator is exhausted.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
 
 
 class BaseTool(ABC):
+    # context values the tool is called with besides its arguments, e.g. ("user_id",)
+    required_context: tuple[str, ...] = ()
+    # pure: result depends on the arguments only; read_only: reads external state, e.g. the report;
+    # side_effect: changes external state. Turns only calling pure and read_only tools can be cached
+    purity: Literal["pure", "read_only", "side_effect"] = "side_effect"
+    # rough cost of a call, cheap: local computation or storage, io: network calls, expensive: e.g. model calls.
+    # The agent runs a bounded number of expensive calls at a time, see Agent.start_tool_calls
+    cost_class: Literal["cheap", "io", "expensive"] = "io"
+    # seconds before a call is cancelled, None for no limit
+    timeout: float | None = None
+
+    def __init__(self):
+        # compiled once per tool, the arguments are passed as keyword arguments so unknown ones are rejected
+        parameters = self.get_schema().get("parameters", {})
+        self.validate_arguments = compile_schema({"additionalProperties": False, **parameters})
+
     @abstractmethod
     def get_schema(self) -> dict:
         raise NotImplementedError("Not implemented yet!")
 
     @abstractmethod
     async def call(self, **kwargs):
-        # the actual tool function
+        # the actual tool function, may also be an async generator, see ToolProgress
         raise NotImplementedError("Not implemented yet!")
 
     @abstractmethod
@@ -30,3 +63,7 @@ class BaseTool(ABC):
     def tool_result_message(self, **kwargs) -> str:
         # the result message to yield to front end
         raise NotImplementedError("Not implemented yet!")
+
+    def state_version(self, user_id: str | None = None) -> str | None:
+        # version of the external state the tool reads, None if the tool is stateless
+        return None
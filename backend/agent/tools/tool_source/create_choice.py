@@ -1,33 +1,13 @@
 from .base_tool import BaseTool
+from .schemas import CREATE_CHOICE_SCHEMA
 
 
 class CreateChoiceTool(BaseTool):
+    purity = "pure"
+    cost_class = "cheap"
+
     def get_schema(self) -> dict:
-        schema = {
-            "type": "function",
-            "name": "create_choice",
-            "description": "Show options for the user to choose from. Options are displayed directly in the chat UI and submitted by the user.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "description": {
-                        "type": "string",
-                        "description": "Question text or background context, displayed above the options."
-                    },
-                    "options": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of selectable options."
-                    },
-                    "single_choice": {
-                        "type": "boolean",
-                        "description": "Whether only a single option can be selected. true = single-choice, false = multi-choice."
-                    }
-                },
-                "required": ["options", "single_choice"]
-            },
-        }
-        return schema
+        return CREATE_CHOICE_SCHEMA
 
     async def call(self, options: list[str], single_choice: bool, description: str = ""):
         # The actual UI rendering is handled by the agent/UI layer.
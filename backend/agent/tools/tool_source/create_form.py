@@ -1,29 +1,13 @@
 from .base_tool import BaseTool
+from .schemas import CREATE_FORM_SCHEMA
 
 
 class CreateFormTool(BaseTool):
+    purity = "pure"
+    cost_class = "cheap"
+
     def get_schema(self) -> dict:
-        schema = {
-            "type": "function",
-            "name": "create_form",
-            "description": "Show a form for the user to fill in. The form is displayed directly in the chat UI and submitted by the user.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "description": {
-                        "type": "string",
-                        "description": "Instructions or background context for the form, displayed above the form."
-                    },
-                    "headers": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Field labels (one per row) that the user should fill in."
-                    }
-                },
-                "required": ["headers"]
-            },
-        }
-        return schema
+        return CREATE_FORM_SCHEMA
 
     async def call(self, headers: list[str], description: str = ""):
         # Create a form for the user to fill in.
@@ -0,0 +1,170 @@
+"""
+Parallel drafting of report sections
+
+The agent writes the outline of a long report first, with a placeholder line range per section, then
+hands the sections to this tool. Every section is drafted by its own sub-agent turn, a bounded number of
+them run concurrently, and the drafts are merged into the report with a single compare-and-swap write
+against the version the line ranges refer to. A long report then takes about as long as its longest
+section instead of a chain of write rounds.
+
+"""
+
+import os
+import asyncio
+import logging
+
+from .base_tool import ToolProgress
+from .report_tool import ReportTool
+from .schemas import DRAFT_REPORT_SECTIONS_SCHEMA
+from .helper.line_changes import apply_line_changes
+from ...report_store import split_lines, get_report_store, ReportVersionConflict
+
+logger = logging.getLogger(__name__)
+
+# sub-agent turns running at once, per call
+MAX_CONCURRENT_DRAFTS = int(os.getenv("SECTION_DRAFT_CONCURRENCY", "4"))
+MAX_SECTIONS = 12
+
+SECTION_WRITER_PROMPT = (
+    "You are one of several writers drafting a long HTML report in parallel, each writer drafts one section. "
+    "Write only the HTML of your section, using the style the outline describes. Do not add <html>, <head> "
+    "or <body> tags, do not wrap the HTML in markdown code fences, do not write the other sections."
+)
+
+
+class DraftSectionsTool(ReportTool):
+    required_context = ("user_id", "oai_client", "model", "rate_limiter")
+    cost_class = "expensive"
+    # covers all sections of a call, see _with_deadline in tools.py
+    timeout = 600.0
+
+    def get_schema(self) -> dict:
+        return DRAFT_REPORT_SECTIONS_SCHEMA
+
+    async def call(
+        self,
+        outline: str,
+        sections: list[dict],
+        user_id: str | None = None,
+        oai_client=None,
+        model: str | None = None,
+        rate_limiter=None,
+    ):
+        if oai_client is None:
+            yield "Sections cannot be drafted here, write them with write_html_report instead."
+            return
+        if not sections or len(sections) > MAX_SECTIONS:
+            yield f"Provide between 1 and {MAX_SECTIONS} sections."
+            return
+
+        ranges = sorted((section["start_line"], section["end_line"]) for section in sections)
+        for (start, end), (next_start, _) in zip(ranges, ranges[1:] + [(None, None)]):
+            if start > end or (next_start is not None and next_start <= end):
+                yield "Section line ranges must be valid and must not overlap, nothing was written."
+                return
+
+        # the line ranges refer to this version, the merge fails if the report changes in the meantime
+        report_store = get_report_store()
+        snapshot = await asyncio.to_thread(report_store.read, user_id)
+        logger.info(f"Drafting {len(sections)} sections of {user_id}, base version: {snapshot.version}")
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DRAFTS)
+
+        async def draft(index: int, section: dict) -> tuple[int, str | None, str | None]:
+            async with semaphore:
+                try:
+                    html = await self.draft_section(oai_client, model, rate_limiter, user_id, outline, section)
+                    return index, html, None
+                except Exception as e:
+                    logger.error(f"failed to draft section {index}: {e}")
+                    return index, None, str(e)
+
+        drafts: dict[int, str] = {}
+        failures: dict[int, str] = {}
+        tasks = [asyncio.create_task(draft(index, section)) for index, section in enumerate(sections)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, html, error = await finished
+                if error is None:
+                    drafts[index] = html
+                else:
+                    failures[index] = error
+                yield ToolProgress(f"drafted {len(drafts) + len(failures)}/{len(sections)} sections")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if not drafts:
+            yield "No section could be drafted, nothing was written: " + "; ".join(failures.values())
+            return
+
+        # one atomic write of all drafts
+        changes = [
+            {"start_line": sections[index]["start_line"], "end_line": sections[index]["end_line"], "change_to": html}
+            for index, html in sorted(drafts.items(), key=lambda item: sections[item[0]]["start_line"])
+        ]
+        content_updated = apply_line_changes(split_lines(snapshot.content), changes)
+        try:
+            # off the event loop, the write may wait for an fsync
+            updated = await asyncio.to_thread(
+                report_store.write, user_id, content_updated, expected_version=snapshot.version
+            )
+        except ReportVersionConflict as e:
+            logger.warning(f"Conflicting report write: {e}")
+            yield "Report was changed by another session while drafting, nothing was written. Read the current report and retry."
+            return
+
+        result = f"Drafted {len(drafts)} sections, report updated! Now at version {updated.version}."
+        if failures:
+            failed = ", ".join(f"lines {sections[index]['start_line']}-{sections[index]['end_line']}" for index in sorted(failures))
+            result += f" These sections failed and still hold their placeholders: {failed}."
+        yield result
+
+    async def draft_section(self, oai_client, model: str | None, rate_limiter, user_id: str | None, outline: str, section: dict) -> str:
+        """One sub-agent turn, returns the html of the section."""
+        if rate_limiter is not None:
+            await rate_limiter.acquire(user_id)
+
+        stream = await oai_client.responses.create(
+            model=model or "gpt-5.2",
+            input=[
+                {"role": "developer", "content": SECTION_WRITER_PROMPT},
+                {"role": "user", "content": f"Report outline:\n{outline}\n\nYour section:\n{section['instructions']}"},
+            ],
+            reasoning={"effort": "low"},
+            stream=True,
+        )
+        response = None
+        async for event in stream:
+            if getattr(event, "type", "") == "response.completed":
+                response = event.response
+
+        if response is None:
+            raise RuntimeError("the section response did not complete")
+        if rate_limiter is not None:
+            await rate_limiter.record_usage(user_id, getattr(response, "usage", None))
+
+        text = "".join(
+            content.text
+            for item in response.output
+            if item.type == "message"
+            for content in item.content
+            if content.type == "output_text"
+        )
+        return strip_code_fence(text)
+
+    def tool_call_message(self, **kwargs) -> str:
+        sections = kwargs.get("sections", [])
+        return f"Drafting {len(sections)} report sections in parallel..."
+
+    def tool_result_message(self, **kwargs) -> str:
+        return "Report sections drafted!"
+
+
+def strip_code_fence(text: str) -> str:
+    # models sometimes wrap the html in a markdown fence despite the prompt
+    stripped = text.strip()
+    if stripped.startswith("```") and stripped.endswith("```") and "\n" in stripped:
+        # drops the opening fence line, e.g. ```html
+        stripped = stripped[:-3].split("\n", 1)[1]
+    return stripped.strip()
@@ -1,9 +1,9 @@
-from PIL import Image
 import io
 import base64
-import httpx
 import logging
 
+# PIL and httpx are imported where they are used, they are slow to import and only needed by image tools
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,6 +34,8 @@ def bytes_to_base64(data: bytes) -> str:
 
     need_conversion = mime_type not in supported_types
     if need_conversion:
+        from PIL import Image
+
         try:
             image = Image.open(io.BytesIO(data))
             # Verify format
@@ -69,6 +71,8 @@ def bytes_to_base64(data: bytes) -> str:
 
 
 async def download_image_base64(url: str) -> str:
+    import httpx
+
     async with httpx.AsyncClient(timeout=60, follow_redirects=True) as client:
         res = await client.get(url)
         res.raise_for_status()
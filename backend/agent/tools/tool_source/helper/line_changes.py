@@ -0,0 +1,48 @@
+"""
+Line range replacement of the report
+
+Shared by the tools writing the report: every change replaces the lines from start_line to end_line
+(both inclusive) of the current report with its change_to content.
+
+"""
+
+
+def apply_line_changes(old_lines: list[str], changes: list[dict]) -> str:
+    """The report content after the changes, the ranges of the changes are assumed not to overlap."""
+    # copies, the changes are also the arguments of the tool call shown to the user
+    change_checklist = [{**change, "done": False} for change in changes]
+
+    content_updated = ""
+
+    # Special case: if the file is empty, apply all changes directly
+    if not old_lines:
+        for change in change_checklist:
+            change_to_content = change.get("change_to", "")
+            content_updated += change_to_content
+            if change_to_content and not change_to_content.endswith("\n"):
+                content_updated += "\n"
+            change["done"] = True
+        return content_updated
+
+    for line_idx, line in enumerate(old_lines):
+        # check if falls into change zone
+        need_change = False
+        for change in change_checklist:
+            start_line = change["start_line"]
+            end_line = change["end_line"]
+            if line_idx >= start_line and line_idx <= end_line:
+                need_change = True
+                if not change["done"]:
+                    # At the first line of the replacement range, inject the replacement content
+                    content_updated += change.get("change_to", "")
+                    # If change_to doesn't end with a newline, append one
+                    change_to_content = change.get("change_to", "")
+                    if change_to_content and not change_to_content.endswith("\n"):
+                        content_updated += "\n"
+                    change["done"] = True
+
+        if not need_change:
+            # Not in a replacement range; keep the original line
+            content_updated += line
+
+    return content_updated
@@ -0,0 +1,111 @@
+"""
+Tool argument validation
+
+Compiles the json schema of a tool's parameters once into nested check functions, so that validating the
+arguments of a call is a plain walk over the arguments. Only the subset of json schema used by tool
+schemas is supported: type, properties, required, additionalProperties, items, enum and const. Other
+keywords are ignored.
+
+"""
+
+from typing import Any, Callable
+
+Validator = Callable[[Any, str], None]
+
+TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    # bool is a subclass of int, but not a json integer
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+class ToolArgumentError(ValueError):
+    pass
+
+
+def compile_schema(schema: dict) -> Callable[[Any], None]:
+    """Return a function raising ToolArgumentError if its argument does not match the schema."""
+    validator = _compile(schema)
+
+    def validate(value: Any):
+        validator(value, "arguments")
+
+    return validate
+
+
+def _compile(schema: dict) -> Validator:
+    checks: list[Validator] = []
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        type_names = schema_type if isinstance(schema_type, list) else [schema_type]
+        type_checks = [TYPE_CHECKS[name] for name in type_names if name in TYPE_CHECKS]
+
+        def check_type(value, path):
+            if not any(type_check(value) for type_check in type_checks):
+                raise ToolArgumentError(f"{path}: expected {' or '.join(type_names)}, got {type(value).__name__}")
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path):
+            if value not in allowed:
+                raise ToolArgumentError(f"{path}: must be one of {allowed}")
+
+        checks.append(check_enum)
+
+    if "const" in schema:
+        expected = schema["const"]
+
+        def check_const(value, path):
+            if value != expected:
+                raise ToolArgumentError(f"{path}: must be {expected!r}")
+
+        checks.append(check_const)
+
+    properties = {name: _compile(sub_schema) for name, sub_schema in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    additional_validator = _compile(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    raise ToolArgumentError(f"{path}: missing required property '{name}'")
+            for name, item in value.items():
+                property_validator = properties.get(name)
+                if property_validator is not None:
+                    property_validator(item, f"{path}.{name}")
+                elif additional is False:
+                    raise ToolArgumentError(f"{path}: unexpected property '{name}'")
+                elif additional_validator is not None:
+                    additional_validator(item, f"{path}.{name}")
+
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        item_validator = _compile(schema["items"])
+
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return
+            for index, item in enumerate(value):
+                item_validator(item, f"{path}[{index}]")
+
+        checks.append(check_items)
+
+    def validate(value, path):
+        for check in checks:
+            check(value, path)
+
+    return validate
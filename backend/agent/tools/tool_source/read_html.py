@@ -1,40 +1,27 @@
-from pathlib import Path
+import asyncio
 
-from .base_tool import BaseTool
+from .report_tool import ReportTool
+from .schemas import READ_CURRENT_REPORT_SCHEMA
+from ...report_store import split_lines, get_report_store
 
 
-class ReadHTMLTool(BaseTool):
+class ReadHTMLTool(ReportTool):
+    purity = "read_only"
+    cost_class = "cheap"
+
     def get_schema(self) -> dict:
-        schema = {
-            "type": "function",
-            "name": "read_current_report",
-            "description": (
-                "Get the current HTML report content. Each line is prefixed with a line number starting from 0. "
-                "Use this to inspect the report before making edits."
-            ),
-            "parameters": {
-                "type": "object",
-                "properties": {}
-            },
-        }
-        return schema
+        return READ_CURRENT_REPORT_SCHEMA
 
     async def call(self, user_id: str | None = None):
-        # Get the current report content
-        filename = f"html_report_{user_id}.html" if user_id else "html_report.html"
-        html_path = Path(__file__).parent.parent.parent.parent.parent / "temp" / "reports" / filename
-
-        # if file not exists, create it
-        if not html_path.exists():
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write("")
-
-        with open(html_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        
+        # Get the current report content, off the event loop
+        snapshot = await asyncio.to_thread(get_report_store().read, user_id)
+        lines = split_lines(snapshot.content)
+
         # Prefix each line with its line number
         numbered_lines = [f"{i}|{line}" for i, line in enumerate(lines)]
-        return "".join(numbered_lines) if numbered_lines else "(Report is empty)"
+        if not numbered_lines:
+            return "(Report is empty)"
+        return f"(Report version {snapshot.version})\n" + "".join(numbered_lines)
 
     def tool_call_message(self, **kwargs) -> str:
         return "Reading current report..."
@@ -0,0 +1,29 @@
+import asyncio
+
+from .report_tool import ReportTool
+from .schemas import READ_REPORT_DIFF_SCHEMA
+from ...report_store import get_report_store, ReportVersionNotFound
+
+
+class ReadReportDiffTool(ReportTool):
+    purity = "read_only"
+    cost_class = "cheap"
+
+    def get_schema(self) -> dict:
+        return READ_REPORT_DIFF_SCHEMA
+
+    async def call(self, since_version: int, user_id: str | None = None):
+        try:
+            current, diff = await asyncio.to_thread(get_report_store().diff_since, user_id, since_version)
+        except ReportVersionNotFound:
+            return f"Version {since_version} is not available, use read_current_report instead."
+
+        if not diff:
+            return f"No changes since version {since_version}, the current version is {current.version}."
+        return f"Current version: {current.version}. Changes since version {since_version}:\n{diff}"
+
+    def tool_call_message(self, **kwargs) -> str:
+        return f"Reading report changes since version {kwargs.get('since_version')}..."
+
+    def tool_result_message(self, **kwargs) -> str:
+        return "Report changes read."
@@ -0,0 +1,11 @@
+from .base_tool import BaseTool
+from ...report_store import get_report_store
+
+
+class ReportTool(BaseTool):
+    # tools reading or writing the report of the user, the report version is their external state
+    required_context = ("user_id",)
+
+    def state_version(self, user_id: str | None = None) -> str | None:
+        # the version file or row only, not the report content
+        return str(get_report_store().read_head(user_id).version)
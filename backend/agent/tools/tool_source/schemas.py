@@ -0,0 +1,173 @@
+"""
+Static tool schemas
+
+Declared apart from the tool classes, so that the agent can list its tools without importing (and
+creating) them. Tools are only created on their first call, see `tools.py`.
+
+"""
+
+WRITE_HTML_REPORT_SCHEMA = {
+    "type": "function",
+    "name": "write_html_report",
+    "description": (
+        "Create a report or update the current report. Replace lines from start_line to end_line "
+        "(both inclusive) with the provided content. Note: ranges across multiple changes must not overlap."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "changes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "start_line": {
+                            "type": "integer",
+                            "description": "Start line number to replace (inclusive)."
+                        },
+                        "end_line": {
+                            "type": "integer",
+                            "description": "End line number to replace (inclusive)."
+                        },
+                        "change_to": {
+                            "type": "string",
+                            "description": "Replacement content.",
+                        }
+                    },
+                    "required": ["start_line", "end_line", "change_to"]
+                }
+            }
+        },
+        "required": ["changes"]
+    },
+}
+
+READ_CURRENT_REPORT_SCHEMA = {
+    "type": "function",
+    "name": "read_current_report",
+    "description": (
+        "Get the current HTML report content. Each line is prefixed with a line number starting from 0. "
+        "Use this to inspect the report before making edits."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {}
+    },
+}
+
+READ_REPORT_DIFF_SCHEMA = {
+    "type": "function",
+    "name": "read_report_diff",
+    "description": (
+        "Get only the changes of the HTML report since an earlier version, cheaper than reading the whole "
+        "report again. Changed lines are prefixed with their line number in the current report."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "since_version": {
+                "type": "integer",
+                "description": "The report version to compare against, as returned by the other report tools."
+            }
+        },
+        "required": ["since_version"]
+    },
+}
+
+CREATE_FORM_SCHEMA = {
+    "type": "function",
+    "name": "create_form",
+    "description": "Show a form for the user to fill in. The form is displayed directly in the chat UI and submitted by the user.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "description": {
+                "type": "string",
+                "description": "Instructions or background context for the form, displayed above the form."
+            },
+            "headers": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Field labels (one per row) that the user should fill in."
+            }
+        },
+        "required": ["headers"]
+    },
+}
+
+CREATE_CHOICE_SCHEMA = {
+    "type": "function",
+    "name": "create_choice",
+    "description": "Show options for the user to choose from. Options are displayed directly in the chat UI and submitted by the user.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "description": {
+                "type": "string",
+                "description": "Question text or background context, displayed above the options."
+            },
+            "options": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of selectable options."
+            },
+            "single_choice": {
+                "type": "boolean",
+                "description": "Whether only a single option can be selected. true = single-choice, false = multi-choice."
+            }
+        },
+        "required": ["options", "single_choice"]
+    },
+}
+
+DRAFT_REPORT_SECTIONS_SCHEMA = {
+    "type": "function",
+    "name": "draft_report_sections",
+    "description": (
+        "Draft several sections of a long report in parallel. First write the report outline with "
+        "write_html_report, with a placeholder line for every section, then call this tool with the line "
+        "range of each placeholder and what the section should contain. Each section is drafted by its own "
+        "writer, all drafts are written to the report at once. Much faster than writing long reports "
+        "section by section."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "outline": {
+                "type": "string",
+                "description": "Topic, audience, style and the list of all sections, shared with every writer."
+            },
+            "sections": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "start_line": {
+                            "type": "integer",
+                            "description": "First line of the placeholder the section replaces (inclusive)."
+                        },
+                        "end_line": {
+                            "type": "integer",
+                            "description": "Last line of the placeholder the section replaces (inclusive)."
+                        },
+                        "instructions": {
+                            "type": "string",
+                            "description": "Title and content of the section, with the facts and data it should present."
+                        }
+                    },
+                    "required": ["start_line", "end_line", "instructions"]
+                }
+            }
+        },
+        "required": ["outline", "sections"]
+    },
+}
+
+TOOL_SCHEMAS = {
+    "write_html_report": WRITE_HTML_REPORT_SCHEMA,
+    "read_current_report": READ_CURRENT_REPORT_SCHEMA,
+    "read_report_diff": READ_REPORT_DIFF_SCHEMA,
+    "draft_report_sections": DRAFT_REPORT_SECTIONS_SCHEMA,
+    "create_form": CREATE_FORM_SCHEMA,
+    "create_choice": CREATE_CHOICE_SCHEMA,
+}
@@ -1,110 +1,44 @@
-from pathlib import Path
+import asyncio
 
-from .base_tool import BaseTool
+from .report_tool import ReportTool
+from .schemas import WRITE_HTML_REPORT_SCHEMA
+from .helper.line_changes import apply_line_changes
+from ...report_store import split_lines, get_report_store, ReportVersionConflict
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-class WriteHTMLTool(BaseTool):
+class WriteHTMLTool(ReportTool):
+    cost_class = "cheap"
+
     def get_schema(self) -> dict:
-        schema = {
-            "type": "function",
-            "name": "write_html_report",
-            "description": (
-                "Create a report or update the current report. Replace lines from start_line to end_line "
-                "(both inclusive) with the provided content. Note: ranges across multiple changes must not overlap."
-            ),
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "changes": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "start_line": {
-                                    "type": "integer",
-                                    "description": "Start line number to replace (inclusive)."
-                                },
-                                "end_line": {
-                                    "type": "integer",
-                                    "description": "End line number to replace (inclusive)."
-                                },
-                                "change_to": {
-                                    "type": "string",
-                                    "description": "Replacement content.",
-                                }
-                            }
-                        }
-                    }
-                },
-            },
-        }
-        return schema
+        return WRITE_HTML_REPORT_SCHEMA
 
     async def call(self, changes: list[dict], user_id: str | None = None):
         # update the content from start_line to end_line(both inclusive)
 
         # load original content
-        filename = f"html_report_{user_id}.html" if user_id else "html_report.html"
-        html_path = Path(__file__).parent.parent.parent.parent.parent / "temp" / "reports" / filename
-
-        logger.info(f"Writing html report to: {html_path}")
-
-        # if file not exists, create it
-        if not html_path.exists():
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write("")
-
-            logger.info(f"Created new html report file: {html_path}")
+        report_store = get_report_store()
+        snapshot = await asyncio.to_thread(report_store.read, user_id)
+        old_lines = split_lines(snapshot.content)
 
-        with open(html_path, "r", encoding="utf-8") as f:
-            old_lines = f.readlines()
+        logger.info(f"Writing html report of {user_id}, base version: {snapshot.version}")
 
         # we assume that all change intervals are mutually exclusive
-        change_checklist = []
-        for change in changes:
-            change["done"] = False
-            change_checklist.append(change)
-
-        content_updated = ""
-        
-        # Special case: if the file is empty, apply all changes directly
-        if not old_lines:
-            for change in change_checklist:
-                change_to_content = change.get("change_to", "")
-                content_updated += change_to_content
-                if change_to_content and not change_to_content.endswith("\n"):
-                    content_updated += "\n"
-                change["done"] = True
-        else:
-            for line_idx, line in enumerate(old_lines):
-                # check if falls into change zone
-                need_change = False
-                for change in change_checklist:
-                    start_line = change["start_line"]
-                    end_line = change["end_line"]
-                    if line_idx >= start_line and line_idx <= end_line:
-                        need_change = True
-                        if not change["done"]:
-                            # At the first line of the replacement range, inject the replacement content
-                            content_updated += change.get("change_to", "")
-                            # If change_to doesn't end with a newline, append one
-                            change_to_content = change.get("change_to", "")
-                            if change_to_content and not change_to_content.endswith("\n"):
-                                content_updated += "\n"
-                            change["done"] = True
-                            
-                if not need_change:
-                    # Not in a replacement range; keep the original line
-                    content_updated += line
-
-        # update the file
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(content_updated)
-        
-        return "Report updated!"
+        content_updated = apply_line_changes(old_lines, changes)
+
+        # update the report, unless another turn changed it in the meantime
+        try:
+            # off the event loop, the write may wait for an fsync
+            updated = await asyncio.to_thread(
+                report_store.write, user_id, content_updated, expected_version=snapshot.version
+            )
+        except ReportVersionConflict as e:
+            logger.warning(f"Conflicting report write: {e}")
+            return "Report was changed by another session while updating, nothing was written. Read the current report and retry."
+
+        return f"Report updated! Now at version {updated.version}."
 
     def tool_call_message(self, **kwargs) -> str:
         update_message = ""
@@ -1,58 +1,144 @@
-from .tool_source import (
-    WriteHTMLTool,
-    ReadHTMLTool,
-)
+import copy
+import json
+import time
+import asyncio
+import inspect
+import importlib
+from typing import AsyncGenerator
+
+from .tool_source.base_tool import BaseTool, ToolProgress
+from .tool_source.helper.schema_validator import ToolArgumentError
+from .tool_source.schemas import TOOL_SCHEMAS
 
 import logging
 logger = logging.getLogger(__name__)
 
-TOOL_MAPPING = {
-    "write_html_report": WriteHTMLTool(),
-    "read_current_report": ReadHTMLTool(),
+# tool name -> (module in tool_source, class name), a tool is imported and created on its first use
+TOOL_REGISTRY = {
+    "write_html_report": (".write_html", "WriteHTMLTool"),
+    "read_current_report": (".read_html", "ReadHTMLTool"),
+    "read_report_diff": (".read_report_diff", "ReadReportDiffTool"),
+    "draft_report_sections": (".draft_sections", "DraftSectionsTool"),
 }
 
+_tool_instances: dict[str, BaseTool] = {}
+
+
+def get_tool(func_name: str) -> BaseTool:
+    """Return the tool instance of a registered tool, creating it on first use."""
+    tool = _tool_instances.get(func_name)
+    if tool is not None:
+        return tool
+
+    if func_name not in TOOL_REGISTRY:
+        raise ValueError(f"function name unknown!{func_name}")
+
+    module_name, class_name = TOOL_REGISTRY[func_name]
+    module = importlib.import_module(module_name, f"{__package__}.tool_source")
+    tool = getattr(module, class_name)()
+    _tool_instances[func_name] = tool
+    return tool
+
 
 def get_tool_schema_list(tool_names: list[str]) -> list[dict]:
     """Return the tool schema list for the given tool names."""
-    tool_list = [tool.get_schema() for tool_name, tool in TOOL_MAPPING.items() if tool_name in tool_names]
+    # the static schemas, listing the tools does not create them
+    tool_list = [copy.deepcopy(TOOL_SCHEMAS[tool_name]) for tool_name in TOOL_REGISTRY if tool_name in tool_names]
     return tool_list
 
 
-async def call_tool(func_name: str, kwargs: dict, user_id: str | None = None):
-    """Call the corresponding tool by function name and kwargs, and return its result."""
+async def call_tool(func_name: str, kwargs: dict, user_id: str | None = None, **context):
+    """
+    Call the corresponding tool by function name and kwargs, and return its result.
+    `context` holds further values tools may declare in required_context, e.g. the oai_client of the agent.
+    """
     # call the tool
-    if func_name not in TOOL_MAPPING:
-        raise ValueError(f"function name unknown!{func_name}")
+    tool = get_tool(func_name)
 
-    tool = TOOL_MAPPING[func_name]
+    # reject malformed arguments before the tool does any work, raises ToolArgumentError
+    tool.validate_arguments(kwargs)
 
-    # Special handling for tools that need user_id
-    if func_name in ["write_html_report", "read_current_report", "get_rednote_account_info"]:
-        kwargs["user_id"] = user_id
+    # inject the context values the tool declares, into a new dict, the caller still shows the arguments
+    context = {"user_id": user_id, **context}
+    kwargs = {**kwargs, **{name: context.get(name) for name in tool.required_context}}
 
     # call the function
-    logger.info(f"call tool: {func_name}, kwargs: {kwargs}")
-    result = await tool.call(**kwargs)
-
-    return result
+    # the arguments may hold whole reports and user data, their content is only logged at debug level
+    logger.info(f"call tool: {func_name}, arguments: {len(json.dumps(kwargs, ensure_ascii=False, default=str))} chars")
+    logger.debug(f"call tool: {func_name}, kwargs: {kwargs}")
+    if inspect.isasyncgenfunction(tool.call):
+        # streaming tool, the caller consumes the chunks
+        if tool.timeout is not None:
+            return _with_deadline(tool.call(**kwargs), tool.timeout)
+        return tool.call(**kwargs)
+
+    if tool.timeout is not None:
+        return await asyncio.wait_for(tool.call(**kwargs), timeout=tool.timeout)
+    return await tool.call(**kwargs)
+
+
+async def _with_deadline(chunks: AsyncGenerator, timeout: float) -> AsyncGenerator:
+    # the timeout of a streaming tool covers the whole stream, not each chunk
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+def get_tool_state(tool_names: list[str], user_id: str | None = None) -> dict:
+    """Return the versions of the external state the given tools read, e.g. the report content version."""
+    tool_state = {}
+    # tools sharing the state_version of a base class, e.g. the report tools, read their state once
+    versions = {}
+    for tool_name in tool_names:
+        if tool_name not in TOOL_REGISTRY:
+            continue
+        tool = get_tool(tool_name)
+        state_version = type(tool).state_version
+        if state_version not in versions:
+            versions[state_version] = tool.state_version(user_id)
+        if versions[state_version] is not None:
+            tool_state[tool_name] = versions[state_version]
+    return tool_state
+
+
+def is_side_effect_free(func_name: str) -> bool:
+    # unknown tools (e.g. the built-in web search) are treated as non-deterministic
+    if func_name not in TOOL_REGISTRY:
+        return False
+    return get_tool(func_name).purity != "side_effect"
+
+
+def is_expensive(func_name: str) -> bool:
+    return func_name in TOOL_REGISTRY and get_tool(func_name).cost_class == "expensive"
 
 
 def tool_call_progress_message(func_name: str, kwargs: dict) -> str:
     # Tool call progress message
-    if func_name not in TOOL_MAPPING:
-        raise ValueError(f"function name unknown!{func_name}")
-
-    tool = TOOL_MAPPING[func_name]
+    tool = get_tool(func_name)
     return tool.tool_call_message(**kwargs)
 
 
 def tool_result_progress_message(func_name: str, kwargs: dict) -> str:
     # Tool result progress message
-    if func_name not in TOOL_MAPPING:
-        raise ValueError(f"function name unknown!{func_name}")
-
-    tool = TOOL_MAPPING[func_name]
+    tool = get_tool(func_name)
     return tool.tool_result_message(**kwargs)
 
 
-__all__ = ["get_tool_schema_list", "call_tool", "tool_call_progress_message"]
+__all__ = [
+    "ToolArgumentError",
+    "ToolProgress",
+    "get_tool",
+    "get_tool_schema_list",
+    "call_tool",
+    "get_tool_state",
+    "is_side_effect_free",
+    "is_expensive",
+    "tool_call_progress_message",
+]
@@ -1,16 +1,137 @@
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from agent.agent_openai.factory import create_report_agent
+from agent.agent_openai.response_cache import ResponseCache
+from agent.agent_openai.router import TurnRouter, DEFAULT_ROUTES, FAST_ANSWER_ROUTES
+from agent.agent_openai.turn_memory import TurnMemoryStats
+from agent.rate_limit import create_rate_limiter
+from agent.attachments import create_attachment_manager
+from agent.agent_openai import oai_client
+from agent.serving import (
+    SingleFlight,
+    TurnRegistry,
+    TurnBroadcaster,
+    JobQueue,
+    JobQueueFull,
+    ReportChangeBus,
+    SharedTurnLog,
+    frame_data,
+)
+from agent.serving.drain import DrainController
+from agent.serving.report_events import report_patch_event, report_version_event
+from agent.report_store.delta import compute_delta
+from agent.report_store import ReportHead, ReportVersionNotFound
 from agent.schema import UIContext
+from agent.report_store import get_report_store
+from agent.serving.report_http import (
+    CompressedReportCache,
+    MIN_COMPRESS_BYTES,
+    is_not_modified,
+    negotiate_encoding,
+    report_etag,
+    report_last_modified,
+)
 from agent.logging_utils import setup_logging
+from agent.event_loop import event_loop_name
 
 setup_logging()
 
-app = FastAPI()
+# worker processes serving the app, see __main__. Turns are shared by the workers through a SQLite log,
+# so any worker can resume any turn, the reports and rate limits have their own shared backends.
+workers = int(os.getenv("WORKERS", "1"))
+shared_state_path = os.getenv("SHARED_STATE_PATH")
+if shared_state_path is None and workers > 1:
+    shared_state_path = str(Path(__file__).parent.parent / "temp" / "shared_state.db")
+
+# on SIGTERM, running streams are finished before shutting down while new turns are turned away
+drain = DrainController(timeout_seconds=float(os.getenv("DRAIN_TIMEOUT_SECONDS", "300")))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    drain.install()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+# opt-in exact-match response cache, shared by all requests of this process
+response_cache = None
+if os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1":
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600")),
+    )
+cache_replay_realtime = os.getenv("RESPONSE_CACHE_REPLAY", "instant") == "realtime"
+
+# opt-in per-turn routing of model and reasoning effort, its decisions and latencies are kept for tuning
+turn_router = None
+if os.getenv("ROUTING_ENABLED", "0") == "1":
+    routing_log_path = os.getenv("ROUTING_LOG_PATH")
+    routes = FAST_ANSWER_ROUTES if os.getenv("ROUTING_FAST_ANSWERS", "0") == "1" else DEFAULT_ROUTES
+    turn_router = TurnRouter(routes=routes, log_path=Path(routing_log_path) if routing_log_path else None)
+
+# per-user and global request and token budgets of the upstream model calls, off unless a limit is set
+rate_limiter = create_rate_limiter()
+
+# tool output images are uploaded once and referenced by file id, off unless IMAGE_STORE is set
+attachment_manager = create_attachment_manager(oai_client)
+
+# bytes held per turn, capped by TURN_MAX_BYTES, with the peaks of recent turns for sizing the workers
+max_turn_bytes = int(os.getenv("TURN_MAX_BYTES")) if os.getenv("TURN_MAX_BYTES") else None
+turn_memory_stats = TurnMemoryStats()
+
+# identical in-flight turns of the same user share a single upstream turn
+turn_coalescer = SingleFlight() if os.getenv("COALESCE_TURNS", "1") == "1" else None
+
+# running and recently completed turns, resumable with Last-Event-ID
+turn_spill_dir = os.getenv("TURN_SPILL_DIR")
+turn_registry = TurnRegistry(
+    retention_seconds=float(os.getenv("TURN_RETENTION_SECONDS", "300")),
+    max_events=int(os.getenv("TURN_REPLAY_MAX_EVENTS", "20000")),
+    spill_dir=Path(turn_spill_dir) if turn_spill_dir else None,
+    shared_log=SharedTurnLog(
+        Path(shared_state_path), retention_seconds=float(os.getenv("TURN_RETENTION_SECONDS", "300"))
+    )
+    if shared_state_path
+    else None,
+)
+
+# detached turns, run by a bounded worker pool with their events persisted to disk
+job_queue = JobQueue(
+    registry=turn_registry,
+    jobs_dir=Path(os.getenv("JOBS_DIR", str(Path(__file__).parent.parent / "temp" / "jobs"))),
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("JOB_QUEUE_SIZE", "1000")),
+    flush_interval=float(os.getenv("JOB_EVENTS_FLUSH_SECONDS", "0.5")),
+)
+drain.add_busy_check(job_queue.active_count)
+
+# compressed report bodies, computed once per report version
+compressed_reports = CompressedReportCache(max_entries=int(os.getenv("REPORT_COMPRESSED_CACHE_ENTRIES", "256")))
+
+# live report updates, fed by the write path of the report store, and by polling it for the writes of the
+# other workers
+report_change_bus = ReportChangeBus(
+    store=get_report_store(),
+    poll_interval=float(os.getenv("REPORT_POLL_SECONDS", "0.5")) if workers > 1 else None,
+)
+get_report_store().add_listener(report_change_bus.publish)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
 
 # Enable CORS
 app.add_middleware(
@@ -19,6 +140,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Turn-Id", "X-Report-Version", "ETag"],
 )
 
 # Serve static files for the frontend
@@ -26,35 +148,102 @@ static_dir = Path(__file__).parent / "frontend" / "dist"
 if static_dir.exists():
     app.mount("/assets", StaticFiles(directory=static_dir / "assets"), name="assets")
 
-# Serve html_report.html - path should match tools.py location
-# tools.py writes to: project_root/temp/reports/
-reports_dir = Path(__file__).parent.parent / "temp" / "reports"
+def report_headers(head: ReportHead) -> dict:
+    # Clients may keep a copy, but must revalidate it on every load
+    return {
+        "Cache-Control": "no-cache",
+        "ETag": report_etag(head),
+        "Last-Modified": report_last_modified(head),
+        "Vary": "Accept-Encoding",
+        "X-Report-Version": str(head.version),
+    }
+
 
+# Serve the report of the user from the configured report store (REPORT_STORE)
 @app.get("/temp/html_report.html")
-def serve_html_report(user_id: str | None = None):
-    from fastapi.responses import FileResponse
-    
-    filename = f"html_report_{user_id}.html" if user_id else "html_report.html"
-    target_path = reports_dir / filename
-    
-    # Disable cache to ensure always returning the latest file
-    if target_path.exists():
-        return FileResponse(
-            target_path,
-            media_type="text/html",
-            headers={
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0"
-            }
-        )
-    else:
-        from fastapi.responses import HTMLResponse
+def serve_html_report(
+    user_id: str | None = None,
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    from fastapi.responses import HTMLResponse, Response
+
+    report_store = get_report_store()
+    # the validators come from the version only, a 304 does not read the report
+    head = report_store.read_head(user_id)
+    if head.exists and is_not_modified(head, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=report_headers(head))
+
+    snapshot = report_store.read(user_id)
+    if not snapshot.exists:
         return HTMLResponse(
             content="<html><body><h2>No report yet</h2><p>Please chat with AI to generate a report first</p></body></html>",
-            status_code=200
+            status_code=200,
+            headers={"Cache-Control": "no-cache"},
         )
 
+    headers = report_headers(snapshot)
+    # the report may have changed since the version was read
+    if is_not_modified(snapshot, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None and len(snapshot.content) >= MIN_COMPRESS_BYTES:
+        body = compressed_reports.get(user_id, snapshot, encoding)
+        return Response(
+            content=body,
+            media_type="text/html; charset=utf-8",
+            headers={**headers, "Content-Encoding": encoding},
+        )
+
+    return HTMLResponse(content=snapshot.content, headers=headers)
+
+
+@app.get("/reports/events")
+async def report_events(user_id: str | None = None, last_event_id: str | None = Header(default=None)):
+    # push channel of report changes, the sse id is the report version
+    report_store = get_report_store()
+
+    def to_sse(event: dict) -> str:
+        return f"id: {event['version']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    def initial_event() -> dict:
+        current = report_store.read(user_id)
+        known_version = parse_last_event_id(last_event_id)
+        if known_version is not None and 0 < known_version < current.version:
+            # a reconnecting client catches up with a single patch
+            try:
+                base = report_store.read_version(user_id, known_version)
+                return report_patch_event(current, known_version, compute_delta(base.content, current.content))
+            except ReportVersionNotFound:
+                pass
+        return report_version_event(current)
+
+    async def event_stream():
+        # subscribe before reading the current version, so no write falls in between
+        subscription = report_change_bus.subscribe(user_id)
+        # the stream never ends on its own, it ends on drain and the client reconnects to another worker
+        draining = asyncio.ensure_future(drain.wait_draining())
+        try:
+            yield to_sse(initial_event())
+            while True:
+                next_event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({next_event, draining}, timeout=15, return_when=asyncio.FIRST_COMPLETED)
+                if next_event not in done:
+                    next_event.cancel()
+                    if draining in done:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield to_sse(next_event.result())
+        finally:
+            draining.cancel()
+            subscription.close()
+
+    reject_if_draining()
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 
 @app.get("/")
 def root():
@@ -63,26 +252,156 @@ def root():
 
 @app.get("/health")
 def health():
+    # failing while draining takes the worker out of the load balancer's rotation
+    if drain.draining:
+        return JSONResponse(content={"status": "draining"}, status_code=503)
     return 200
 
 
-@app.post("/trigger")
-async def trigger(input: UIContext):
+def reject_if_draining():
+    if drain.draining:
+        raise HTTPException(
+            status_code=503,
+            detail="server is shutting down, please retry",
+            headers={"Retry-After": "1", "Connection": "close"},
+        )
+
+
+@app.get("/routing/stats")
+def routing_stats():
+    if turn_router is None:
+        raise HTTPException(status_code=404, detail="routing is not enabled")
+    return turn_router.stats()
+
+
+@app.get("/memory/stats")
+def memory_stats():
+    # peak bytes of recent turns, to estimate how many concurrent streams fit in a worker
+    return turn_memory_stats.stats()
+
+
+def stream_turn(broadcaster: TurnBroadcaster, last_event_id: int | None = None) -> StreamingResponse:
+    if not broadcaster.can_resume(last_event_id):
+        raise HTTPException(status_code=410, detail="events are no longer available, please retry the turn")
 
-    agent = create_report_agent()
-    response_generator = agent.trigger(input)
     return StreamingResponse(
-        response_generator,
+        drain.track(broadcaster.subscribe(last_event_id)),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers={**SSE_HEADERS, "X-Turn-Id": broadcaster.turn_id},
+    )
+
+
+def resume_turn(turn_id: str, last_event_id: str | None) -> StreamingResponse:
+    broadcaster = turn_registry.get(turn_id)
+    if broadcaster is None:
+        raise HTTPException(status_code=404, detail=f"turn not found: {turn_id}")
+
+    return stream_turn(broadcaster, parse_last_event_id(last_event_id))
+
+
+def parse_last_event_id(last_event_id: str | None) -> int | None:
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"invalid Last-Event-ID: {last_event_id}")
+
+
+@app.post("/trigger")
+async def trigger(
+    input: UIContext,
+    detach: bool = False,
+    last_event_id: str | None = Header(default=None),
+    x_turn_id: str | None = Header(default=None),
+):
+    # a reconnect of a dropped stream resumes the same turn instead of re-running it
+    if x_turn_id and last_event_id:
+        return resume_turn(x_turn_id, last_event_id)
+
+    reject_if_draining()
+    agent = create_report_agent(
+        response_cache=response_cache,
+        cache_replay_realtime=cache_replay_realtime,
+        router=turn_router,
+        rate_limiter=rate_limiter,
+        attachments=attachment_manager,
+        max_turn_bytes=max_turn_bytes,
+        memory_stats=turn_memory_stats,
     )
 
+    # detached mode, the turn is queued and the client polls or subscribes later
+    if detach:
+        try:
+            job = job_queue.submit(lambda: agent.trigger(input))
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return JSONResponse(content=job.to_dict(), status_code=202)
+
+    def start_turn() -> TurnBroadcaster:
+        return turn_registry.start(agent.trigger(input))
+
+    if turn_coalescer is not None:
+        broadcaster = turn_coalescer.attach(agent.turn_key(input), start_turn)
+    else:
+        broadcaster = start_turn()
+    return stream_turn(broadcaster)
+
+
+@app.get("/turns/{turn_id}/events")
+async def turn_events(turn_id: str, last_event_id: str | None = Header(default=None)):
+    return resume_turn(turn_id, last_event_id)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, after: int = 0):
+    # poll the job status and the events persisted after the given event id
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+
+    events = []
+    for event_id, frame in job_queue.events_after(job_id, after):
+        data = frame_data(frame)
+        events.append({"id": event_id, "data": data if data == "done" else json.loads(data)})
+
+    return {
+        **job.to_dict(),
+        "events": events,
+        "last_event_id": events[-1]["id"] if events else after,
+    }
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: str | None = Header(default=None)):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+
+    # live, or recently finished, jobs are streamed from the turn registry
+    if turn_registry.get(job_id) is not None:
+        return resume_turn(job_id, last_event_id)
+
+    after = parse_last_event_id(last_event_id) or 0
+    if job.status == "queued":
+        raise HTTPException(status_code=409, detail="job has not started yet, poll /jobs/{job_id} instead")
+
+    async def persisted_events():
+        for _, frame in job_queue.events_after(job_id, after):
+            yield frame
+
+    return StreamingResponse(persisted_events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop if installed, see EVENT_LOOP
+    loop = event_loop_name()
+    if workers > 1:
+        # rate limits kept in memory would be per worker
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+        # the workers import the app themselves, so it is passed by name
+        uvicorn.run(
+            "agent_service:app", host="0.0.0.0", port=8000, workers=workers, loop=loop, app_dir=str(Path(__file__).parent)
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop)
@@ -0,0 +1,174 @@
+"""
+Batch report generation
+
+Reads a JSONL of UIContexts, runs the agent turns concurrently and streams one result line per job,
+with timings, to the output JSONL. Jobs already in the output are skipped, so a crashed run can be
+resumed by running the same command again.
+
+    uv run batch_generate.py prompts.jsonl results.jsonl --parallelism 8 --rate 2
+
+Each input line is a UIContext, optionally with a "job_id" key (defaults to the line number). Every
+job writes its report under its own user_id: "<namespace>-<job_id>".
+
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+from agent.agent_openai.agent import FALLBACK_MESSAGES
+from agent.agent_openai.factory import create_report_agent
+from agent.schema import UIContext
+from agent.serving import frame_data
+from agent.logging_utils import setup_logging
+from agent.event_loop import event_loop_factory
+
+logger = logging.getLogger(__name__)
+
+FINAL_OUTPUT_TYPES = ["message", "form_request", "choice_request"]
+
+
+class BatchThrottle:
+    # spaces out job starts to at most `rate` per second
+    def __init__(self, rate: float | None = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.interval
+
+
+def load_jobs(input_path: Path, namespace: str) -> list[tuple[str, UIContext]]:
+    jobs = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            job_id = str(data.pop("job_id", line_number))
+            context = UIContext.model_validate(data)
+            # every job gets its own report namespace
+            context.user_id = f"{namespace}-{job_id}"
+            jobs.append((job_id, context))
+    return jobs
+
+
+def load_finished_job_ids(output_path: Path) -> set[str]:
+    finished = set()
+    if not output_path.exists():
+        return finished
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # a partially written last line of a crashed run
+                continue
+            if result.get("status") == "completed":
+                finished.add(result["job_id"])
+    return finished
+
+
+async def run_job(agent, job_id: str, context: UIContext) -> dict:
+    started_at = time.time()
+    start = time.monotonic()
+    first_event_seconds = None
+    event_count = 0
+    final_output = None
+
+    result = {"job_id": job_id, "user_id": context.user_id, "started_at": started_at}
+    try:
+        async for frame in agent.trigger(context):
+            if first_event_seconds is None:
+                first_event_seconds = time.monotonic() - start
+            event_count += 1
+
+            data = frame_data(frame)
+            if data == "done":
+                continue
+            output = json.loads(data)
+            if output.get("type") in FINAL_OUTPUT_TYPES:
+                final_output = output
+
+        result["final_output"] = final_output
+        # a fallback message is not an answer, the job is retried on resume
+        is_fallback = (final_output or {}).get("type") == "message" and final_output["content"] in FALLBACK_MESSAGES.values()
+        if is_fallback:
+            result["status"] = "failed"
+            result["error"] = final_output["content"]
+        else:
+            result["status"] = "completed"
+    except Exception as e:
+        logger.error(f"batch job {job_id} failed: {e}")
+        result["status"] = "failed"
+        result["error"] = str(e)
+
+    result["first_event_seconds"] = first_event_seconds
+    result["total_seconds"] = time.monotonic() - start
+    result["events"] = event_count
+    return result
+
+
+async def run_batch(input_path: Path, output_path: Path, parallelism: int, rate: float | None, namespace: str):
+    jobs = load_jobs(input_path, namespace)
+    finished = load_finished_job_ids(output_path)
+    pending = [(job_id, context) for job_id, context in jobs if job_id not in finished]
+    print(f"{len(jobs)} jobs, {len(finished)} already finished, {len(pending)} to run")
+
+    agent = create_report_agent()
+    semaphore = asyncio.Semaphore(parallelism)
+    throttle = BatchThrottle(rate)
+    write_lock = asyncio.Lock()
+
+    batch_start = time.monotonic()
+    counts = {"completed": 0, "failed": 0}
+
+    with open(output_path, "a", encoding="utf-8") as output_file:
+
+        async def worker(job_id: str, context: UIContext):
+            async with semaphore:
+                await throttle.wait()
+                result = await run_job(agent, job_id, context)
+
+            # stream results as they finish, one line per job
+            async with write_lock:
+                output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output_file.flush()
+            counts[result["status"]] += 1
+            print(f"[{result['status']}] job {job_id} in {result['total_seconds']:.1f}s")
+
+        await asyncio.gather(*(worker(job_id, context) for job_id, context in pending))
+
+    total_seconds = time.monotonic() - batch_start
+    print(f"done in {total_seconds:.1f}s, completed: {counts['completed']}, failed: {counts['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate reports for a JSONL of UIContexts.")
+    parser.add_argument("input", type=Path, help="input JSONL, one UIContext per line")
+    parser.add_argument("output", type=Path, help="output JSONL, one result per job, appended to on resume")
+    parser.add_argument("--parallelism", type=int, default=4, help="max number of concurrent turns")
+    parser.add_argument("--rate", type=float, default=None, help="max number of job starts per second")
+    parser.add_argument("--namespace", default="batch", help="report namespace prefix of the job user ids")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(
+        run_batch(args.input, args.output, args.parallelism, args.rate, args.namespace),
+        loop_factory=event_loop_factory(),
+    )
+
+
+if __name__ == "__main__":
+    main()
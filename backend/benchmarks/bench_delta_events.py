@@ -0,0 +1,77 @@
+"""
+Cost of a streamed token on the SSE output path
+
+Encodes a stream of token-sized deltas into SSE frames, once through the pydantic models (build,
+validate, model_dump, encode) and once through the slotted delta events, and reports the time and the
+peak bytes allocated per delta, i.e. the intermediate objects alive at once while a frame is built.
+Allocations are traced with tracemalloc, the time is measured without it.
+
+    python benchmarks/bench_delta_events.py --deltas 100000
+
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent import json_codec
+from agent.agent_openai.delta_events import MessageDeltaEvent
+from agent.schema import MessageDelta
+
+TOKENS = ["The", " report", " covers", " é", "中文", ' "quoted"', "\n", " data", ".", " \U0001f600"]
+
+
+def pydantic_frame(token: str) -> str:
+    return f"data: {json_codec.dumps(MessageDelta(content=token).model_dump())}\n\n"
+
+
+def event_frame(token: str) -> str:
+    return MessageDeltaEvent(token).to_sse()
+
+
+def measure(encode, deltas: int) -> dict:
+    tokens = [TOKENS[i % len(TOKENS)] for i in range(deltas)]
+
+    start = time.perf_counter()
+    for token in tokens:
+        encode(token)
+    seconds = time.perf_counter() - start
+
+    # allocations of one delta at a time, the frames are dropped right away like on the stream
+    tracemalloc.start()
+    peak_bytes = 0
+    for token in tokens:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        encode(token)
+        peak_bytes += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    return {
+        "ns_per_delta": seconds / deltas * 1e9,
+        "peak_bytes_per_delta": peak_bytes / deltas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=100000)
+    args = parser.parse_args()
+
+    assert all(pydantic_frame(token) == event_frame(token) for token in TOKENS)
+    print(f"json backend: {json_codec.backend}")
+    for name, encode in [("pydantic", pydantic_frame), ("slotted", event_frame)]:
+        result = measure(encode, args.deltas)
+        print(
+            f"{name:>9}: {result['ns_per_delta']:,.0f} ns/delta, {result['peak_bytes_per_delta']:,.0f} peak bytes/delta"
+        )
+
+
+if __name__ == "__main__":
+    main()
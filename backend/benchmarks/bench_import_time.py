@@ -0,0 +1,83 @@
+"""
+Import time benchmark
+
+Every module is imported in a fresh interpreter, several times, and the median wall time, the max RSS
+and the heavy modules loaded by the import are reported. The first-use cost of the lazily created tools
+is measured separately.
+
+    python benchmarks/bench_import_time.py --runs 10
+
+For a per-module breakdown of a single import use `python -X importtime -c "import agent_service"`.
+
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+MODULES = ["agent.tools.tools", "agent.agent_openai.factory", "agent_service"]
+HEAVY_MODULES = ["PIL", "httpx", "agent.tools.tool_source.write_html", "agent.tools.tool_source.read_html"]
+
+CHILD_CODE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {module}
+import_seconds = time.perf_counter() - start
+loaded = [name for name in {heavy_modules!r} if name in sys.modules]
+
+first_use_seconds = None
+if {first_use}:
+    from agent.tools.tools import TOOL_REGISTRY, get_tool
+    start = time.perf_counter()
+    for tool_name in TOOL_REGISTRY:
+        get_tool(tool_name)
+    first_use_seconds = time.perf_counter() - start
+
+print(json.dumps({{
+    "import_seconds": import_seconds,
+    "first_use_seconds": first_use_seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": loaded,
+}}))
+"""
+
+
+def run_child(module: str, first_use: bool) -> dict:
+    code = CHILD_CODE.format(module=module, first_use=first_use, heavy_modules=HEAVY_MODULES)
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench")}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench(module: str, runs: int, first_use: bool = False):
+    results = [run_child(module, first_use) for _ in range(runs)]
+    import_ms = statistics.median(result["import_seconds"] for result in results) * 1000
+    rss_mb = statistics.median(result["max_rss_mb"] for result in results)
+    line = f"{module:<30} import: {import_ms:7.1f}ms  max rss: {rss_mb:6.1f}MB"
+    if first_use:
+        first_use_ms = statistics.median(result["first_use_seconds"] for result in results) * 1000
+        line += f"  first use of all tools: {first_use_ms:6.1f}ms"
+    print(line)
+    print(f"{'':<30} loaded: {', '.join(results[-1]['loaded']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the backend modules.")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per module")
+    parser.add_argument("--module", action="append", help="modules to import, defaults to the backend entry points")
+    args = parser.parse_args()
+
+    for module in args.module or MODULES:
+        bench(module, args.runs, first_use=module == "agent.tools.tools")
+
+
+if __name__ == "__main__":
+    main()
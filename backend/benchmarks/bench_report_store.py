@@ -0,0 +1,94 @@
+"""
+Concurrent read/write benchmark of the report store backends
+
+Every writer process appends lines to the same report with compare-and-swap retries, reader processes
+read in a loop. At the end the report must contain every appended line, i.e. no write was clobbered.
+
+    python benchmarks/bench_report_store.py --writers 4 --readers 4 --writes 200 --durability strict
+
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.report_store import create_report_store, ReportVersionConflict
+
+USER_ID = "bench"
+
+
+def writer(backend: str, path: str, writer_id: int, writes: int) -> tuple[int, int]:
+    store = create_report_store(backend, path)
+    conflicts = 0
+    for i in range(writes):
+        while True:
+            snapshot = store.read(USER_ID)
+            try:
+                store.write(USER_ID, snapshot.content + f"<p>{writer_id}-{i}</p>\n", snapshot.version)
+                break
+            except ReportVersionConflict:
+                conflicts += 1
+    return writes, conflicts
+
+
+def reader(backend: str, path: str, duration: float) -> int:
+    store = create_report_store(backend, path)
+    reads = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        store.read(USER_ID)
+        reads += 1
+    return reads
+
+
+def bench(backend: str, writers: int, readers: int, writes: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = tmp_dir if backend == "local" else str(Path(tmp_dir) / "reports.db")
+
+        start = time.monotonic()
+        with ProcessPoolExecutor(max_workers=writers + readers) as pool:
+            writer_futures = [pool.submit(writer, backend, path, i, writes) for i in range(writers)]
+            # readers run for about as long as the writers
+            reader_futures = [pool.submit(reader, backend, path, 2.0) for _ in range(readers)]
+            write_results = [future.result() for future in writer_futures]
+            write_seconds = time.monotonic() - start
+            total_reads = sum(future.result() for future in reader_futures)
+        total_seconds = time.monotonic() - start
+
+        total_writes = sum(result[0] for result in write_results)
+        total_conflicts = sum(result[1] for result in write_results)
+        snapshot = create_report_store(backend, path).read(USER_ID)
+        lines = snapshot.content.count("\n")
+
+        print(
+            f"{backend:>6}: {total_writes / write_seconds:8.0f} writes/s, {total_reads / total_seconds:8.0f} reads/s, "
+            f"{total_conflicts} conflicts retried, version {snapshot.version}, "
+            f"lost writes: {total_writes - lines}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200, help="writes per writer")
+    parser.add_argument("--backend", choices=["local", "sqlite", "all"], default="all")
+    parser.add_argument("--durability", choices=["fast", "atomic", "strict"], default="atomic")
+    args = parser.parse_args()
+
+    # read by create_report_store in the worker processes
+    os.environ["REPORT_DURABILITY"] = args.durability
+    print(f"durability: {args.durability}")
+    backends = ["local", "sqlite"] if args.backend == "all" else [args.backend]
+    for backend in backends:
+        bench(backend, args.writers, args.readers, args.writes)
+
+
+if __name__ == "__main__":
+    main()
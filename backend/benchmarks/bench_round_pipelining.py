@@ -0,0 +1,92 @@
+"""
+Latency saved by pipelining the tool rounds of a turn
+
+Runs a turn of several tool call rounds against the fake OpenAI client, once with the rounds run in order
+and once pipelined, and reports the end-to-end latency of the turn and the time saved per round. The
+fake client takes --request-latency to answer a request, each tool call takes --tool-latency, and the
+SSE consumer takes --frame-latency per frame, like a client reading the stream over a slow connection.
+
+    python benchmarks/bench_round_pipelining.py --rounds 4 --request-latency 0.2 --tool-latency 0.3
+
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "tests"))
+
+from agent.agent_openai import agent as agent_module
+from agent.agent_openai.agent import Agent
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+class SlowFakeOpenAI(FakeOpenAI):
+    # the time to the response headers of a request
+    def __init__(self, rounds: list[dict], request_latency: float):
+        super().__init__(rounds)
+        create = self.responses.create
+
+        async def delayed_create(**kwargs):
+            await asyncio.sleep(request_latency)
+            return await create(**kwargs)
+
+        self.responses.create = delayed_create
+
+
+async def run_turn(pipeline_rounds: bool, rounds: int, request_latency: float, frame_latency: float) -> float:
+    scripted = [function_call_round("read_current_report", {}, call_id=f"call_{i}") for i in range(rounds)]
+    client = SlowFakeOpenAI(scripted + [text_message_round("done")], request_latency)
+    agent = Agent(oai_client=client, system_prompt="bench", web_search=False, pipeline_rounds=pipeline_rounds)
+    context = UIContext(context=[Message(role="user", content="bench")])
+
+    start = time.perf_counter()
+    async for _ in agent.trigger(context):
+        await asyncio.sleep(frame_latency)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=4, help="tool call rounds before the final message")
+    parser.add_argument("--request-latency", type=float, default=0.2)
+    parser.add_argument("--tool-latency", type=float, default=0.3)
+    parser.add_argument("--frame-latency", type=float, default=0.005)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    call_tool = agent_module.call_tool
+
+    async def slow_call_tool(*call_args, **kwargs):
+        await asyncio.sleep(args.tool_latency)
+        return await call_tool(*call_args, **kwargs)
+
+    agent_module.call_tool = slow_call_tool
+
+    results = {}
+    with tempfile.TemporaryDirectory() as reports_dir:
+        set_report_store(LocalFileReportStore(Path(reports_dir)))
+        try:
+            for name, pipeline_rounds in [("sequential", False), ("pipelined", True)]:
+                results[name] = min(
+                    asyncio.run(run_turn(pipeline_rounds, args.rounds, args.request_latency, args.frame_latency))
+                    for _ in range(args.repeat)
+                )
+                print(f"{name:>10}: {results[name] * 1000:,.0f} ms per turn")
+        finally:
+            set_report_store(None)
+
+    saved = results["sequential"] - results["pipelined"]
+    print(f"     saved: {saved * 1000:,.0f} ms per turn, {saved / args.rounds * 1000:,.0f} ms per tool round")
+
+
+if __name__ == "__main__":
+    main()
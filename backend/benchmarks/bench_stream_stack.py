@@ -0,0 +1,102 @@
+"""
+Streaming throughput of the JSON and event loop stacks
+
+Runs concurrent turns against the fake OpenAI client, each a tool call round and a long streamed message,
+once per available stack (JSON_BACKEND x EVENT_LOOP) in a fresh interpreter, and reports the frames per
+second. The default stack is stdlib json on the asyncio loop.
+
+    python benchmarks/bench_stream_stack.py --turns 50 --concurrency 10
+
+orjson and uvloop are optional, stacks that are not installed are skipped.
+
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+CHILD_CODE = """
+import sys, time, json, asyncio
+sys.path.append("tests")
+from agent import json_codec
+from agent.event_loop import event_loop_name, event_loop_factory
+from agent.agent_openai.agent import Agent
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+TEXT = "Streaming report progress with some unicode: \\u00e9\\u4e2d\\u6587. " * {text_repeat}
+
+
+async def run_turn():
+    client = FakeOpenAI([function_call_round("read_current_report", {{}}), text_message_round(TEXT, chunk_size=4)])
+    agent = Agent(oai_client=client, system_prompt="bench", web_search=False)
+    context = UIContext(context=[Message(role="user", content="bench")])
+    return sum([1 async for _ in agent.trigger(context)])
+
+
+async def main():
+    semaphore = asyncio.Semaphore({concurrency})
+
+    async def bounded():
+        async with semaphore:
+            return await run_turn()
+
+    start = time.perf_counter()
+    frames = sum(await asyncio.gather(*[bounded() for _ in range({turns})]))
+    return frames, time.perf_counter() - start
+
+
+frames, seconds = asyncio.run(main(), loop_factory=event_loop_factory())
+print(json.dumps({{"json": json_codec.backend, "loop": event_loop_name(), "frames": frames, "seconds": seconds}}))
+"""
+
+
+def available_stacks() -> list[tuple[str, str]]:
+    json_backends = ["json"] + (["orjson"] if importlib.util.find_spec("orjson") else [])
+    loops = ["asyncio"] + (["uvloop"] if importlib.util.find_spec("uvloop") else [])
+    return [(json_backend, loop) for loop in loops for json_backend in json_backends]
+
+
+def run_stack(json_backend: str, loop: str, turns: int, concurrency: int, text_repeat: int, reports_dir: str) -> dict:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+        "JSON_BACKEND": json_backend,
+        "EVENT_LOOP": loop,
+        "REPORT_STORE_PATH": reports_dir,
+    }
+    code = CHILD_CODE.format(turns=turns, concurrency=concurrency, text_repeat=text_repeat)
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--text-repeat", type=int, default=40, help="length of the streamed message")
+    args = parser.parse_args()
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as reports_dir:
+        for json_backend, loop in available_stacks():
+            result = run_stack(json_backend, loop, args.turns, args.concurrency, args.text_repeat, reports_dir)
+            frames_per_second = result["frames"] / result["seconds"]
+            baseline = baseline or frames_per_second
+            print(
+                f"{result['json']:>7} {result['loop']:>8}: {result['frames']} frames in {result['seconds']:.2f}s, "
+                f"{frames_per_second:,.0f} frames/s ({frames_per_second / baseline:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
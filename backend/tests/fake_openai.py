@@ -0,0 +1,80 @@
+"""
+Fake OpenAI Responses client, replays scripted rounds as stream events without network access.
+
+"""
+
+import json
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeItem(SimpleNamespace):
+    def model_dump(self, **kwargs) -> dict:
+        def dump(value):
+            if isinstance(value, SimpleNamespace):
+                return {k: dump(v) for k, v in vars(value).items()}
+            if isinstance(value, list):
+                return [dump(v) for v in value]
+            return value
+
+        return dump(self)
+
+
+def message_round(final_response: dict, chunk_size: int = 8) -> dict:
+    text = json.dumps(final_response, ensure_ascii=False)
+    return {
+        "deltas": [("response.output_text.delta", text[i : i + chunk_size]) for i in range(0, len(text), chunk_size)],
+        "output": [FakeItem(type="message", content=[FakeItem(type="output_text", text=text)])],
+    }
+
+
+def text_message_round(content: str, chunk_size: int = 8) -> dict:
+    return message_round({"type": "message", "content": {"type": "message", "content": content}}, chunk_size)
+
+
+def function_call_round(name: str, arguments: dict, call_id: str = "call_0", chunk_size: int = 16) -> dict:
+    text = json.dumps(arguments, ensure_ascii=False)
+    return {
+        "deltas": [
+            ("response.function_call_arguments.delta", text[i : i + chunk_size]) for i in range(0, len(text), chunk_size)
+        ],
+        "output": [FakeItem(type="function_call", name=name, arguments=text, call_id=call_id)],
+        "output_item": FakeItem(type="function_call", name=name, call_id=call_id),
+    }
+
+
+def web_search_round(query: str) -> dict:
+    return {
+        "deltas": [],
+        "output": [FakeItem(type="web_search_call", action=FakeItem(type="search", query=query))],
+    }
+
+
+class FakeResponses:
+    def __init__(self, rounds: list[dict], delay: float = 0.0):
+        self.rounds = rounds
+        self.delay = delay
+        self.calls: list[dict] = []
+
+    async def create(self, **kwargs):
+        round_index = len(self.calls)
+        self.calls.append(kwargs)
+        scripted = self.rounds[round_index % len(self.rounds)]
+        return self._stream(scripted)
+
+    async def _stream(self, scripted: dict):
+        if "output_item" in scripted:
+            yield FakeItem(type="response.output_item.added", item=scripted["output_item"])
+        for chunk_type, delta in scripted["deltas"]:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield FakeItem(type=chunk_type, delta=delta)
+
+        usage = FakeItem(input_tokens=100, output_tokens=50, total_tokens=150)
+        response = FakeItem(output=list(scripted["output"]), usage=usage)
+        yield FakeItem(type="response.completed", response=response)
+
+
+class FakeOpenAI:
+    def __init__(self, rounds: list[dict], delay: float = 0.0):
+        self.responses = FakeResponses(rounds, delay=delay)
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import base64
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.attachments import AttachmentManager, LocalFileStore, redact_data_urls
+from agent.tools import tools
+from agent.tools.tool_source.base_tool import BaseTool
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+DATA_URL = "data:image/png;base64," + base64.b64encode(PNG).decode("ascii")
+
+
+class ScreenshotTool(BaseTool):
+    purity = "pure"
+
+    def get_schema(self) -> dict:
+        return {"type": "function", "name": "screenshot", "parameters": {"type": "object", "properties": {}}}
+
+    async def call(self):
+        return [{"type": "input_text", "text": "the page"}, {"type": "input_image", "image_url": DATA_URL, "detail": "auto"}]
+
+    def tool_call_message(self, **kwargs) -> str:
+        return "Taking a screenshot..."
+
+    def tool_result_message(self, **kwargs) -> str:
+        return "Screenshot taken."
+
+
+def test_images_are_uploaded_once(tmp_path):
+    store = LocalFileStore(tmp_path)
+    manager = AttachmentManager(store)
+
+    async def scenario():
+        output = [{"type": "input_image", "image_url": DATA_URL, "detail": "low"}]
+        return await asyncio.gather(*(manager.intern_output(output) for _ in range(3)))
+
+    first, second, third = asyncio.run(scenario())
+    assert first == second == third
+    assert first[0]["detail"] == "low" and "image_url" not in first[0]
+    assert manager.uploaded_bytes == len(PNG)
+    assert manager.dedup_hits == 2
+    assert store.read(first[0]["file_id"]) == (PNG, "image/png")
+
+
+def test_cancelled_upload_does_not_strand_the_waiters(tmp_path):
+    store = LocalFileStore(tmp_path)
+    manager = AttachmentManager(store)
+    upload = store.upload
+
+    async def slow_upload(data, mime_type, digest):
+        await asyncio.sleep(0.05)
+        return await upload(data, mime_type, digest)
+
+    store.upload = slow_upload
+
+    async def scenario():
+        first = asyncio.create_task(manager.upload(PNG, "image/png"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(manager.upload(PNG, "image/png"))
+        await asyncio.sleep(0.01)
+        # e.g. the client of the first turn disconnected
+        first.cancel()
+        return await asyncio.wait_for(second, timeout=1), first
+
+    file_id, first = asyncio.run(scenario())
+    assert first.cancelled()
+    assert store.read(file_id) == (PNG, "image/png")
+
+
+def test_rounds_carry_references(tmp_path, monkeypatch):
+    monkeypatch.setitem(tools._tool_instances, "screenshot", ScreenshotTool())
+    rounds = [function_call_round("screenshot", {}, call_id=f"call_{i}") for i in range(3)] + [text_message_round("done")]
+    client = FakeOpenAI(rounds)
+    manager = AttachmentManager(LocalFileStore(tmp_path))
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, attachments=manager)
+
+    async def run():
+        context = UIContext(context=[Message(role="user", content="look at the page")])
+        return [frame async for frame in agent.trigger(context)]
+
+    asyncio.run(run())
+    # every round references the same uploaded image, none carries its bytes
+    last_input = json.dumps([item for item in client.responses.calls[-1]["input"] if isinstance(item, dict)])
+    assert "base64" not in last_input
+    assert last_input.count('"file_id"') == 3
+    assert manager.uploaded_bytes == len(PNG)
+
+
+def test_redact_data_urls():
+    redacted = redact_data_urls([{"type": "input_image", "image_url": DATA_URL}, "plain"])
+    assert redacted[0]["image_url"].startswith("<image/png data url")
+    assert redacted[1] == "plain"
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_images_are_uploaded_once(Path(tmp))
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import batch_generate
+from agent.agent_openai.agent import Agent, FALLBACK_MESSAGES
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+def test_batch_runs_and_resumes(tmp_path, monkeypatch):
+    client = FakeOpenAI([text_message_round("report written")])
+    monkeypatch.setattr(
+        batch_generate,
+        "create_report_agent",
+        lambda: Agent(oai_client=client, system_prompt="test", web_search=False),
+    )
+
+    input_path = tmp_path / "prompts.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    with open(input_path, "w", encoding="utf-8") as f:
+        for i in range(3):
+            f.write(json.dumps({"job_id": f"j{i}", "context": [{"type": "message", "role": "user", "content": f"report {i}"}]}) + "\n")
+
+    asyncio.run(batch_generate.run_batch(input_path, output_path, parallelism=2, rate=None, namespace="test"))
+    results = [json.loads(line) for line in open(output_path, encoding="utf-8")]
+    assert sorted(result["job_id"] for result in results) == ["j0", "j1", "j2"]
+    assert all(result["status"] == "completed" for result in results)
+    assert results[0]["user_id"].startswith("test-j")
+    assert results[0]["final_output"]["content"] == "report written"
+
+    # resuming skips the finished jobs
+    asyncio.run(batch_generate.run_batch(input_path, output_path, parallelism=2, rate=None, namespace="test"))
+    assert len(open(output_path, encoding="utf-8").readlines()) == 3
+    assert len(client.responses.calls) == 3
+
+
+def test_fallback_answers_are_failed_and_retried(tmp_path, monkeypatch):
+    # the only round calls a tool, the turn ends with the tool call limit fallback
+    client = FakeOpenAI([function_call_round("read_current_report", {})])
+    monkeypatch.setattr(
+        batch_generate,
+        "create_report_agent",
+        lambda: Agent(oai_client=client, system_prompt="test", tools=["read_current_report"], web_search=False, max_round_tool_call=1),
+    )
+
+    input_path = tmp_path / "prompts.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text(json.dumps({"job_id": "j0", "context": [{"type": "message", "role": "user", "content": "report"}]}) + "\n")
+
+    asyncio.run(batch_generate.run_batch(input_path, output_path, parallelism=1, rate=None, namespace="test"))
+    result = json.loads(open(output_path, encoding="utf-8").readline())
+    assert result["status"] == "failed"
+    assert result["error"] == FALLBACK_MESSAGES["tool_call_limit"]
+
+    # resuming runs the job again
+    asyncio.run(batch_generate.run_batch(input_path, output_path, parallelism=1, rate=None, namespace="test"))
+    assert len(client.responses.calls) == 2
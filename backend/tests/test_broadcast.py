@@ -0,0 +1,149 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.serving import SingleFlight, TurnBroadcaster, TurnRegistry, ReplayBuffer, ReplayGapError
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, text_message_round
+
+
+def test_identical_turns_are_coalesced():
+    client = FakeOpenAI([text_message_round("which topic?")], delay=0.001)
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False)
+    context = UIContext(context=[Message(role="user", content="hi")], user_id="tab-user")
+
+    async def run():
+        coalescer = SingleFlight()
+
+        async def request():
+            broadcaster = coalescer.attach(
+                agent.turn_key(context), lambda: TurnBroadcaster(agent.trigger(context)).start()
+            )
+            return [frame async for frame in broadcaster.subscribe()]
+
+        first = asyncio.create_task(request())
+        await asyncio.sleep(0.005)
+        # attaches while the first one is streaming
+        second = asyncio.create_task(request())
+        results = await asyncio.gather(first, second)
+        return results, len(coalescer)
+
+    (first_frames, second_frames), in_flight = asyncio.run(run())
+
+    assert first_frames == second_frames
+    assert first_frames[-1].endswith("data: done\n\n")
+    assert len(client.responses.calls) == 1
+    assert in_flight == 0
+
+
+def test_different_users_are_not_coalesced():
+    agent = Agent(oai_client=FakeOpenAI([text_message_round("hi")]), system_prompt="test", web_search=False)
+    context_a = UIContext(context=[Message(role="user", content="hi")], user_id="a")
+    context_b = UIContext(context=[Message(role="user", content="hi")], user_id="b")
+    assert agent.turn_key(context_a) != agent.turn_key(context_b)
+
+
+def test_frames_carry_increasing_event_ids():
+    agent = Agent(oai_client=FakeOpenAI([text_message_round("hello")]), system_prompt="test", web_search=False)
+    context = UIContext(context=[Message(role="user", content="hi")])
+
+    async def run():
+        return [frame async for frame in agent.trigger(context)]
+
+    frames = asyncio.run(run())
+    assert [frame.split("\n", 1)[0] for frame in frames] == [f"id: {i}" for i in range(1, len(frames) + 1)]
+
+
+def test_resume_from_last_event_id():
+    client = FakeOpenAI([text_message_round("a long enough answer")], delay=0.001)
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False)
+    context = UIContext(context=[Message(role="user", content="hi")])
+
+    async def run():
+        registry = TurnRegistry()
+        broadcaster = registry.start(agent.trigger(context))
+
+        # the client drops the connection after 3 frames
+        received = []
+        async for frame in broadcaster.subscribe():
+            received.append(frame)
+            if len(received) == 3:
+                break
+
+        resumed = registry.get(broadcaster.turn_id)
+        async for frame in resumed.subscribe(last_event_id=3):
+            received.append(frame)
+
+        full = [frame async for frame in broadcaster.subscribe()]
+        return received, full
+
+    received, full = asyncio.run(run())
+    assert received == full
+    assert len(client.responses.calls) == 1
+
+
+def test_replay_buffer_spill(tmp_path):
+    frames = [f"id: {i}\ndata: {i}\n\n" for i in range(1, 11)]
+
+    dropping = ReplayBuffer(max_events=4)
+    for frame in frames:
+        dropping.append(frame)
+    assert dropping.frames_after(6) == frames[6:]
+    try:
+        dropping.frames_after(2)
+        assert False, "evicted frames must not be replayed silently"
+    except ReplayGapError:
+        pass
+
+    spilling = ReplayBuffer(max_events=4, spill_path=tmp_path / "turn.jsonl")
+    for frame in frames:
+        spilling.append(frame)
+    assert len(spilling) == 4
+    assert spilling.frames_after(2) == frames[2:]
+    assert spilling.frames_after(None) == frames
+
+    # the spill file stays open, later evictions go to the same file
+    more = [f"id: {i}\ndata: {i}\n\n" for i in range(11, 21)]
+    for frame in more:
+        spilling.append(frame)
+    spilling.close()
+    assert spilling.frames_after(None) == frames + more
+    spilling.discard()
+    assert not (tmp_path / "turn.jsonl").exists()
+
+
+def test_slow_subscriber_is_detached_and_catches_up():
+    frames = [f"id: {i}\ndata: {i}\n\n" for i in range(1, 41)]
+
+    async def upstream():
+        for frame in frames:
+            yield frame
+            await asyncio.sleep(0)
+
+    async def run(replay_buffer):
+        broadcaster = TurnBroadcaster(upstream(), replay_buffer=replay_buffer, max_pending=4).start()
+        received = []
+        try:
+            async for frame in broadcaster.subscribe():
+                received.append(frame)
+                # slower than the turn
+                await asyncio.sleep(0.001)
+        except ReplayGapError:
+            received.append("gap")
+        await broadcaster.task
+        return received
+
+    # the frames missed while detached come from the replay buffer
+    assert asyncio.run(run(ReplayBuffer())) == frames
+    # unless they were evicted, then the subscriber is disconnected and the client resumes or retries
+    assert asyncio.run(run(ReplayBuffer(max_events=8)))[-1] == "gap"
+
+
+if __name__ == "__main__":
+    test_identical_turns_are_coalesced()
@@ -0,0 +1,33 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent import json_codec
+from agent.agent_openai.delta_events import MessageDeltaEvent, StreamingDisplayEvent
+from agent.schema import MessageDelta, StreamingDisplayOutput
+
+CONTENTS = ["", "plain", 'quote " and \\ backslash', "new\nline\ttab", "é 中文 \U0001f600", " \x00\x1f", "</script>"]
+
+
+def test_frames_match_the_pydantic_models(monkeypatch):
+    for backend in json_codec.BACKENDS:
+        monkeypatch.setattr(json_codec, "dumps", json_codec.BACKENDS[backend][0])
+        for content in CONTENTS:
+            for event, model in [
+                (MessageDeltaEvent(content), MessageDelta(content=content)),
+                (StreamingDisplayEvent(content), StreamingDisplayOutput(content=content)),
+            ]:
+                assert event.to_sse() == f"data: {json_codec.dumps(model.model_dump())}\n\n"
+                assert event.model_dump() == model.model_dump()
+
+
+def test_events_have_no_instance_dict():
+    event = MessageDeltaEvent("x")
+    assert not hasattr(event, "__dict__")
+
+
+if __name__ == "__main__":
+    test_events_have_no_instance_dict()
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.tools.tools import call_tool, ToolProgress
+from fake_openai import FakeItem, FakeOpenAI
+
+OUTLINE = "<h1>Report</h1>\n<!-- section: intro -->\n<h2>Data</h2>\n<!-- section: data -->\n<!-- section: outlook -->\n"
+
+
+def html_round(html: str, chunks: int = 5) -> dict:
+    # a sub-agent answers with plain html, streamed in a few chunks
+    size = max(1, len(html) // chunks)
+    return {
+        "deltas": [("response.output_text.delta", html[i : i + size]) for i in range(0, len(html), size)],
+        "output": [FakeItem(type="message", content=[FakeItem(type="output_text", text=html)])],
+    }
+
+
+async def collect(output) -> tuple[list[str], str]:
+    progress, chunks = [], []
+    async for chunk in output:
+        if isinstance(chunk, ToolProgress):
+            progress.append(chunk.content)
+        else:
+            chunks.append(chunk)
+    return progress, "".join(chunks)
+
+
+def sections() -> list[dict]:
+    return [
+        {"start_line": 1, "end_line": 1, "instructions": "intro"},
+        {"start_line": 3, "end_line": 3, "instructions": "data"},
+        {"start_line": 4, "end_line": 4, "instructions": "outlook"},
+    ]
+
+
+def test_sections_are_drafted_concurrently_and_merged_once(tmp_path):
+    store = LocalFileReportStore(tmp_path)
+    set_report_store(store)
+    store.write("u", OUTLINE, expected_version=0)
+    rounds = [html_round("<p>intro</p>"), html_round("```html\n<table>data</table>\n```"), html_round("<p>outlook</p>")]
+    client = FakeOpenAI(rounds, delay=0.05)
+
+    async def run():
+        output = await call_tool("draft_report_sections", {"outline": "report", "sections": sections()}, "u", oai_client=client, model="m")
+        return await collect(output)
+
+    try:
+        start = time.monotonic()
+        progress, result = asyncio.run(run())
+        seconds = time.monotonic() - start
+    finally:
+        set_report_store(None)
+
+    assert len(client.responses.calls) == 3
+    # each sub-agent streams 5 chunks at 0.05s, concurrently instead of one after another
+    assert seconds < 0.6
+    assert progress[-1] == "drafted 3/3 sections"
+    assert result == "Drafted 3 sections, report updated! Now at version 2."
+    assert store.read("u").content == "<h1>Report</h1>\n<p>intro</p>\n<h2>Data</h2>\n<table>data</table>\n<p>outlook</p>\n"
+
+
+def test_nothing_is_written_when_the_report_changes_meanwhile(tmp_path):
+    store = LocalFileReportStore(tmp_path)
+    set_report_store(store)
+    store.write("u", OUTLINE, expected_version=0)
+    client = FakeOpenAI([html_round("<p>section</p>")], delay=0.02)
+
+    async def run():
+        output = await call_tool("draft_report_sections", {"outline": "report", "sections": sections()}, "u", oai_client=client)
+        drafting = asyncio.create_task(collect(output))
+        await asyncio.sleep(0.01)
+        store.write("u", OUTLINE + "<p>edited</p>\n", expected_version=1)
+        return await drafting
+
+    try:
+        _, result = asyncio.run(run())
+    finally:
+        set_report_store(None)
+
+    assert result.startswith("Report was changed by another session while drafting")
+    assert store.read("u").version == 2
+
+
+def test_overlapping_sections_are_rejected(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    overlapping = [{"start_line": 1, "end_line": 3, "instructions": "a"}, {"start_line": 3, "end_line": 4, "instructions": "b"}]
+    client = FakeOpenAI([html_round("<p>x</p>")])
+
+    async def run():
+        output = await call_tool("draft_report_sections", {"outline": "report", "sections": overlapping}, "u", oai_client=client)
+        return await collect(output)
+
+    try:
+        _, result = asyncio.run(run())
+    finally:
+        set_report_store(None)
+    assert result == "Section line ranges must be valid and must not overlap, nothing was written."
+    assert client.responses.calls == []
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_sections_are_drafted_concurrently_and_merged_once(Path(tmp))
@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.json_stream import FinalResponseParser
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeOpenAI, message_round
+
+FORM = {
+    "type": "form_request",
+    "content": {
+        "type": "form_request",
+        "description": "About the report",
+        "rows": [{"header": "Title", "content": ""}, {"header": "Audience \"internal\"", "content": "team"}],
+    },
+}
+CHOICE = {
+    "type": "choice_request",
+    "content": {"type": "choice_request", "description": "Pick a style", "options": ["plain", "colorful"], "single_choice": True},
+}
+
+
+def run_turn(agent: Agent) -> list[dict]:
+    async def run():
+        context = UIContext(context=[Message(role="user", content="start")])
+        return [frame async for frame in agent.trigger(context)]
+
+    frames = asyncio.run(run())
+    return [json.loads(frame_data(frame)) for frame in frames[:-1]]
+
+
+def no_reparse(final_response: str):
+    raise AssertionError("the completed response must not be parsed again")
+
+
+def test_parser_builds_rows_and_options_in_any_chunking():
+    for final, kinds in [(FORM, ["form_row", "form_row", "final"]), (CHOICE, ["choice_option", "choice_option", "final"])]:
+        text = json.dumps(final)
+        for chunk_size in [1, 3, 7, 1000]:
+            parser = FinalResponseParser()
+            events = [event for i in range(0, len(text), chunk_size) for event in parser.feed(text[i : i + chunk_size])]
+            assert [event[0] for event in events] == kinds
+            assert events[-1][1] == final["content"]
+
+
+def test_form_rows_are_streamed_and_the_request_sent_once():
+    agent = Agent(oai_client=FakeOpenAI([message_round(FORM, chunk_size=5)]), system_prompt="test", web_search=False)
+    agent.parse_final_response = no_reparse
+
+    outputs = run_turn(agent)
+    rows = [output for output in outputs if output["type"] == "form_row_delta"]
+    assert [row["index"] for row in rows] == [0, 1]
+    assert [row["row"] for row in rows] == FORM["content"]["rows"]
+
+    requests = [output for output in outputs if output["type"] == "form_request"]
+    assert requests == [FORM["content"]]
+    assert outputs.index(requests[0]) > outputs.index(rows[-1])
+
+
+def test_choice_options_are_streamed_and_the_request_sent_once():
+    agent = Agent(oai_client=FakeOpenAI([message_round(CHOICE, chunk_size=5)]), system_prompt="test", web_search=False)
+    agent.parse_final_response = no_reparse
+
+    outputs = run_turn(agent)
+    options = [output for output in outputs if output["type"] == "choice_option_delta"]
+    assert [(option["index"], option["option"]) for option in options] == [(0, "plain"), (1, "colorful")]
+    assert [output for output in outputs if output["type"] == "choice_request"] == [CHOICE["content"]]
+
+
+if __name__ == "__main__":
+    test_parser_builds_rows_and_options_in_any_chunking()
+    test_form_rows_are_streamed_and_the_request_sent_once()
+    test_choice_options_are_streamed_and_the_request_sent_once()
@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.serving import JobQueue, JobQueueFull, TurnRegistry
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, text_message_round
+
+
+def test_detached_jobs_persist_events(tmp_path):
+    client = FakeOpenAI([text_message_round("which topic?")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False)
+    context = UIContext(context=[Message(role="user", content="hi")])
+
+    async def run():
+        job_queue = JobQueue(registry=TurnRegistry(), jobs_dir=tmp_path, workers=2)
+        jobs = [job_queue.submit(lambda: agent.trigger(context)) for _ in range(3)]
+        assert all(job.status == "queued" for job in jobs)
+
+        await job_queue._queue.join()
+        await job_queue.close()
+        return job_queue, jobs
+
+    job_queue, jobs = asyncio.run(run())
+
+    for job in jobs:
+        # read back from disk
+        stored = job_queue.get(job.job_id)
+        assert stored.status == "completed"
+
+        events = job_queue.events_after(job.job_id)
+        assert [event_id for event_id, _ in events] == list(range(1, len(events) + 1))
+        assert events[-1][1].endswith("data: done\n\n")
+        assert job_queue.events_after(job.job_id, after=2) == events[2:]
+
+
+def test_job_queue_is_bounded(tmp_path):
+    async def run():
+        job_queue = JobQueue(registry=TurnRegistry(), jobs_dir=tmp_path, workers=1, max_queued=1)
+        job_queue.workers = 0  # nothing picks the jobs up
+        job_queue.submit(lambda: None)
+        try:
+            job_queue.submit(lambda: None)
+            assert False, "the second job must be rejected"
+        except JobQueueFull:
+            pass
+
+    asyncio.run(run())
+
+
+def test_job_events_are_written_in_batches(tmp_path):
+    agent = Agent(oai_client=FakeOpenAI([text_message_round("a longer answer in several deltas")]), system_prompt="test", web_search=False)
+    context = UIContext(context=[Message(role="user", content="hi")])
+
+    async def run():
+        job_queue = JobQueue(registry=TurnRegistry(), jobs_dir=tmp_path, workers=1, flush_interval=60)
+        batches = []
+        write_events = job_queue._write_events
+        job_queue._write_events = lambda f, lines: batches.append(len(lines)) or write_events(f, lines)
+        job = job_queue.submit(lambda: agent.trigger(context))
+        await job_queue._queue.join()
+        await job_queue.close()
+        return job_queue, job, batches
+
+    job_queue, job, batches = asyncio.run(run())
+    events = job_queue.events_after(job.job_id)
+    # all events of the turn in one write at its end
+    assert [batch for batch in batches if batch] == [len(events)]
+    assert len(events) > 2
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_detached_jobs_persist_events(Path(tempfile.mkdtemp()))
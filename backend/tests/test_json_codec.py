@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent import json_codec
+from agent.agent_openai.agent import Agent
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from agent.report_store import LocalFileReportStore, set_report_store
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+def test_backends_encode_alike():
+    value = {"type": "message", "content": "café 中文 \"quoted\"\n", "rows": [1, 2.5, None, True]}
+    encoded = {name: dumps(value) for name, (dumps, _) in json_codec.BACKENDS.items()}
+    assert len(set(encoded.values())) == 1
+    for name, (_, loads) in json_codec.BACKENDS.items():
+        assert loads(encoded[name]) == value
+
+
+def test_unknown_backend_falls_back(monkeypatch):
+    monkeypatch.setattr(json_codec, "backend", json_codec.backend)
+    monkeypatch.setattr(json_codec, "dumps", json_codec.dumps)
+    monkeypatch.setattr(json_codec, "loads", json_codec.loads)
+    json_codec.use_backend("simdjson")
+    assert json_codec.backend == "json"
+
+
+def test_arguments_are_parsed_once(monkeypatch, tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    parsed = []
+    loads = json_codec.loads
+
+    def counting_loads(data):
+        parsed.append(data)
+        return loads(data)
+
+    monkeypatch.setattr(json_codec, "loads", counting_loads)
+    client = FakeOpenAI([function_call_round("read_report_diff", {"since_version": 0}), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False)
+
+    async def run():
+        context = UIContext(context=[Message(role="user", content="diff")])
+        return [frame async for frame in agent.trigger(context)]
+
+    try:
+        frames = asyncio.run(run())
+    finally:
+        set_report_store(None)
+    assert parsed == ['{"since_version": 0}']
+    assert json.loads(frame_data(frames[-2])) == {"type": "message", "role": "assistant", "content": "done"}
+
+
+if __name__ == "__main__":
+    test_backends_encode_alike()
@@ -0,0 +1,130 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.report_store import SqliteReportStore
+from agent.report_store.delta import apply_delta
+from agent.serving import ReportChangeBus, SharedTurnLog, TurnRegistry, RemoteTurn
+from agent.serving.drain import DrainController
+
+
+async def frames(count: int, delay: float = 0.0):
+    for index in range(1, count + 1):
+        await asyncio.sleep(delay)
+        yield f"id: {index}\ndata: {index}\n\n"
+    yield f"id: {count + 1}\ndata: done\n\n"
+
+
+def test_turn_is_resumed_on_another_worker(tmp_path):
+    # two registries sharing one log stand for two worker processes
+    worker_a = TurnRegistry(shared_log=SharedTurnLog(tmp_path / "shared.db"))
+    worker_b = TurnRegistry(shared_log=SharedTurnLog(tmp_path / "shared.db"))
+
+    async def scenario():
+        broadcaster = worker_a.start(frames(5, delay=0.01), turn_id="t1")
+        remote = worker_b.get("t1")
+        assert isinstance(remote, RemoteTurn)
+        assert remote.can_resume(2)
+        received = [frame async for frame in remote.subscribe(2)]
+        await broadcaster.task
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == [f"id: {index}\ndata: {index}\n\n" for index in range(3, 6)] + ["id: 6\ndata: done\n\n"]
+    assert worker_b.get("unknown") is None
+
+
+def test_frames_are_logged_in_batches(tmp_path):
+    log = SharedTurnLog(tmp_path / "shared.db", flush_interval=0.05)
+    batches = []
+    append = log.append
+    log.append = lambda turn_id, frames: batches.append(len(frames)) or append(turn_id, frames)
+
+    async def scenario():
+        log.start("t1")
+        return [frame async for frame in log.logged("t1", frames(50))]
+
+    streamed = asyncio.run(scenario())
+    assert sum(batches) == len(streamed) == 51 and len(batches) < 5
+    assert [frame for _, frame in log.frames_after("t1", None)] == streamed
+    assert log.status("t1") == (True, None)
+
+
+def test_failed_remote_turn_raises(tmp_path):
+    log = SharedTurnLog(tmp_path / "shared.db")
+    log.start("t1")
+    log.append("t1", [(1, "id: 1\ndata: 1\n\n")])
+    log.finish("t1", error="upstream failed")
+
+    async def scenario():
+        received = []
+        try:
+            async for frame in RemoteTurn(log, "t1").subscribe():
+                received.append(frame)
+        except RuntimeError as e:
+            return received, str(e)
+
+    received, error = asyncio.run(scenario())
+    assert received == ["id: 1\ndata: 1\n\n"] and error == "upstream failed"
+
+
+def test_writes_of_other_workers_are_polled(tmp_path):
+    writer = SqliteReportStore(tmp_path / "reports.db")
+    reader = SqliteReportStore(tmp_path / "reports.db")
+    bus = ReportChangeBus(store=reader, poll_interval=0.01)
+    reader.add_listener(bus.publish)
+
+    async def scenario():
+        writer.write("u", "<p>1</p>\n", expected_version=0)
+        subscription = bus.subscribe("u")
+        writer.write("u", "<p>1</p>\n<p>2</p>\n", expected_version=1)
+        writer.write("u", "<p>3</p>\n", expected_version=2)
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        subscription.close()
+        return event
+
+    event = asyncio.run(scenario())
+    # both writes of the other worker arrive as one catch-up patch
+    assert (event["version"], event["base_version"]) == (3, 1)
+    assert apply_delta("<p>1</p>\n", event["delta"]) == reader.read("u").content
+    writer.close()
+    reader.close()
+
+
+def test_drain_waits_for_running_streams():
+    drain = DrainController(timeout_seconds=5, poll_interval=0.01)
+    shutdowns = []
+    drain._previous_handler = lambda signum, frame: shutdowns.append(signum)
+    running_jobs = [1]
+    drain.add_busy_check(lambda: len(running_jobs))
+
+    async def scenario():
+        stream = drain.track(frames(3, delay=0.02))
+        first = await stream.__anext__()
+        drain_task = drain.start_drain()
+        await drain.wait_draining()
+        assert drain.draining and drain.busy_count() == 2
+
+        rest = [frame async for frame in stream]
+        await asyncio.sleep(0.05)
+        # still waiting for the job
+        assert not shutdowns
+        running_jobs.clear()
+        await asyncio.wait_for(drain_task, timeout=1)
+        return [first] + rest
+
+    received = asyncio.run(scenario())
+    assert len(received) == 4
+    assert len(shutdowns) == 1 and drain.busy_count() == 0
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_turn_is_resumed_on_another_worker(Path(tmp))
+    test_drain_waits_for_running_streams()
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.rate_limit import MemoryRateLimitBackend, SqliteRateLimitBackend, RateLimiter, RateLimitExceeded
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeOpenAI, text_message_round
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryRateLimitBackend()
+    else:
+        backend = SqliteRateLimitBackend(tmp_path / "rate_limits.db")
+    yield backend
+    backend.close()
+
+
+def test_user_request_budget(backend):
+    limiter = RateLimiter(backend, user_requests_per_minute=2, max_wait_seconds=0.05)
+
+    async def scenario():
+        await limiter.acquire("a")
+        await limiter.acquire("a")
+        # other users have their own budget
+        await limiter.acquire("b")
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire("a")
+
+    asyncio.run(scenario())
+    assert limiter.remaining("a")["user:a:requests"] < 1
+
+
+def test_token_debt_holds_back_requests(backend):
+    limiter = RateLimiter(backend, user_tokens_per_minute=100, global_tokens_per_minute=10000, max_wait_seconds=0.05)
+    usage = type("Usage", (), {"total_tokens": 150})()
+
+    async def scenario():
+        await limiter.acquire("a")
+        await limiter.record_usage("a", usage)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire("a")
+        # the global budget is not exhausted yet
+        await limiter.acquire("b")
+
+    asyncio.run(scenario())
+
+
+def test_users_are_served_round_robin(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(MemoryRateLimitBackend, "_now", staticmethod(lambda: clock[0]))
+    limiter = RateLimiter(MemoryRateLimitBackend(), global_requests_per_minute=6)
+    admitted = []
+
+    async def request(user_id: str):
+        await limiter.acquire(user_id)
+        admitted.append(user_id)
+
+    async def scenario():
+        # drain the global budget
+        for _ in range(6):
+            await limiter.acquire("a")
+
+        tasks = [asyncio.create_task(request(user_id)) for user_id in ["a", "a", "a", "b"]]
+        await asyncio.sleep(0)
+        for _ in range(4):
+            # one more request per 10 seconds
+            clock[0] += 10
+            limiter._dispatch()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert admitted == ["a", "b", "a", "a"]
+
+
+def test_agent_enforces_budget_before_calling_the_model():
+    client = FakeOpenAI([text_message_round("hello")])
+    limiter = RateLimiter(MemoryRateLimitBackend(), user_tokens_per_minute=100, max_wait_seconds=0.05)
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, rate_limiter=limiter)
+    context = UIContext(context=[Message(role="user", content="hi")], user_id="u")
+
+    async def run() -> list[dict]:
+        frames = [frame async for frame in agent.trigger(context)]
+        return [json.loads(frame_data(frame)) for frame in frames[:-1]]
+
+    assert asyncio.run(run())[-1]["content"] == "hello"
+    # the fake response used 150 tokens, the budget is in debt
+    assert asyncio.run(run())[-1]["content"].startswith("Too many requests")
+    assert len(client.responses.calls) == 1
+
+
+def test_sqlite_transactions_run_off_the_event_loop(tmp_path, monkeypatch):
+    backend = SqliteRateLimitBackend(tmp_path / "rate_limits.db")
+    limiter = RateLimiter(backend, user_requests_per_minute=2, user_tokens_per_minute=1000, max_wait_seconds=0.05)
+    loop_threads = []
+    acquire, consume, level = backend.acquire, backend.consume, backend.level
+    monkeypatch.setattr(backend, "acquire", lambda charges: loop_threads.append(threading.get_ident()) or acquire(charges))
+    monkeypatch.setattr(backend, "consume", lambda bucket, amount: loop_threads.append(threading.get_ident()) or consume(bucket, amount))
+    monkeypatch.setattr(backend, "level", lambda bucket: loop_threads.append(threading.get_ident()) or level(bucket))
+
+    async def scenario():
+        await asyncio.gather(*(limiter.acquire(user_id) for user_id in ["a", "a", "b"]))
+        await limiter.record_usage("a", type("Usage", (), {"total_tokens": 10})())
+        # the wait reported by a timed out request reads the bucket levels
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire("a")
+
+    asyncio.run(scenario())
+    assert loop_threads and threading.get_ident() not in loop_threads
+    backend.close()
+
+
+if __name__ == "__main__":
+    test_agent_enforces_budget_before_calling_the_model()
@@ -0,0 +1,98 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.report_store import SqliteReportStore
+from agent.report_store.delta import apply_delta
+from agent.serving import ReportChangeBus
+
+
+def test_writes_are_pushed_as_patches(tmp_path):
+    store = SqliteReportStore(tmp_path / "reports.db")
+    bus = ReportChangeBus()
+    store.add_listener(bus.publish)
+
+    async def scenario():
+        subscription = bus.subscribe("u")
+        other = bus.subscribe("other")
+        store.write("u", "<h1>a</h1>\n<p>1</p>\n", expected_version=0)
+        store.write("u", "<h1>a</h1>\n<p>2</p>\n<p>3</p>\n", expected_version=1)
+
+        first = await asyncio.wait_for(subscription.get(), timeout=1)
+        second = await asyncio.wait_for(subscription.get(), timeout=1)
+        assert other.queue.empty()
+        subscription.close()
+        other.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert (first["version"], first["base_version"]) == (1, 0)
+    assert (second["version"], second["base_version"]) == (2, 1)
+
+    # the client copy follows the store by applying the patches
+    content = apply_delta(apply_delta("", first["delta"]), second["delta"])
+    assert content == store.read("u").content
+    assert bus.subscriber_count("u") == 0
+    store.close()
+
+
+def test_slow_subscriber_is_told_to_resync(tmp_path):
+    store = SqliteReportStore(tmp_path / "reports.db")
+    bus = ReportChangeBus(max_buffer=2)
+    store.add_listener(bus.publish)
+
+    async def scenario():
+        subscription = bus.subscribe("u")
+        for version in range(5):
+            store.write("u", f"<p>{version}</p>\n", expected_version=version)
+        await asyncio.sleep(0)
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        subscription.close()
+        return events
+
+    events = asyncio.run(scenario())
+    assert events[-1]["version"] == 5
+    assert any(event["type"] == "report_version" for event in events)
+    store.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_writes_are_pushed_as_patches(Path(tmp))
+
+
+def test_writes_from_threads_while_subscribers_come_and_go(tmp_path):
+    store = SqliteReportStore(tmp_path / "reports.db")
+    bus = ReportChangeBus()
+    store.add_listener(bus.publish)
+
+    def writer(user_id: str):
+        for version in range(20):
+            store.write(user_id, f"<p>{version}</p>\n", expected_version=version)
+
+    async def scenario():
+        subscription = bus.subscribe("u0")
+        writes = asyncio.gather(*(asyncio.to_thread(writer, f"u{i}") for i in range(4)))
+        # subscribers of the written reports churn on the loop meanwhile
+        while not writes.done():
+            bus.subscribe(f"u{len(bus._subscribers) % 4}").close()
+            await asyncio.sleep(0)
+        await writes
+
+        versions = []
+        while not subscription.queue.empty():
+            versions.append(subscription.queue.get_nowait()["version"])
+        subscription.close()
+        return versions
+
+    assert asyncio.run(scenario()) == list(range(1, 21))
+    assert bus.subscriber_count("u0") == 0
+    store.close()
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.report_preview import ChangesArgumentParser, ReportPreviewTracker
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+def test_parser_handles_any_chunking():
+    arguments = {
+        "changes": [
+            {"start_line": 0, "end_line": 3, "change_to": '<h1 class="t">caf\u00e9 \U0001f600 \\</h1>\n<p>x</p>'},
+            {"start_line": 10, "end_line": 12, "change_to": "tail"},
+        ]
+    }
+    for ensure_ascii in [True, False]:
+        text = json.dumps(arguments, ensure_ascii=ensure_ascii)
+        for chunk_size in [1, 2, 3, 7]:
+            parser = ChangesArgumentParser()
+            streamed = {}
+            for i in range(0, len(text), chunk_size):
+                for index, content in parser.feed(text[i : i + chunk_size]):
+                    streamed[index] = streamed.get(index, "") + content
+
+            assert [streamed[0], streamed[1]] == [change["change_to"] for change in arguments["changes"]]
+            assert [(change["start_line"], change["end_line"]) for change in parser.changes] == [(0, 3), (10, 12)]
+
+
+def test_report_write_is_previewed_while_streaming(tmp_path):
+    store = LocalFileReportStore(tmp_path)
+    set_report_store(store)
+    changes = [{"start_line": 0, "end_line": 0, "change_to": "<h1>title</h1>\n<p>" + "body " * 40 + "</p>"}]
+    client = FakeOpenAI([function_call_round("write_html_report", {"changes": changes}), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", tools=["write_html_report"], web_search=False)
+
+    async def run():
+        context = UIContext(context=[Message(role="user", content="write it")], user_id="u")
+        return [frame async for frame in agent.trigger(context)]
+
+    try:
+        outputs = [json.loads(frame_data(frame)) for frame in asyncio.run(run())[:-1]]
+    finally:
+        set_report_store(None)
+
+    previews = [output for output in outputs if output["type"] == "report_preview"]
+    assert len(previews) > 1
+    assert "".join(preview["content"] for preview in previews) == changes[0]["change_to"]
+    assert {(preview["call_id"], preview["index"], preview["start_line"]) for preview in previews} == {("call_0", 0, 0)}
+
+    # the previews arrive before the tool result
+    tool_response_at = next(i for i, output in enumerate(outputs) if output["type"] == "tool_response")
+    assert outputs.index(previews[-1]) < tool_response_at
+    assert store.read("u").content == changes[0]["change_to"] + "\n"
+
+
+def test_change_to_before_the_line_range_is_previewed_once_placed():
+    tracker = ReportPreviewTracker()
+    tracker.add_item(0, SimpleNamespace(type="function_call", name="write_html_report", call_id="call_0"))
+    text = json.dumps({"changes": [{"change_to": "<p>first</p>", "start_line": 2, "end_line": 4}]})
+
+    previews = []
+    for i in range(0, len(text), 5):
+        previews += tracker.feed(0, text[i : i + 5])
+
+    assert "".join(preview.content for preview in previews) == "<p>first</p>"
+    assert {(preview.index, preview.start_line, preview.end_line) for preview in previews} == {(0, 2, 4)}
+
+
+if __name__ == "__main__":
+    test_parser_handles_any_chunking()
+    test_change_to_before_the_line_range_is_previewed_once_placed()
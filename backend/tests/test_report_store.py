@@ -0,0 +1,217 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.report_store import (
+    LocalFileReportStore,
+    SqliteReportStore,
+    ReportVersionConflict,
+    ReportVersionNotFound,
+    set_report_store,
+)
+from agent.report_store import durability
+from agent.report_store.delta import compute_delta, apply_delta
+from agent.report_store.durability import GroupCommitLog
+from agent.tools.tools import call_tool, get_tool_state
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def report_store(request, tmp_path):
+    if request.param == "local":
+        store = LocalFileReportStore(tmp_path, snapshot_interval=4, retention_versions=6)
+    else:
+        store = SqliteReportStore(tmp_path / "reports.db", snapshot_interval=4, retention_versions=6)
+    set_report_store(store)
+    yield store
+    set_report_store(None)
+    store.close()
+
+
+def test_compare_and_swap(report_store):
+    assert report_store.read("u").version == 0
+
+    first = report_store.write("u", "<p>1</p>\n", expected_version=0)
+    assert first.version == 1
+
+    # a second writer which read version 0 must not clobber the first write
+    with pytest.raises(ReportVersionConflict):
+        report_store.write("u", "<p>2</p>\n", expected_version=0)
+
+    second = report_store.write("u", "<p>2</p>\n", expected_version=1)
+    assert second.version == 2
+    assert report_store.read("u").content == "<p>2</p>\n"
+    assert report_store.read("other").version == 0
+
+
+def test_report_tools_use_store(report_store):
+    changes = [{"start_line": 0, "end_line": 0, "change_to": "<h1>title</h1>"}]
+    assert asyncio.run(call_tool("write_html_report", {"changes": changes}, "u")) == "Report updated! Now at version 1."
+    assert report_store.read("u").content == "<h1>title</h1>\n"
+
+    content = asyncio.run(call_tool("read_current_report", {}, "u"))
+    assert content == "(Report version 1)\n0|<h1>title</h1>\n"
+
+    changes = [{"start_line": 0, "end_line": 0, "change_to": "<h1>new title</h1>\n<p>body</p>"}]
+    asyncio.run(call_tool("write_html_report", {"changes": changes}, "u"))
+    diff = asyncio.run(call_tool("read_report_diff", {"since_version": 1}, "u"))
+    assert diff.startswith("Current version: 2.")
+    assert "0|<h1>new title</h1>\n1|<p>body</p>\n" in diff
+
+
+def test_delta_roundtrip():
+    old = "a\nb\nc\nd\n"
+    new = "a\nB\nc\nd\ne"
+    delta = compute_delta(old, new)
+    assert apply_delta(old, delta) == new
+    assert sum(len(op["lines"]) for op in delta) == 2
+
+
+def test_delta_of_a_small_edit_to_a_long_report():
+    # repeated lines are junk to the matcher in long sequences, the common head and tail keep the delta small
+    old_lines = ["<div>\n", "</div>\n"] * 3000
+    new_lines = old_lines[:3001] + ["<p>new</p>\n"] + old_lines[3003:]
+    old, new = "".join(old_lines), "".join(new_lines)
+    delta = compute_delta(old, new)
+    assert apply_delta(old, delta) == new
+    assert delta == [{"start": 3001, "end": 3003, "lines": ["<p>new</p>\n"]}]
+
+
+def test_history_reconstruction_and_retention(report_store):
+    versions = [""]
+    for i in range(1, 15):
+        content = "".join(f"<p>{line}</p>\n" for line in range(i)) + f"<footer>{i}</footer>\n"
+        report_store.write("u", content, expected_version=i - 1)
+        versions.append(content)
+
+    for version in range(8, 15):
+        assert report_store.read_version("u", version).content == versions[version]
+
+    # retention keeps the last 6 versions, plus the deltas since the snapshot they need
+    with pytest.raises(ReportVersionNotFound):
+        report_store.read_version("u", 2)
+
+    current, diff = report_store.diff_since("u", 12)
+    assert current.version == 14
+    assert "14|<footer>14</footer>" in diff
+
+
+@pytest.mark.parametrize("mode", ["fast", "atomic", "strict"])
+def test_durability_modes_write_whole_files(tmp_path, mode):
+    store = LocalFileReportStore(tmp_path, snapshot_interval=2, retention_versions=3, durability=mode)
+    for i in range(1, 6):
+        store.write("u", f"<p>{i}</p>\n", expected_version=i - 1)
+
+    assert store.read("u").content == "<p>5</p>\n"
+    assert store.read_version("u", 4).content == "<p>4</p>\n"
+    # no temp file is left behind
+    assert not [path for path in tmp_path.rglob(".*") if path.is_file()]
+
+
+def test_sqlite_durability_sets_synchronous(tmp_path):
+    for mode, synchronous in [("fast", 0), ("atomic", 1), ("strict", 2)]:
+        store = SqliteReportStore(tmp_path / f"{mode}.db", durability=mode)
+        assert store._connection().execute("PRAGMA synchronous").fetchone()[0] == synchronous
+
+    with pytest.raises(ValueError):
+        LocalFileReportStore(tmp_path, durability="sometimes")
+
+
+def test_concurrent_fsyncs_are_coalesced(tmp_path, monkeypatch):
+    synced = []
+
+    def slow_fsync(path):
+        time.sleep(0.02)
+        synced.append(path)
+
+    monkeypatch.setattr(durability, "fsync_path", slow_fsync)
+    commit_log = GroupCommitLog()
+    barrier = threading.Barrier(8)
+
+    def writer():
+        barrier.wait()
+        commit_log.sync([tmp_path])
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert commit_log.requests == 8
+    # the first writer syncs alone, the others join the batches behind it
+    assert commit_log.batches < 8
+    assert len(synced) == commit_log.batches
+
+
+def test_failed_fsync_fails_the_write(tmp_path, monkeypatch):
+    def failing_fsync(path):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(durability, "fsync_path", failing_fsync)
+    store = LocalFileReportStore(tmp_path, durability="strict", commit_log=GroupCommitLog())
+    with pytest.raises(OSError):
+        store.write("u", "<p>lost</p>\n", expected_version=0)
+
+    assert store.read("u").version == 0
+    assert not [path for path in tmp_path.rglob(".*") if path.is_file()]
+
+
+def test_read_head_and_tool_state_read_the_version_once(report_store, monkeypatch):
+    assert not report_store.read_head("u").exists
+    written = report_store.write("u", "<p>a</p>\n", expected_version=0)
+    head = report_store.read_head("u")
+    assert (head.version, head.updated_at) == (written.version, written.updated_at)
+
+    heads = []
+    read_head = report_store.read_head
+    monkeypatch.setattr(report_store, "read_head", lambda user_id=None: heads.append(user_id) or read_head(user_id))
+    monkeypatch.setattr(report_store, "read", lambda user_id=None: pytest.fail("the report content is not needed"))
+    tool_names = ["read_current_report", "read_report_diff", "write_html_report", "draft_report_sections"]
+    assert get_tool_state(tool_names, "u") == {name: "1" for name in tool_names}
+    assert heads == ["u"]
+
+
+def test_the_manifest_rename_is_the_only_commit_point(tmp_path, monkeypatch):
+    store = LocalFileReportStore(tmp_path)
+    store.write("u", "<p>1</p>\n", expected_version=0)
+
+    # a crash before the manifest is replaced leaves the old version, content and version together
+    def crash(src, dst):
+        raise OSError("crashed")
+
+    monkeypatch.setattr(durability.os, "replace", crash)
+    with pytest.raises(OSError):
+        store.write("u", "<p>2</p>\n", expected_version=1)
+    monkeypatch.undo()
+
+    current = store.read("u")
+    assert (current.content, current.version) == ("<p>1</p>\n", 1)
+    assert store.read_head("u").version == 1
+
+    # readers that read an old manifest retry, only the current and the previous version files are kept
+    for i in range(2, 6):
+        store.write("u", f"<p>{i}</p>\n", expected_version=i - 1)
+    assert sorted(path.name for path in tmp_path.glob("html_report_u.v*.html")) == [
+        "html_report_u.v00000004.html",
+        "html_report_u.v00000005.html",
+    ]
+    assert store.read("u").content == "<p>5</p>\n"
+
+
+def test_reports_written_before_version_files_are_read(tmp_path):
+    (tmp_path / "html_report_u.html").write_text("<p>old</p>\n", encoding="utf-8")
+    (tmp_path / "html_report_u.version").write_text('{"version": 7, "updated_at": 1.0}', encoding="utf-8")
+    store = LocalFileReportStore(tmp_path)
+    assert (store.read("u").content, store.read_head("u").version) == ("<p>old</p>\n", 7)
+
+    store.write("u", "<p>new</p>\n", expected_version=7)
+    assert store.read("u").content == "<p>new</p>\n"
+    assert store.read_version("u", 8).content == "<p>new</p>\n"
@@ -0,0 +1,96 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.response_cache import ResponseCache, make_cache_key
+from agent.report_store import LocalFileReportStore, get_report_store, set_report_store
+from agent.schema import UIContext, Message
+from fake_openai import FakeOpenAI, function_call_round, text_message_round, web_search_round
+
+
+async def collect(agent: Agent, context: UIContext) -> list[str]:
+    return [frame async for frame in agent.trigger(context)]
+
+
+def make_context(content: str = "write me a report") -> UIContext:
+    return UIContext(context=[Message(role="user", content=content)])
+
+
+def test_make_cache_key_is_canonical():
+    assert make_cache_key({"a": 1, "b": [1, 2]}) == make_cache_key({"b": [1, 2], "a": 1})
+    assert make_cache_key({"a": 1}) != make_cache_key({"a": 2})
+
+
+def test_cache_hit_replays_frames():
+    cache = ResponseCache()
+    client = FakeOpenAI([text_message_round("which topic?")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, response_cache=cache)
+
+    first = asyncio.run(collect(agent, make_context()))
+    second = asyncio.run(collect(agent, make_context()))
+
+    assert first == second
+    assert len(client.responses.calls) == 1
+    assert cache.hits == 1
+
+    # different prompt, different key
+    asyncio.run(collect(agent, make_context("something else")))
+    assert len(client.responses.calls) == 2
+
+
+def test_cached_turns_are_not_shared_across_users(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    cache = ResponseCache()
+    client = FakeOpenAI([function_call_round("read_current_report", {}), text_message_round("read it")])
+    agent = Agent(oai_client=client, system_prompt="test", tools=["read_current_report"], web_search=False, response_cache=cache)
+
+    def context(user_id: str) -> UIContext:
+        return UIContext(context=[Message(role="user", content="read my report")], user_id=user_id)
+
+    try:
+        # both reports are at version 1
+        get_report_store().write("alice", "<p>alice's secret</p>\n", expected_version=0)
+        get_report_store().write("bob", "<p>bob's notes</p>\n", expected_version=0)
+        asyncio.run(collect(agent, context("alice")))
+        bob_frames = asyncio.run(collect(agent, context("bob")))
+    finally:
+        set_report_store(None)
+
+    assert cache.hits == 0
+    assert len(client.responses.calls) == 4
+    assert not any("alice's secret" in frame for frame in bob_frames)
+
+
+def test_web_search_turns_are_not_cached():
+    cache = ResponseCache()
+    client = FakeOpenAI([web_search_round("news"), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", response_cache=cache)
+
+    asyncio.run(collect(agent, make_context()))
+    assert len(cache) == 0
+
+
+def test_ttl_and_lru_limits():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", [(0.0, "data: a\n\n")])
+    cache.put("b", [(0.0, "data: b\n\n")])
+    assert cache.get("a") is not None
+
+    # "b" is now the least recently used entry
+    cache.put("c", [(0.0, "data: c\n\n")])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    expired = ResponseCache(ttl_seconds=0)
+    expired.put("a", [(0.0, "data: a\n\n")])
+    assert expired.get("a") is None
+
+
+if __name__ == "__main__":
+    test_cache_hit_replays_frames()
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.tools import tools
+from agent.tools.tool_source.base_tool import BaseTool
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+def run_turn(agent: Agent, client: FakeOpenAI) -> list[tuple[dict, int]]:
+    # each output with the number of requests sent when the client got it
+    async def run():
+        context = UIContext(context=[Message(role="user", content="read")])
+        outputs = []
+        async for frame in agent.trigger(context):
+            # lets the request sent ahead go out, like a client reading the stream
+            await asyncio.sleep(0)
+            outputs.append((frame, len(client.responses.calls)))
+        return outputs
+
+    outputs = asyncio.run(run())
+    return [(json.loads(frame_data(frame)), calls) for frame, calls in outputs[:-1]]
+
+
+def tool_round_turn(tmp_path, pipeline_rounds: bool) -> list[tuple[dict, int]]:
+    set_report_store(LocalFileReportStore(tmp_path))
+    client = FakeOpenAI([function_call_round("read_current_report", {}), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, pipeline_rounds=pipeline_rounds)
+    try:
+        return run_turn(agent, client)
+    finally:
+        set_report_store(None)
+
+
+def test_next_request_is_sent_before_the_tool_results(tmp_path):
+    outputs = tool_round_turn(tmp_path, pipeline_rounds=True)
+    tool_response = next(calls for output, calls in outputs if output["type"] == "tool_response")
+    assert tool_response == 2
+    assert outputs[-1][0]["content"] == "done"
+
+
+def test_pipelining_does_not_change_the_frames(tmp_path):
+    sequential = tool_round_turn(tmp_path / "sequential", pipeline_rounds=False)
+    pipelined = tool_round_turn(tmp_path / "pipelined", pipeline_rounds=True)
+    assert [output for output, _ in sequential] == [output for output, _ in pipelined]
+    assert next(calls for output, calls in sequential if output["type"] == "tool_response") == 1
+
+
+class SlowDraftTool(BaseTool):
+    purity = "pure"
+    cost_class = "expensive"
+    running = 0
+    peak = 0
+
+    def get_schema(self) -> dict:
+        return {"type": "function", "name": "slow_draft", "parameters": {"type": "object", "properties": {}}}
+
+    async def call(self):
+        SlowDraftTool.running += 1
+        SlowDraftTool.peak = max(SlowDraftTool.peak, SlowDraftTool.running)
+        await asyncio.sleep(0.02)
+        SlowDraftTool.running -= 1
+        return "drafted"
+
+    def tool_call_message(self, **kwargs) -> str:
+        return "Drafting..."
+
+    def tool_result_message(self, **kwargs) -> str:
+        return "Drafted."
+
+
+def test_expensive_tool_calls_are_bounded(monkeypatch):
+    monkeypatch.setitem(tools.TOOL_REGISTRY, "slow_draft", (None, None))
+    monkeypatch.setitem(tools._tool_instances, "slow_draft", SlowDraftTool())
+    # one round calling the tool four times in parallel
+    calls = [function_call_round("slow_draft", {}, call_id=f"call_{i}") for i in range(4)]
+    parallel_round = {"deltas": [], "output": [call["output"][0] for call in calls]}
+    client = FakeOpenAI([parallel_round, text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, max_expensive_tool_calls=2)
+
+    outputs = run_turn(agent, client)
+    assert outputs[-1][0]["content"] == "done"
+    assert SlowDraftTool.peak == 2
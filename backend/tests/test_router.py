@@ -0,0 +1,97 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.router import TurnRouter, FAST_MODEL, FAST_ANSWER_ROUTES
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.schema import UIContext, Message, ChoiceRequest, ChoiceResult
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+def make_context(*items) -> UIContext:
+    return UIContext(context=list(items), user_id="u")
+
+
+def test_turns_are_classified_by_shape_and_report_state(tmp_path):
+    store = LocalFileReportStore(tmp_path)
+    set_report_store(store)
+    router = TurnRouter()
+    try:
+        request = Message(role="user", content="a report about cats")
+        choice = ChoiceRequest(options=["short", "long"], single_choice=True)
+        assert router.classify(make_context(request)) == "clarify"
+        assert router.classify(make_context(request, choice, ChoiceResult(chosen=["short"]))) == "choice_answer"
+        assert router.classify(make_context(request, choice, ChoiceResult(chosen=["short"]), request)) == "new_report"
+
+        store.write("u", "<h1>cats</h1>\n", expected_version=0)
+        assert router.classify(make_context(request)) == "edit"
+    finally:
+        set_report_store(None)
+
+
+def test_rounds_use_routed_settings_and_are_recorded(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    changes = [{"start_line": 0, "end_line": 0, "change_to": "<h1>short</h1>"}]
+    client = FakeOpenAI([function_call_round("write_html_report", {"changes": changes}), text_message_round("done")])
+    router = TurnRouter(routes=FAST_ANSWER_ROUTES, log_path=tmp_path / "routing.jsonl")
+    agent = Agent(oai_client=client, system_prompt="test", tools=["write_html_report"], web_search=False, reasonging_effort="medium", router=router)
+
+    context = make_context(
+        Message(role="user", content="a report about cats"),
+        ChoiceRequest(options=["short", "long"], single_choice=True),
+        ChoiceResult(chosen=["short"]),
+    )
+
+    async def run():
+        return [frame async for frame in agent.trigger(context)]
+
+    try:
+        asyncio.run(run())
+    finally:
+        set_report_store(None)
+
+    first, second = client.responses.calls
+    assert first["model"] == FAST_MODEL and second["model"] == FAST_MODEL
+    assert first["reasoning"]["effort"] == "medium"
+    # the round after the report write only notifies the user
+    assert second["reasoning"]["effort"] == "low" and second["text"]["verbosity"] == "low"
+
+    assert [record["round"] for record in router.records] == [0, 1]
+    assert router.records[0]["tool_calls"] == ["write_html_report"]
+    assert len((tmp_path / "routing.jsonl").read_text().splitlines()) == 2
+    assert router.stats()["choice_answer"][FAST_MODEL]["turns"] == 1
+
+
+def test_answers_keep_the_agent_model_by_default(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    client = FakeOpenAI([text_message_round("which colors?")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, router=TurnRouter())
+
+    context = make_context(
+        Message(role="user", content="a report about cats"),
+        ChoiceRequest(options=["short", "long"], single_choice=True),
+        ChoiceResult(chosen=["short"]),
+    )
+
+    async def run():
+        return [frame async for frame in agent.trigger(context)]
+
+    try:
+        asyncio.run(run())
+    finally:
+        set_report_store(None)
+
+    assert client.responses.calls[0]["model"] == agent.model != FAST_MODEL
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_rounds_use_routed_settings_and_are_recorded(Path(tmp))
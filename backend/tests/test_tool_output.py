@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.tool_output import ToolOutputAssembler, preview_tool_output
+from agent.tools import tools
+from agent.tools.tools import ToolProgress
+from agent.tools.tool_source.base_tool import BaseTool
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeOpenAI, function_call_round, text_message_round
+
+
+class StreamingSearchTool(BaseTool):
+    purity = "pure"
+
+    def get_schema(self) -> dict:
+        return {"type": "function", "name": "stream_search", "parameters": {"type": "object", "properties": {}}}
+
+    async def call(self):
+        yield ToolProgress("searching...")
+        for i in range(100):
+            yield f"result {i}\n"
+
+    def tool_call_message(self, **kwargs) -> str:
+        return "Searching..."
+
+    def tool_result_message(self, **kwargs) -> str:
+        return "Searched."
+
+
+def test_preview_is_cut_at_the_source():
+    text = "x" * 1000
+    assert preview_tool_output(text) == "x" * 300 + "..."
+    parts = [{"type": "input_text", "text": text}, {"type": "input_image", "image_url": "data:..."}]
+    assert preview_tool_output(parts) == "x" * 300 + "..."
+    assert preview_tool_output([{"type": "input_image", "image_url": "data:..."}, {"type": "input_text", "text": "hi"}]) == "[image]\nhi"
+    assert preview_tool_output(None) == "None"
+
+
+def test_assembler_joins_chunks_once():
+    assembler = ToolOutputAssembler(preview_limit=5)
+    assert assembler.add("abc") == "abc"
+    assert assembler.add("defg") == "de"
+    assert assembler.add("h") == ""
+    assert assembler.output() == "abcdefgh"
+
+    image = {"type": "input_image", "image_url": "data:image/png;base64,AAAA"}
+    assembler = ToolOutputAssembler()
+    for chunk in ["a", "b", image, "c"]:
+        assembler.add(chunk)
+    assert assembler.output() == [{"type": "input_text", "text": "ab"}, image, {"type": "input_text", "text": "c"}]
+
+
+def test_streaming_tool_previews_are_forwarded(monkeypatch):
+    monkeypatch.setitem(tools._tool_instances, "stream_search", StreamingSearchTool())
+    client = FakeOpenAI([function_call_round("stream_search", {}), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False)
+
+    async def run():
+        context = UIContext(context=[Message(role="user", content="search")])
+        return [json.loads(frame_data(frame)) for frame in [frame async for frame in agent.trigger(context)][:-1]]
+
+    outputs = asyncio.run(run())
+    assert {"type": "tool_response", "content": "tool progress: searching..."} in outputs
+
+    # previews are bounded, the model gets the whole output
+    streamed = "".join(output["content"] for output in outputs if output["type"] == "streaming_display" and output["content"].startswith("result"))
+    assert len(streamed) <= 300
+    function_output = next(item for item in client.responses.calls[1]["input"] if isinstance(item, dict) and item.get("type") == "function_call_output")
+    assert function_output["output"] == "".join(f"result {i}\n" for i in range(100))
+
+
+if __name__ == "__main__":
+    test_preview_is_cut_at_the_source()
+    test_assembler_joins_chunks_once()
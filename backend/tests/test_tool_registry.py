@@ -0,0 +1,79 @@
+import os
+import sys
+import asyncio
+import subprocess
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.tools.tools import TOOL_REGISTRY, ToolArgumentError, call_tool, get_tool, get_tool_schema_list, is_side_effect_free
+
+
+def test_listing_tools_does_not_import_them():
+    code = (
+        "import sys\n"
+        "from agent.tools.tools import get_tool_schema_list\n"
+        "get_tool_schema_list(['write_html_report', 'read_current_report'])\n"
+        "assert 'agent.tools.tool_source.write_html' not in sys.modules\n"
+        "assert 'PIL' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent, check=True)
+
+
+def test_static_schemas_match_tools():
+    schemas = get_tool_schema_list(list(TOOL_REGISTRY))
+    assert [schema["name"] for schema in schemas] == list(TOOL_REGISTRY)
+    for schema in schemas:
+        tool = get_tool(schema["name"])
+        assert tool.get_schema() == schema
+        # created once
+        assert get_tool(schema["name"]) is tool
+
+
+def test_malformed_arguments_are_rejected_before_the_call(tmp_path):
+    store = LocalFileReportStore(tmp_path)
+    set_report_store(store)
+    try:
+        bad_arguments = [
+            {},
+            {"changes": "<p>not a list</p>"},
+            {"changes": [{"start_line": "0", "end_line": 0, "change_to": "<p>x</p>"}]},
+            {"changes": [{"start_line": 0, "change_to": "<p>x</p>"}]},
+            {"changes": [], "html": "<p>x</p>"},
+        ]
+        for arguments in bad_arguments:
+            with pytest.raises(ToolArgumentError):
+                asyncio.run(call_tool("write_html_report", arguments, "u"))
+        assert store.read("u").version == 0
+
+        with pytest.raises(ToolArgumentError, match="since_version"):
+            asyncio.run(call_tool("read_report_diff", {"since_version": True}, "u"))
+    finally:
+        set_report_store(None)
+
+
+def test_call_tool_leaves_the_arguments_alone(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    arguments = {"changes": [{"start_line": 0, "end_line": 0, "change_to": "<h1>title</h1>"}]}
+    try:
+        asyncio.run(call_tool("write_html_report", arguments, "u"))
+    finally:
+        set_report_store(None)
+
+    # the progress messages of the round read the same arguments
+    assert arguments == {"changes": [{"start_line": 0, "end_line": 0, "change_to": "<h1>title</h1>"}]}
+
+
+def test_purity_decides_cacheability():
+    assert is_side_effect_free("read_current_report")
+    assert not is_side_effect_free("write_html_report")
+    assert not is_side_effect_free("web_search")
+
+
+if __name__ == "__main__":
+    test_listing_tools_does_not_import_them()
+    test_static_schemas_match_tools()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.agent_openai.agent import Agent
+from agent.agent_openai.json_stream import FinalResponseParser
+from agent.agent_openai.turn_memory import TurnMemoryStats, compact_input_item
+from agent.report_store import LocalFileReportStore, set_report_store
+from agent.schema import UIContext, Message
+from agent.serving import frame_data
+from fake_openai import FakeItem, FakeOpenAI, function_call_round, text_message_round
+
+
+def test_message_text_is_parsed_incrementally():
+    text = 'line "one"\nzwei é \U0001f600 \\ end'
+    final = json.dumps({"type": "message", "content": {"type": "message", "content": text}})
+    for chunk_size in [1, 2, 3, 7, 64]:
+        parser = FinalResponseParser()
+        streamed = "".join(
+            event[1] for i in range(0, len(final), chunk_size) for event in parser.feed(final[i : i + chunk_size])
+        )
+        assert streamed == text
+
+    # only message responses are streamed as text
+    parser = FinalResponseParser()
+    form = json.dumps({"type": "form_request", "content": {"type": "form_request", "rows": [], "description": "d"}})
+    assert [event[0] for event in parser.feed(form)] == ["final"]
+
+    # keys out of order are held back until the type is known
+    parser = FinalResponseParser()
+    assert parser.feed('{"content": {"content": "hi"}, ') == []
+    assert parser.feed('"type": "message"}') == [("text", "hi")]
+
+
+def test_output_items_are_compacted():
+    call = FakeItem(type="function_call", id="fc_1", call_id="c1", name="read", arguments="{}", status="completed")
+    assert compact_input_item(call) == {"type": "function_call", "call_id": "c1", "name": "read", "arguments": "{}", "id": "fc_1"}
+    reasoning = FakeItem(type="reasoning", id="rs_1", summary=[FakeItem(type="summary_text", text="thinking")])
+    assert compact_input_item(reasoning) == {"type": "reasoning", "summary": [{"type": "summary_text", "text": "thinking"}], "id": "rs_1"}
+
+
+def run_turn(agent: Agent) -> list[dict]:
+    async def run():
+        context = UIContext(context=[Message(role="user", content="read")])
+        return [frame async for frame in agent.trigger(context)]
+
+    frames = asyncio.run(run())
+    return [json.loads(frame_data(frame)) for frame in frames[:-1]]
+
+
+def test_next_round_gets_compact_items(tmp_path):
+    set_report_store(LocalFileReportStore(tmp_path))
+    stats = TurnMemoryStats()
+    client = FakeOpenAI([function_call_round("read_current_report", {}), text_message_round("done")])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, memory_stats=stats)
+    try:
+        outputs = run_turn(agent)
+    finally:
+        set_report_store(None)
+
+    assert outputs[-1]["content"] == "done"
+    second_input = client.responses.calls[1]["input"]
+    assert all(isinstance(item, dict) for item in second_input)
+    assert {"type": "function_call", "call_id": "call_0", "name": "read_current_report", "arguments": "{}"} in second_input
+    assert stats.stats()["turns"] == 1 and stats.stats()["peak_bytes_max"] > 0
+
+
+def test_turn_over_its_cap_is_ended():
+    stats = TurnMemoryStats()
+    client = FakeOpenAI([text_message_round("x" * 5000)])
+    agent = Agent(oai_client=client, system_prompt="test", web_search=False, max_turn_bytes=2000, memory_stats=stats)
+
+    outputs = run_turn(agent)
+    assert outputs[-1]["content"] == "This conversation got too large to continue. Please start a new one."
+    streamed = "".join(output["content"] for output in outputs if output["type"] == "message_delta")
+    assert 0 < len(streamed) < 5000
+    assert stats.capped_turns == 1
+
+
+if __name__ == "__main__":
+    test_message_text_is_parsed_incrementally()
+    test_output_items_are_compacted()
+    test_turn_over_its_cap_is_ended()
@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { ChatPanel } from './components/ChatPanel';
 import { ReportPanel } from './components/ReportPanel';
-import { Input, Message, StreamOutput, FormResult, FormRequest, ChoiceRequest, ChoiceResult, MessageDelta, StreamingDisplayOutput } from './types/api';
+import { Input, Message, StreamOutput, FormResult, FormRequest, ChoiceRequest, ChoiceResult, MessageDelta, StreamingDisplayOutput, ReportPreview } from './types/api';
 import { agentService } from './services/agent';
 import './App.css';
 
@@ -11,6 +11,7 @@ function App() {
   const [streamingContent, setStreamingContent] = useState<string>('');
   const [isLoading, setIsLoading] = useState(false);
   const [reportRefresh, setReportRefresh] = useState(0);
+  const [reportPreview, setReportPreview] = useState<ReportPreview | null>(null);
   const [userId, setUserId] = useState<string>('');
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [usernameInput, setUsernameInput] = useState('');
@@ -49,6 +50,23 @@ function App() {
         let currentProcessMessages: StreamOutput[] = [];
         let isStreamingMessage = false;
         let currentStreamingText = '';
+        let currentPreview: ReportPreview | null = null;
+        // Form or choice request whose rows/options are still streamed, and its position in currentMessages
+        let streamedRequest: FormRequest | ChoiceRequest | null = null;
+        let streamedRequestIndex = -1;
+
+        const showRequest = (request: FormRequest | ChoiceRequest) => {
+            if (streamedRequest && streamedRequest.type === request.type) {
+                currentMessages[streamedRequestIndex] = request;
+            } else {
+                isStreamingMessage = false;
+                assistantContent = '';
+                currentProcessMessages = [];
+                streamedRequestIndex = currentMessages.length;
+                currentMessages.push(request);
+            }
+            setMessages([...currentMessages]);
+        };
 
         for await (const output of stream) {
           if (output.type === 'message') {
@@ -96,30 +114,47 @@ function App() {
                  currentStreamingText = currentStreamingText.slice(-20);
              }
              setStreamingContent(currentStreamingText);
+          } else if (output.type === 'report_preview') {
+             // A report write being streamed, rendered live by the report panel
+             if (!currentPreview || currentPreview.callId !== output.call_id) {
+                 currentPreview = { callId: output.call_id, changes: [] };
+             }
+             const changes = [...currentPreview.changes];
+             const change = changes[output.index] ?? { start_line: output.start_line, end_line: output.end_line, change_to: '' };
+             changes[output.index] = { ...change, change_to: change.change_to + output.content };
+             currentPreview = { callId: currentPreview.callId, changes };
+             setReportPreview(currentPreview);
+          } else if (output.type === 'form_row_delta') {
+             // Provisional form, replaced by the form_request once it is complete
+             const rows = streamedRequest?.type === 'form_request' ? [...streamedRequest.rows] : [];
+             rows[output.index] = output.row;
+             const formRequest: FormRequest = { type: 'form_request', rows };
+             showRequest(formRequest);
+             streamedRequest = formRequest;
+
+          } else if (output.type === 'choice_option_delta') {
+             const options = streamedRequest?.type === 'choice_request' ? [...streamedRequest.options] : [];
+             options[output.index] = output.option;
+             const choiceRequest: ChoiceRequest = { type: 'choice_request', options, single_choice: false };
+             showRequest(choiceRequest);
+             streamedRequest = choiceRequest;
+
           } else if (output.type === 'form_request') {
-             isStreamingMessage = false;
-             assistantContent = '';
-             currentProcessMessages = []; 
-             
             const formRequest: FormRequest = {
                 type: 'form_request',
                 rows: output.rows
             };
-            currentMessages.push(formRequest);
-            setMessages([...currentMessages]);
-            
-          } else if (output.type === 'choice_request') {
-             isStreamingMessage = false;
-             assistantContent = '';
-             currentProcessMessages = [];
+            showRequest(formRequest);
+            streamedRequest = null;
 
+          } else if (output.type === 'choice_request') {
              const choiceRequest: ChoiceRequest = {
                  type: 'choice_request',
                  options: output.options,
                  single_choice: output.single_choice
              };
-             currentMessages.push(choiceRequest);
-             setMessages([...currentMessages]);
+             showRequest(choiceRequest);
+             streamedRequest = null;
 
           } else {
             // Process message (thinking, tool_call, tool_response)
@@ -152,6 +187,7 @@ function App() {
         // Clear process messages after completion
         setProcessMessages([]);
         setStreamingContent(''); // Clear streaming display
+        setReportPreview(null);
 
         // Trigger report refresh
         setReportRefresh((prev) => prev + 1);
@@ -164,6 +200,7 @@ function App() {
         };
         setMessages([...newMessages, errorMessage]);
         setStreamingContent('');
+        setReportPreview(null);
       } finally {
         setIsLoading(false);
       }
@@ -191,7 +228,7 @@ function App() {
           </div>
 
           <div className="panel panel-right">
-            <ReportPanel refreshTrigger={reportRefresh} userId={userId} />
+            <ReportPanel refreshTrigger={reportRefresh} userId={userId} preview={reportPreview} />
           </div>
         </div>
       </main>
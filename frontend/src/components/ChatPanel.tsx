@@ -15,6 +15,11 @@ interface ChatPanelProps {
 const FormRequestItem = ({ request, onSubmit, disabled }: { request: FormRequest, onSubmit: (res: FormResult) => void, disabled: boolean }) => {
   const [rows, setRows] = useState<FormRow[]>(request.rows.map(r => ({ ...r })));
 
+  // the rows of a form request that is still streamed arrive one by one
+  useEffect(() => {
+    setRows(prev => prev.length < request.rows.length ? [...prev, ...request.rows.slice(prev.length).map(r => ({ ...r }))] : prev);
+  }, [request.rows]);
+
   const handleChange = (index: number, val: string) => {
     const newRows = [...rows];
     newRows[index] = { ...newRows[index], content: val };
@@ -1,43 +1,112 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
+import { agentService } from '../services/agent';
+import { applyReportDelta, applyReportPreview } from '../services/reportPatch';
+import { ReportEvent, ReportPreview } from '../types/api';
 import './ReportPanel.css';
 
 interface ReportPanelProps {
   refreshTrigger?: number;
   userId?: string;
+  // report write being streamed, shown on top of the report until the write lands
+  preview?: ReportPreview | null;
 }
 
-export const ReportPanel: React.FC<ReportPanelProps> = ({ refreshTrigger, userId }) => {
-  const [iframeUrl, setIframeUrl] = useState<string>('');
+// re-rendering the iframe on every streamed chunk would flicker, previews are rendered at most this often
+const PREVIEW_INTERVAL_MS = 250;
+
+export const ReportPanel: React.FC<ReportPanelProps> = ({ refreshTrigger, userId, preview }) => {
+  const [html, setHtml] = useState<string>('');
   const [loading, setLoading] = useState(true);
-  const [key, setKey] = useState(0); // Use key to force re-render of iframe
+  // Latest report content and version, patches are applied on top of them
+  const contentRef = useRef<string>('');
+  const versionRef = useRef<number>(0);
+  const [previewHtml, setPreviewHtml] = useState<string | null>(null);
+  const previewRef = useRef<ReportPreview | null>(null);
+  const previewBaseRef = useRef<{ callId: string; version: number } | null>(null);
+  const previewTimerRef = useRef<number | null>(null);
 
-  const loadReport = () => {
-    setLoading(true);
-    const timestamp = new Date().getTime();
-    // Use the same baseUrl logic as agent.ts
-    // @ts-ignore - Vite env variables
-    const baseUrl = import.meta.env.DEV ? `http://${window.location.hostname}:8000` : '';
-    let url = `${baseUrl}/temp/html_report.html?t=${timestamp}`;
-    if (userId) {
-      url += `&user_id=${encodeURIComponent(userId)}`;
+  const showReport = (content: string, version: number) => {
+    contentRef.current = content;
+    versionRef.current = version;
+    setHtml(content);
+    // a new version supersedes the preview
+    setPreviewHtml(null);
+  };
+
+  const renderPreview = () => {
+    previewTimerRef.current = null;
+    const current = previewRef.current;
+    const base = previewBaseRef.current;
+    if (!current || !base || base.version !== versionRef.current) {
+      setPreviewHtml(null);
+      return;
     }
-    setIframeUrl(url);
-    setKey(prev => prev + 1);
+    setPreviewHtml(applyReportPreview(contentRef.current, current.changes));
   };
 
   useEffect(() => {
-    loadReport();
-  }, [refreshTrigger]);
+    previewRef.current = preview ?? null;
+    if (!preview) {
+      previewBaseRef.current = null;
+      setPreviewHtml(null);
+      return;
+    }
+    if (previewBaseRef.current?.callId !== preview.callId) {
+      // the tool applies the changes to the version current when the call started
+      previewBaseRef.current = { callId: preview.callId, version: versionRef.current };
+    }
+    if (previewTimerRef.current === null) {
+      previewTimerRef.current = window.setTimeout(renderPreview, PREVIEW_INTERVAL_MS);
+    }
+  }, [preview]);
 
-  const handleIframeLoad = () => {
-    setLoading(false);
+  useEffect(() => {
+    return () => {
+      if (previewTimerRef.current !== null) {
+        window.clearTimeout(previewTimerRef.current);
+      }
+    };
+  }, []);
+
+  const loadReport = async () => {
+    setLoading(true);
+    try {
+      const { content, version } = await agentService.loadHtmlReportWithVersion(userId);
+      showReport(content, version);
+    } catch (error) {
+      console.error('Failed to load report:', error);
+    } finally {
+      setLoading(false);
+    }
   };
 
+  useEffect(() => {
+    void loadReport();
+  }, [refreshTrigger, userId]);
+
+  // Report changes are pushed by the backend, small patches instead of re-downloading the report
+  useEffect(() => {
+    const source = new EventSource(agentService.reportEventsUrl(userId));
+    source.onmessage = (message) => {
+      const event = JSON.parse(message.data) as ReportEvent;
+      if (event.version <= versionRef.current) {
+        return;
+      }
+      if (event.type === 'report_patch' && event.base_version === versionRef.current) {
+        showReport(applyReportDelta(contentRef.current, event.delta), event.version);
+      } else {
+        // Missed a version, fall back to a full (revalidated) load
+        void loadReport();
+      }
+    };
+    return () => source.close();
+  }, [userId]);
+
   return (
     <div className="report-panel">
       <div className="report-header">
         <h2>📊 HTML Report</h2>
-        <button onClick={loadReport} className="refresh-button" disabled={loading}>
+        <button onClick={() => void loadReport()} className="refresh-button" disabled={loading}>
           {loading ? '⏳' : '🔄'} Refresh
         </button>
       </div>
@@ -51,10 +120,8 @@ export const ReportPanel: React.FC<ReportPanelProps> = ({ refreshTrigger, userId
         )}
         
         <iframe
-          key={key}
-          src={iframeUrl}
+          srcDoc={previewHtml ?? html}
           className="report-iframe"
-          onLoad={handleIframeLoad}
           title="Report Analysis"
           style={{
             width: '100%',
@@ -5,8 +5,11 @@ export class AgentService {
   // @ts-ignore - Vite env variables
   private baseUrl = import.meta.env.DEV ? `http://${window.location.hostname}:8000` : '';
 
+  // How many times a dropped stream is resumed before giving up
+  private maxResumeAttempts = 3;
+
   async *streamChat(context: UIContext): AsyncGenerator<StreamOutput, void, unknown> {
-    const response = await fetch(`${this.baseUrl}/trigger`, {
+    let response = await fetch(`${this.baseUrl}/trigger`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -19,6 +22,47 @@ export class AgentService {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
 
+    // The backend keeps the turn running, a dropped stream resumes from the last received event id
+    const turnId = response.headers.get('X-Turn-Id');
+    const cursor = { lastEventId: '' };
+    let attempts = 0;
+
+    while (true) {
+      try {
+        const finished = yield* this.readEvents(response, cursor);
+        if (finished) {
+          return;
+        }
+      } catch (e) {
+        if (!turnId || attempts >= this.maxResumeAttempts) {
+          throw e;
+        }
+        console.warn('Stream dropped, resuming:', e);
+      }
+
+      if (!turnId || attempts >= this.maxResumeAttempts) {
+        return;
+      }
+      attempts += 1;
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempts));
+
+      response = await fetch(`${this.baseUrl}/turns/${encodeURIComponent(turnId)}/events`, {
+        headers: {
+          'Cache-Control': 'no-cache',
+          'Last-Event-ID': cursor.lastEventId || '0',
+        },
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+    }
+  }
+
+  // Yields the events of one SSE response, returns true once the `done` event was received
+  private async *readEvents(
+    response: Response,
+    cursor: { lastEventId: string },
+  ): AsyncGenerator<StreamOutput, boolean, unknown> {
     const reader = response.body?.getReader();
     if (!reader) {
       throw new Error('No response body');
@@ -26,13 +70,14 @@ export class AgentService {
 
     const decoder = new TextDecoder();
     let buffer = '';
+    let pendingEventId = '';
 
     try {
       while (true) {
         const { done, value } = await reader.read();
         
         if (done) {
-          break;
+          return false;
         }
 
         buffer += decoder.decode(value, { stream: true });
@@ -40,10 +85,15 @@ export class AgentService {
         buffer = lines.pop() || '';
 
         for (const line of lines) {
-          if (line.startsWith('data: ')) {
+          if (line.startsWith('id: ')) {
+            pendingEventId = line.slice(4);
+          } else if (line.startsWith('data: ')) {
             const data = line.slice(6);
+            if (pendingEventId) {
+              cursor.lastEventId = pendingEventId;
+            }
             if (data === 'done') {
-              return;
+              return true;
             }
             try {
               const parsed = JSON.parse(data) as StreamOutput;
@@ -59,14 +109,34 @@ export class AgentService {
     }
   }
 
+  async loadHtmlReportWithVersion(userId?: string): Promise<{ content: string; version: number }> {
+    let url = `${this.baseUrl}/temp/html_report.html`;
+    if (userId) {
+      url += `?user_id=${encodeURIComponent(userId)}`;
+    }
+    const response = await fetch(url, { cache: 'no-cache' });
+    if (!response.ok) {
+      throw new Error(`Failed to load HTML report: ${response.status}`);
+    }
+    const version = Number(response.headers.get('X-Report-Version') || '0');
+    return { content: await response.text(), version };
+  }
+
+  reportEventsUrl(userId?: string): string {
+    let url = `${this.baseUrl}/reports/events`;
+    if (userId) {
+      url += `?user_id=${encodeURIComponent(userId)}`;
+    }
+    return url;
+  }
+
   async loadHtmlReport(userId?: string): Promise<string> {
-    // Add timestamp parameter to prevent browser caching
-    const timestamp = new Date().getTime();
-    let url = `${this.baseUrl}/temp/html_report.html?t=${timestamp}`;
+    // The backend sends ETags, the browser revalidates its cached copy and gets a 304 if unchanged
+    let url = `${this.baseUrl}/temp/html_report.html`;
     if (userId) {
-      url += `&user_id=${encodeURIComponent(userId)}`;
+      url += `?user_id=${encodeURIComponent(userId)}`;
     }
-    const response = await fetch(url);
+    const response = await fetch(url, { cache: 'no-cache' });
     if (!response.ok) {
       throw new Error(`Failed to load HTML report: ${response.status}`);
     }
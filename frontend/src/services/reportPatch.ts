@@ -0,0 +1,54 @@
+import { ReportDeltaOperation, ReportPreviewChange } from '../types/api';
+
+// Same line splitting as the backend: only '\n' ends a line and line endings are kept
+export function splitLines(content: string): string[] {
+  const parts = content.split('\n');
+  const last = parts.pop() ?? '';
+  const lines = parts.map((line) => line + '\n');
+  if (last) {
+    lines.push(last);
+  }
+  return lines;
+}
+
+export function applyReportDelta(content: string, delta: ReportDeltaOperation[]): string {
+  const lines = splitLines(content);
+  // Back to front, so the line numbers of the earlier operations stay valid
+  const operations = [...delta].sort((a, b) => b.start - a.start);
+  for (const operation of operations) {
+    lines.splice(operation.start, operation.end - operation.start, ...operation.lines);
+  }
+  return lines.join('');
+}
+
+function withNewline(text: string): string {
+  return text && !text.endsWith('\n') ? text + '\n' : text;
+}
+
+// Renders a streamed write_html_report call on top of the report, like the tool does once the call completes:
+// the lines start_line..end_line (both inclusive) are replaced by change_to
+export function applyReportPreview(content: string, changes: ReportPreviewChange[]): string {
+  const lines = splitLines(content);
+  if (lines.length === 0) {
+    return changes.map((change) => withNewline(change.change_to)).join('');
+  }
+
+  const done = new Set<number>();
+  const parts: string[] = [];
+  lines.forEach((line, lineIdx) => {
+    let needChange = false;
+    changes.forEach((change, changeIdx) => {
+      if (lineIdx >= change.start_line && lineIdx <= change.end_line) {
+        needChange = true;
+        if (!done.has(changeIdx)) {
+          parts.push(withNewline(change.change_to));
+          done.add(changeIdx);
+        }
+      }
+    });
+    if (!needChange) {
+      parts.push(line);
+    }
+  });
+  return parts.join('');
+}
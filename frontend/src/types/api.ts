@@ -40,7 +40,7 @@ export interface UIContext {
   user_id?: string;
 }
 
-export type OutputType = 'message' | 'thinking' | 'tool_call' | 'tool_response' | 'form_request' | 'choice_request' | 'message_delta' | 'streaming_display';
+export type OutputType = 'message' | 'thinking' | 'tool_call' | 'tool_response' | 'form_request' | 'choice_request' | 'message_delta' | 'streaming_display' | 'report_preview' | 'form_row_delta' | 'choice_option_delta';
 
 export interface BaseOutput {
   type: OutputType;
@@ -63,6 +63,30 @@ export interface StreamingDisplayOutput extends BaseOutput {
   content: string;
 }
 
+// Provisional report change while a write_html_report call is streamed, `content` is appended to change `index`
+export interface ReportPreviewDelta extends BaseOutput {
+  type: 'report_preview';
+  call_id: string;
+  index: number;
+  start_line: number;
+  end_line: number;
+  content: string;
+}
+
+// A completed row of a form request that is still streamed, the rows arrive in order
+export interface FormRowDelta {
+  type: 'form_row_delta';
+  index: number;
+  row: FormRow;
+}
+
+// A completed option of a choice request that is still streamed, the options arrive in order
+export interface ChoiceOptionDelta {
+  type: 'choice_option_delta';
+  index: number;
+  option: string;
+}
+
 export interface ThinkingOutput extends BaseOutput {
   type: 'thinking';
   content: string;
@@ -89,4 +113,39 @@ export interface ChoiceRequestOutput {
   single_choice: boolean;
 }
 
-export type StreamOutput = MessageOutput | ThinkingOutput | ToolCallOutput | ToolResponseOutput | FormRequestOutput | ChoiceRequestOutput | MessageDelta | StreamingDisplayOutput;
+export type StreamOutput = MessageOutput | ThinkingOutput | ToolCallOutput | ToolResponseOutput | FormRequestOutput | ChoiceRequestOutput | MessageDelta | StreamingDisplayOutput | ReportPreviewDelta | FormRowDelta | ChoiceOptionDelta;
+
+// Live report updates, pushed by /reports/events
+
+export interface ReportDeltaOperation {
+  // Replaces the lines [start, end) of the base version with `lines` (line endings included)
+  start: number;
+  end: number;
+  lines: string[];
+}
+
+export interface ReportPatchEvent {
+  type: 'report_patch';
+  version: number;
+  base_version: number;
+  delta: ReportDeltaOperation[];
+}
+
+export interface ReportVersionEvent {
+  type: 'report_version';
+  version: number;
+}
+
+export type ReportEvent = ReportPatchEvent | ReportVersionEvent;
+
+// The changes of a write_html_report call streamed so far, same semantics as the tool arguments
+export interface ReportPreviewChange {
+  start_line: number;
+  end_line: number;
+  change_to: string;
+}
+
+export interface ReportPreview {
+  callId: string;
+  changes: ReportPreviewChange[];
+}
@@ -15,6 +15,10 @@ export default defineConfig({
       '/temp': {
         target: 'http://localhost:8000',
         changeOrigin: true,
+      },
+      '/reports': {
+        target: 'http://localhost:8000',
+        changeOrigin: true,
       }
     }
   }